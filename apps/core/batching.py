@@ -0,0 +1,184 @@
+"""
+In-process write-behind buffer.
+
+``BatchWriter`` collects items appended on the request path and hands them to
+a ``flush`` callable in batches from a background thread, so a burst of
+writes becomes a few ``bulk_create`` calls instead of one INSERT per request.
+A batch is flushed when ``batch_size`` items are waiting or ``flush_interval``
+seconds after the first of them arrived, and whatever is left is drained at
+interpreter exit.
+
+When ``max_pending`` items are already waiting (the database can't keep up),
+``submit`` writes the oldest ``batch_size`` of them on the caller's thread
+(waiting for a flush already in progress first) instead of growing the
+buffer, so a producer never pays for more than one batch; each such stall is
+counted in ``stats()["backpressure"]``.  Items buffered in a
+process that is killed without a clean exit are lost, so only use it for data
+that tolerates that (analytics events, counters that can be reconciled).
+"""
+
+import atexit
+import logging
+import os
+import threading
+import time
+
+from django.db import close_old_connections, connections
+
+logger = logging.getLogger(__name__)
+
+# Every writer created in this process, by name (for the stats endpoint).
+writers = {}
+
+
+class BatchWriter:
+    def __init__(self, name, flush, *, batch_size=500, flush_interval=2.0, max_pending=10_000, run_async=True):
+        self.name = name
+        self.flush_callback = flush
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self.run_async = run_async
+
+        self._items = []
+        self._first_pending_at = None
+        self._condition = threading.Condition()
+        self._flush_lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+        self._stopping = False
+        self._stats = {
+            "submitted": 0,
+            "flushed": 0,
+            "batches": 0,
+            "failed": 0,
+            "backpressure": 0,
+            "last_flush_at": None,
+            "last_flush_ms": None,
+        }
+        writers[name] = self
+        atexit.register(self.close)
+
+    # ─── Producer side ─────────────────────────────────────────────────────────
+
+    def submit(self, item) -> None:
+        """Queue ``item`` for the next batch (flushes inline when not async)."""
+        if not self.run_async:
+            with self._condition:
+                self._stats["submitted"] += 1
+            self._flush([item])
+            return
+
+        self._ensure_worker()
+        with self._condition:
+            self._stats["submitted"] += 1
+            self._items.append(item)
+            if self._first_pending_at is None:
+                self._first_pending_at = time.monotonic()
+            overloaded = len(self._items) >= self.max_pending
+            if len(self._items) >= self.batch_size:
+                self._condition.notify()
+
+        if overloaded:
+            # Backpressure: make the producer write one batch rather than
+            # letting the buffer grow without bound.
+            with self._condition:
+                self._stats["backpressure"] += 1
+                items = self._take(self.batch_size)
+            if items:
+                self._flush(items)
+
+    def flush(self) -> None:
+        """Flush everything buffered so far on the calling thread."""
+        with self._condition:
+            items = self._take()
+        if items:
+            self._flush(items)
+
+    def close(self) -> None:
+        """Stop the worker and drain the buffer."""
+        with self._condition:
+            self._stopping = True
+            self._condition.notify()
+        thread = self._thread
+        if thread is not None and thread.is_alive() and thread is not threading.current_thread():
+            thread.join(timeout=max(self.flush_interval, 1) * 5)
+        self.flush()
+
+    def stats(self) -> dict:
+        with self._condition:
+            pending = len(self._items)
+            oldest = (
+                round(time.monotonic() - self._first_pending_at, 3)
+                if self._first_pending_at is not None
+                else None
+            )
+            return {
+                "name": self.name,
+                "pending": pending,
+                "max_pending": self.max_pending,
+                "oldest_pending_seconds": oldest,
+                "worker_alive": bool(self._thread and self._thread.is_alive()),
+                **self._stats,
+            }
+
+    # ─── Worker side ───────────────────────────────────────────────────────────
+
+    def _ensure_worker(self):
+        # Restart after fork: threads don't survive it, buffered items do.
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._condition:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._stopping = False
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name=f"batch-writer-{self.name}", daemon=True)
+            self._thread.start()
+
+    def _due(self) -> bool:
+        if not self._items:
+            return False
+        if self._stopping or len(self._items) >= self.batch_size:
+            return True
+        return time.monotonic() - self._first_pending_at >= self.flush_interval
+
+    def _take(self, limit=None):
+        """Remove and return the oldest ``limit`` items (all by default); hold ``_condition``."""
+        items = self._items[:limit]
+        del self._items[:limit]
+        self._first_pending_at = time.monotonic() if self._items else None
+        return items
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._due() and not self._stopping:
+                    timeout = None
+                    if self._first_pending_at is not None:
+                        timeout = max(0.0, self._first_pending_at + self.flush_interval - time.monotonic())
+                    self._condition.wait(timeout)
+                items = self._take(self.batch_size)
+                stopping = self._stopping and not self._items
+            if items:
+                close_old_connections()
+                self._flush(items)
+            if stopping:
+                connections.close_all()
+                return
+
+    def _flush(self, items):
+        started = time.monotonic()
+        with self._flush_lock:
+            try:
+                self.flush_callback(items)
+            except Exception:
+                logger.exception("BatchWriter %s failed to flush %d item(s)", self.name, len(items))
+                with self._condition:
+                    self._stats["failed"] += len(items)
+                return
+        with self._condition:
+            self._stats["flushed"] += len(items)
+            self._stats["batches"] += 1
+            self._stats["last_flush_at"] = time.time()
+            self._stats["last_flush_ms"] = round((time.monotonic() - started) * 1000, 1)
@@ -0,0 +1,22 @@
+"""
+Helpers for Django's cache framework.
+
+Local-memory (and dummy) caches live inside one process: under several
+workers each has its own copy, and a key written or bumped by one is never
+seen by the others.  Code that shares state through the cache checks
+``is_shared`` and keeps that state somewhere shared (the database) otherwise.
+"""
+
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+
+PROCESS_LOCAL_BACKENDS = (LocMemCache, DummyCache)
+
+
+def is_shared(cache) -> bool:
+    """
+    Whether every server process sees the same ``cache`` (Redis, Memcached,
+    database…).  Pass the backend (``caches[alias]``), not the
+    ``django.core.cache.cache`` proxy.
+    """
+    return not isinstance(cache, PROCESS_LOCAL_BACKENDS)
@@ -0,0 +1,25 @@
+"""
+Model helpers shared across apps.
+"""
+
+
+class ProtectedFieldsMixin:
+    """
+    Leave ``PROTECTED_FIELDS`` out of a plain ``save()`` of an existing row.
+
+    Those columns are only ever changed with queries (``F()`` updates, tree
+    maintenance…), so saving an instance loaded earlier, e.g. in a PATCH, must
+    not write stale values back over them.  Inserts and saves that pass
+    ``update_fields`` are left alone.
+    """
+
+    PROTECTED_FIELDS: frozenset[str] = frozenset()
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding and not args and not kwargs.get("force_insert") and kwargs.get("update_fields") is None:
+            kwargs["update_fields"] = [
+                field.name
+                for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.PROTECTED_FIELDS
+            ]
+        super().save(*args, **kwargs)
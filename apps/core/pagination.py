@@ -0,0 +1,249 @@
+"""
+Pagination shared by every list endpoint.
+
+``DefaultPagination`` keeps the classic ``?page=N`` behaviour and switches to
+keyset ("cursor") mode when the request carries ``?cursor`` — pass it empty
+for the first page, then follow the ``next`` / ``previous`` links.  Keyset
+pages are addressed by the sort key of the last row seen plus the ``id``
+tie-breaker, so page N costs the same as page 1 and no ``COUNT(*)`` is run.
+"""
+
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import F, Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def encode_cursor(data: dict) -> str:
+    raw = json.dumps(data, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def decode_cursor(value: str) -> dict:
+    """Inverse of ``encode_cursor``; raises ``NotFound`` on garbage input."""
+    try:
+        padded = value + "=" * (-len(value) % 4)
+        data = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise NotFound("Invalid cursor.")
+    if not isinstance(data, dict):
+        raise NotFound("Invalid cursor.")
+    return data
+
+
+class KeysetPagination(BasePagination):
+    """
+    Keyset pagination over the queryset's current ``order_by`` (as set by
+    ``OrderingFilter``, the view or the model's ``Meta.ordering``), with the
+    primary key appended as tie-breaker.  Nullable sort fields are ordered
+    NULLS LAST, except those in ``non_null_fields`` (the view filters out
+    their NULLs), which keep the plain order an index can serve.
+    ``paginate_queryset`` returns ``None`` when the ordering is not made of
+    plain model fields, so callers can fall back.
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    cursor_query_param = "cursor"
+    invalid_cursor_message = "Invalid cursor."
+    non_null_fields = ()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        keys = self.get_sort_keys(queryset)
+        if keys is None:
+            return None
+
+        self.request = request
+        self.keys = keys
+        raw_cursor = request.query_params.get(self.cursor_query_param) or ""
+        cursor = decode_cursor(raw_cursor) if raw_cursor else {}
+        position = self._decode_position(cursor.get("v")) if cursor else None
+        self.reverse = bool(cursor.get("r"))
+
+        queryset = queryset.order_by(*self._order_by(reverse=self.reverse))
+        if position is not None:
+            queryset = queryset.filter(self._seek(position, reverse=self.reverse))
+
+        rows = list(queryset[: self.page_size + 1])
+        has_more = len(rows) > self.page_size
+        rows = rows[: self.page_size]
+        if self.reverse:
+            rows.reverse()
+
+        self.page = rows
+        if self.reverse:
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        return rows
+
+    def get_sort_keys(self, queryset):
+        """Return ``[(field, descending), …]`` ending with the pk, or ``None``."""
+        model = queryset.model
+        order_by = list(queryset.query.order_by) or list(model._meta.ordering)
+        pk = model._meta.pk
+
+        keys = []
+        for item in order_by:
+            if not isinstance(item, str) or item == "?":
+                return None
+            descending = item.startswith("-")
+            name = item.lstrip("-+")
+            if name == "pk":
+                name = pk.name
+            try:
+                field = model._meta.get_field(name)
+            except FieldDoesNotExist:
+                return None
+            if field.is_relation and not field.primary_key:
+                return None
+            keys.append((field, descending))
+            if field.primary_key:
+                return keys
+
+        descending = keys[-1][1] if keys else True
+        keys.append((pk, descending))
+        return keys
+
+    def _order_by(self, reverse=False):
+        ordering = []
+        for field, descending in self.keys:
+            if reverse:
+                descending = not descending
+            expression = F(field.attname)
+            nulls = {}
+            if self._nullable(field):
+                # Nulls always sort after values when paging forwards.
+                nulls = {"nulls_first": True} if reverse else {"nulls_last": True}
+            ordering.append(expression.desc(**nulls) if descending else expression.asc(**nulls))
+        return ordering
+
+    def _nullable(self, field):
+        return field.null and field.name not in self.non_null_fields
+
+    def _seek(self, position, reverse=False):
+        """Q for rows strictly after (or before, when ``reverse``) ``position``."""
+        condition = Q(pk__in=[])
+        equal = Q()
+        for (field, descending), value in zip(self.keys, position):
+            name = field.attname
+            if value is None:
+                beyond = Q(**{f"{name}__isnull": False}) if reverse else Q(pk__in=[])
+                same = Q(**{f"{name}__isnull": True})
+            else:
+                lookup = "lt" if descending != reverse else "gt"
+                beyond = Q(**{f"{name}__{lookup}": value})
+                if self._nullable(field) and not reverse:
+                    beyond |= Q(**{f"{name}__isnull": True})
+                same = Q(**{name: value})
+            condition |= equal & beyond
+            equal &= same
+        return condition
+
+    def _encode_position(self, obj):
+        values = []
+        for field, _ in self.keys:
+            value = getattr(obj, field.attname)
+            values.append(None if value is None else field.value_to_string(obj))
+        return values
+
+    def _decode_position(self, values):
+        if not isinstance(values, list) or len(values) != len(self.keys):
+            raise NotFound(self.invalid_cursor_message)
+        try:
+            return [
+                None if value is None else field.to_python(value)
+                for (field, _), value in zip(self.keys, values)
+            ]
+        except (TypeError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def _link(self, obj, reverse):
+        url = self.request.build_absolute_uri()
+        url = remove_query_param(url, "page")
+        cursor = {"v": self._encode_position(obj)}
+        if reverse:
+            cursor["r"] = 1
+        return replace_query_param(url, self.cursor_query_param, encode_cursor(cursor))
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self._link(self.page[-1], reverse=False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self._link(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        link = {"type": "string", "nullable": True, "format": "uri"}
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {"next": link, "previous": link, "results": schema},
+        }
+
+    def get_schema_operation_parameters(self, view):
+        return [
+            {
+                "name": self.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Pagination cursor; follow the `next` / `previous` links.",
+                "schema": {"type": "string"},
+            },
+        ]
+
+
+class DefaultPagination(PageNumberPagination):
+    """
+    ``?page=N`` pagination, or keyset pagination when ``?cursor`` is present
+    (falls back to page numbers for orderings keyset mode can't seek on).
+    """
+
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_class.cursor_query_param in request.query_params:
+            keyset = self.keyset_class()
+            keyset.page_size = self.get_page_size(request) or keyset.page_size
+            page = keyset.paginate_queryset(queryset, request, view)
+            if page is not None:
+                self.keyset = keyset
+                return page
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_schema_operation_parameters(self, view):
+        return super().get_schema_operation_parameters(view) + [
+            {
+                "name": self.keyset_class.cursor_query_param,
+                "required": False,
+                "in": "query",
+                "description": "Keyset pagination cursor; pass it empty for the first page, "
+                               "then follow the `next` / `previous` links.",
+                "schema": {"type": "string"},
+            },
+        ]
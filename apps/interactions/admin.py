@@ -1,5 +1,12 @@
 from django.contrib import admin
-from .models import Comment, Rating, RecipeShare, SavedRecipe
+from .models import (
+    Comment,
+    EngagementRollup,
+    Rating,
+    RecipeShare,
+    RollupWatermark,
+    SavedRecipe,
+)
 
 # Register your models here.
  
@@ -13,7 +20,7 @@ class RatingAdmin(admin.ModelAdmin):
  
 @admin.register(Comment)
 class CommentAdmin(admin.ModelAdmin):
-    list_display = ("author", "recipe", "parent", "is_edited", "created_at")
+    list_display = ("author", "recipe", "parent", "depth", "is_edited", "last_activity_at", "created_at")
     list_filter = ("is_edited",)
     search_fields = ("author__username", "recipe__name", "body")
     raw_id_fields = ("recipe", "author", "parent")
@@ -29,4 +36,15 @@ class SavedRecipeAdmin(admin.ModelAdmin):
 class RecipeShareAdmin(admin.ModelAdmin):
     list_display = ("recipe", "shared_by", "platform", "created_at")
     list_filter = ("platform",)
- 
\ No newline at end of file
+ 
+ 
+@admin.register(EngagementRollup)
+class EngagementRollupAdmin(admin.ModelAdmin):
+    list_display = ("recipe", "metric", "period", "bucket", "platform", "count")
+    list_filter = ("metric", "period", "platform")
+    raw_id_fields = ("recipe",)
+ 
+ 
+@admin.register(RollupWatermark)
+class RollupWatermarkAdmin(admin.ModelAdmin):
+    list_display = ("source", "last_id", "updated_at")
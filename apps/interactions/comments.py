@@ -0,0 +1,127 @@
+"""
+Batched loading of comment threads.
+
+``load_comment_tree`` takes a page of comments and attaches their replies,
+level by level, with one query per level: each query fetches the children of
+every comment on the previous level, capped to the first ``reply_limit`` per
+parent with a ``ROW_NUMBER()`` window and counted with a ``COUNT(*)`` window.
+A page of threads therefore costs ``depth + 1`` queries however many threads
+it holds.  Every loaded comment gets:
+
+* ``loaded_replies`` — the prefetched children (oldest first, capped);
+* ``reply_count``    — the total number of direct children.
+
+The comments passed in additionally get ``descendant_count``, the size of
+their whole subtree, counted from the materialised ``Comment.path`` with one
+range query.  Replies beyond the cap or below ``depth`` are fetched page by
+page from ``GET /api/v1/interactions/comments/<id>/replies/``, or as one
+flat, depth-first stream from ``/comments/<id>/thread/``.
+"""
+
+from functools import reduce
+from operator import or_
+
+from django.db.models import Count, F, Q, Window
+from django.db.models.functions import RowNumber, Substr
+
+from .models import Comment
+
+DEFAULT_REPLY_LIMIT = 3
+MAX_REPLY_LIMIT = 50
+DEFAULT_DEPTH = 3
+MAX_DEPTH = 10
+
+
+def subtree_q(comment, include_self=True) -> Q:
+    """``Q`` matching ``comment``'s replies at any depth — an index range on ``path``."""
+    lower, upper = comment.subtree_bounds
+    return Q(path__gte=lower, path__lt=upper) if include_self else Q(path__gt=lower, path__lt=upper)
+
+
+def subtree(comment, include_self=True):
+    """``comment``'s thread in depth-first order."""
+    return Comment.objects.filter(subtree_q(comment, include_self)).order_by("path")
+
+
+def descendant_counts(comments) -> dict[int, int]:
+    """Map comment id → number of replies below it, one query per distinct depth."""
+    counts = {}
+    by_depth = {}
+    for comment in comments:
+        if comment.path:
+            by_depth.setdefault(comment.depth, []).append(comment)
+    for comments_at_depth in by_depth.values():
+        by_path = {comment.path: comment for comment in comments_at_depth}
+        prefix_length = len(comments_at_depth[0].path)
+        totals = (
+            Comment.objects.filter(reduce(or_, (subtree_q(c, include_self=False) for c in comments_at_depth)))
+            .order_by()
+            .annotate(prefix=Substr("path", 1, prefix_length))
+            .values("prefix")
+            .annotate(total=Count("pk"))
+            .values_list("prefix", "total")
+        )
+        counts.update({comment.pk: 0 for comment in comments_at_depth})
+        counts.update({by_path[prefix].pk: total for prefix, total in totals})
+    return counts
+
+
+def _children(parent_ids, reply_limit):
+    return (
+        Comment.objects.filter(parent_id__in=parent_ids)
+        .select_related("author")
+        .annotate(
+            position=Window(
+                RowNumber(),
+                partition_by=[F("parent_id")],
+                order_by=[F("created_at").asc(), F("pk").asc()],
+            ),
+            sibling_count=Window(Count("pk"), partition_by=[F("parent_id")]),
+        )
+        .filter(position__lte=reply_limit)
+        .order_by("parent_id", "created_at", "pk")
+    )
+
+
+def _reply_counts(parent_ids) -> dict[int, int]:
+    return dict(
+        Comment.objects.filter(parent_id__in=parent_ids)
+        .order_by()
+        .values("parent_id")
+        .annotate(total=Count("pk"))
+        .values_list("parent_id", "total")
+    )
+
+
+def load_comment_tree(comments, reply_limit=DEFAULT_REPLY_LIMIT, depth=DEFAULT_DEPTH):
+    """
+    Attach ``loaded_replies`` and ``reply_count`` to ``comments`` and to
+    ``depth`` levels of their replies, and ``descendant_count`` to
+    ``comments``.  Returns ``comments`` as a list.
+    """
+    comments = list(comments)
+    totals = descendant_counts(comments)
+    for comment in comments:
+        comment.descendant_count = totals.get(comment.pk)
+    level = comments
+    for current_depth in range(depth + 1):
+        if not level:
+            break
+        by_pk = {comment.pk: comment for comment in level}
+        for comment in level:
+            comment.loaded_replies = []
+            comment.reply_count = 0
+
+        if current_depth == depth:
+            # Deepest level: report how many replies exist without loading them.
+            for parent_id, total in _reply_counts(by_pk).items():
+                by_pk[parent_id].reply_count = total
+            break
+
+        children = list(_children(by_pk, reply_limit))
+        for child in children:
+            parent = by_pk[child.parent_id]
+            parent.loaded_replies.append(child)
+            parent.reply_count = child.sibling_count
+        level = children
+    return comments
@@ -0,0 +1,61 @@
+"""
+Usage:
+    python manage.py build_engagement_rollups
+    python manage.py build_engagement_rollups --metric share --metric save
+    python manage.py build_engagement_rollups --lag 300 --keep-hourly-days 14
+
+Run it from cron every few minutes; each run only reads rows added since the
+previous one.
+"""
+
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+
+from apps.interactions.rollups import METRICS, build_rollups, prune_hourly
+
+
+class Command(BaseCommand):
+    help = "Fold new shares, saves, ratings and comments into the hourly/daily engagement rollups"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--metric",
+            choices=METRICS,
+            action="append",
+            default=[],
+            help="Only build this metric (repeatable)",
+        )
+        parser.add_argument(
+            "--lag",
+            type=int,
+            default=120,
+            help="Leave rows younger than this many seconds for the next run",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=10_000,
+            help="Number of source ids folded per transaction",
+        )
+        parser.add_argument(
+            "--keep-hourly-days",
+            type=int,
+            default=0,
+            help="Delete hourly rollups older than this many days (0 keeps them all)",
+        )
+
+    def handle(self, *args, **options):
+        counted = build_rollups(
+            metrics=options["metric"] or METRICS,
+            lag=timedelta(seconds=options["lag"]),
+            chunk_size=options["chunk_size"],
+        )
+        for metric, total in counted.items():
+            self.stdout.write(f"{metric}: {total} new row(s)")
+
+        if options["keep_hourly_days"]:
+            pruned = prune_hourly(timedelta(days=options["keep_hourly_days"]))
+            self.stdout.write(f"Pruned {pruned} hourly rollup(s).")
+
+        self.stdout.write(self.style.SUCCESS("Done."))
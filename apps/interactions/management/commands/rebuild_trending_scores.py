@@ -0,0 +1,68 @@
+"""
+Usage:
+    python manage.py rebuild_trending_scores
+    python manage.py rebuild_trending_scores --chunk-size 5000
+
+Recomputes every recipe's trending score from the raw interaction tables,
+e.g. after changing TRENDING_HALF_LIFE_HOURS or the weights.  Scores are
+normally maintained incrementally; interactions recorded while this runs may
+be overwritten, so run it in a quiet period.
+"""
+
+import math
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+from django.db.models.functions import TruncHour
+
+from apps.interactions.models import Comment, Rating, RecipeShare, SavedRecipe
+from apps.recipes.models import Recipe
+from apps.recipes.trending import event_exponent, weight_of
+
+SOURCES = {
+    "rating": Rating,
+    "comment": Comment,
+    "save": SavedRecipe,
+    "share": RecipeShare,
+}
+
+
+class Command(BaseCommand):
+    help = "Recompute recipe trending scores from all recorded interactions"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of recipes updated per query",
+        )
+
+    def handle(self, *args, **options):
+        # Events are bucketed per hour; the error is under one bucket of decay.
+        exponents = {}
+        for kind, model in SOURCES.items():
+            hourly = (
+                model.objects.annotate(hour=TruncHour("created_at"))
+                .order_by()
+                .values("recipe_id", "hour")
+                .annotate(total=Count("pk"))
+                .values_list("recipe_id", "hour", "total")
+            )
+            for recipe_id, hour, total in hourly.iterator():
+                exponents.setdefault(recipe_id, []).append(event_exponent(weight_of({kind: total}), hour))
+
+        scores = {}
+        for recipe_id, values in exponents.items():
+            peak = max(values)
+            scores[recipe_id] = peak + math.log(sum(math.exp(value - peak) for value in values))
+
+        with transaction.atomic():
+            Recipe.objects.update(trending_score=None)
+            Recipe.objects.bulk_update(
+                [Recipe(pk=pk, trending_score=score) for pk, score in scores.items()],
+                ["trending_score"],
+                batch_size=options["chunk_size"],
+            )
+        self.stdout.write(self.style.SUCCESS(f"Done — {len(scores)} recipe(s) scored."))
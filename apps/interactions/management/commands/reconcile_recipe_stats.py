@@ -0,0 +1,120 @@
+"""
+Usage:
+    python manage.py reconcile_recipe_stats
+    python manage.py reconcile_recipe_stats --recipe 12 --recipe 40
+
+Repairs the rating aggregates and the comment / save / share counters.  A
+recipe's rating is its imported baseline (``imported_rating_sum`` /
+``imported_review_count``, set by ``seed_recipes``) plus the site's votes,
+exactly as ``apply_rating_delta`` maintains it.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Sum, Value
+from django.db.models.functions import Coalesce
+
+from apps.interactions.models import Comment, Rating, RecipeShare, SavedRecipe
+from apps.interactions.services import adjust_recipe_counters, apply_rating_delta
+from apps.recipes.models import Recipe
+
+
+# Counter field → model whose rows it counts.
+COUNTERS = {
+    "comment_count": Comment,
+    "save_count": SavedRecipe,
+    "share_count": RecipeShare,
+}
+
+
+def _subquery(model, aggregate):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(recipe=OuterRef("pk"))
+            .order_by()
+            .values("recipe")
+            .annotate(value=aggregate)
+            .values("value"),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+class Command(BaseCommand):
+    help = "Repair drift in the denormalised recipe rating aggregates and engagement counters"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--recipe",
+            type=int,
+            action="append",
+            default=[],
+            help="Only reconcile this recipe id (repeatable)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of recipes repaired per transaction",
+        )
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.all()
+        if options["recipe"]:
+            recipes = recipes.filter(pk__in=options["recipe"])
+
+        drifted_ratings = (
+            recipes.annotate(
+                true_sum=F("imported_rating_sum") + _subquery(Rating, Sum("score")),
+                true_count=F("imported_review_count") + _subquery(Rating, Count("pk")),
+            )
+            .filter(~Q(rating_sum=F("true_sum")) | ~Q(review_count=F("true_count")))
+            .values_list("pk", "rating_sum", "review_count", "true_sum", "true_count")
+        )
+        repaired = self._in_chunks(drifted_ratings, self._repair_ratings, options["chunk_size"])
+        self.stdout.write(f"Ratings: {repaired} recipe(s) repaired.")
+
+        annotations = {f"true_{field}": _subquery(model, Count("pk")) for field, model in COUNTERS.items()}
+        drift = Q()
+        for field in COUNTERS:
+            drift |= ~Q(**{field: F(f"true_{field}")})
+        drifted_counters = (
+            recipes.annotate(**annotations)
+            .filter(drift)
+            .values_list("pk", *COUNTERS, *annotations)
+        )
+        repaired = self._in_chunks(drifted_counters, self._repair_counters, options["chunk_size"])
+        self.stdout.write(f"Counters: {repaired} recipe(s) repaired.")
+
+        self.stdout.write(self.style.SUCCESS("Done."))
+
+    def _in_chunks(self, rows, repair, chunk_size):
+        repaired = 0
+        batch = []
+        for row in rows.iterator(chunk_size=chunk_size):
+            batch.append(row)
+            if len(batch) >= chunk_size:
+                repaired += repair(batch)
+                batch = []
+        if batch:
+            repaired += repair(batch)
+        return repaired
+
+    @transaction.atomic
+    def _repair_ratings(self, rows):
+        for pk, rating_sum, review_count, true_sum, true_count in rows:
+            # Apply the difference as a delta so concurrent votes aren't overwritten.
+            apply_rating_delta(pk, true_sum - rating_sum, true_count - review_count)
+        return len(rows)
+
+    @transaction.atomic
+    def _repair_counters(self, rows):
+        size = len(COUNTERS)
+        for pk, *values in rows:
+            stored, actual = values[:size], values[size:]
+            adjust_recipe_counters(
+                pk,
+                **{field: true - current for field, current, true in zip(COUNTERS, stored, actual)},
+            )
+        return len(rows)
@@ -0,0 +1,86 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:54
+
+import django.utils.timezone
+from django.db import migrations, models
+
+PATH_STEP = 7
+BASE36 = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def encode_path_step(pk):
+    digits = ""
+    while pk:
+        pk, remainder = divmod(pk, 36)
+        digits = BASE36[remainder] + digits
+    return digits.rjust(PATH_STEP, "0")
+
+
+def populate_paths(apps, schema_editor):
+    Comment = apps.get_model("interactions", "Comment")
+
+    rows = {
+        pk: {"parent": parent_id, "created_at": created_at, "last": created_at}
+        for pk, parent_id, created_at in Comment.objects.values_list("pk", "parent_id", "created_at")
+    }
+    children = {}
+    for pk, row in rows.items():
+        children.setdefault(row["parent"], []).append(pk)
+
+    # Walk each thread top-down to build paths, then bottom-up for activity.
+    order = []
+    stack = [(pk, "", 0) for pk in children.get(None, [])]
+    while stack:
+        pk, prefix, depth = stack.pop()
+        row = rows[pk]
+        row["path"] = prefix + encode_path_step(pk)
+        row["depth"] = depth
+        order.append(pk)
+        stack.extend((child, row["path"], depth + 1) for child in children.get(pk, []))
+    for pk in reversed(order):
+        row = rows[pk]
+        parent = rows.get(row["parent"])
+        if parent is not None and row["last"] > parent["last"]:
+            parent["last"] = row["last"]
+
+    Comment.objects.bulk_update(
+        [
+            Comment(pk=pk, path=rows[pk]["path"], depth=rows[pk]["depth"], last_activity_at=rows[pk]["last"])
+            for pk in order
+        ],
+        ["path", "depth", "last_activity_at"],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interactions', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='comment',
+            name='depth',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='last_activity_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.AddField(
+            model_name='comment',
+            name='path',
+            field=models.CharField(blank=True, default='', editable=False, max_length=252),
+        ),
+        migrations.RunPython(populate_paths, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['path'], name='comment_path_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='comment',
+            index=models.Index(fields=['recipe', 'depth', '-last_activity_at'], name='comment_activity_idx'),
+        ),
+    ]
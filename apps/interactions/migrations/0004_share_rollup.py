@@ -0,0 +1,55 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:58
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+from django.db.models import Count
+from django.db.models.functions import TruncDate
+
+
+def populate_rollups(apps, schema_editor):
+    RecipeShare = apps.get_model("interactions", "RecipeShare")
+    ShareRollup = apps.get_model("interactions", "ShareRollup")
+
+    totals = (
+        RecipeShare.objects.annotate(day=TruncDate("created_at"))
+        .order_by()
+        .values("recipe_id", "platform", "day")
+        .annotate(count=Count("pk"))
+    )
+    ShareRollup.objects.bulk_create(
+        (ShareRollup(**row) for row in totals.iterator()),
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interactions', '0003_comment_path'),
+        ('recipes', '0006_engagement_counters'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipeshare',
+            name='created_at',
+            field=models.DateTimeField(default=django.utils.timezone.now, editable=False),
+        ),
+        migrations.CreateModel(
+            name='ShareRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('platform', models.CharField(choices=[('email', 'Email'), ('twitter', 'Twitter/X'), ('facebook', 'Facebook'), ('whatsapp', 'WhatsApp'), ('link', 'Copy Link'), ('other', 'Other')], max_length=20)),
+                ('day', models.DateField()),
+                ('count', models.PositiveIntegerField(default=0)),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='share_rollups', to='recipes.recipe')),
+            ],
+            options={
+                'ordering': ['-day'],
+                'indexes': [models.Index(fields=['day'], name='interaction_day_f090db_idx')],
+                'constraints': [models.UniqueConstraint(fields=('recipe', 'platform', 'day'), name='unique_share_rollup')],
+            },
+        ),
+        migrations.RunPython(populate_rollups, migrations.RunPython.noop),
+    ]
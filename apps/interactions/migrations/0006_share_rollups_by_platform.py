@@ -0,0 +1,40 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:53
+
+from django.db import migrations, models
+
+
+def refold_shares(apps, schema_editor):
+    # Share rollups so far have no platform: drop them and rewind the
+    # watermark so the next build_engagement_rollups run re-counts every share.
+    EngagementRollup = apps.get_model("interactions", "EngagementRollup")
+    RollupWatermark = apps.get_model("interactions", "RollupWatermark")
+    EngagementRollup.objects.filter(metric="share").delete()
+    RollupWatermark.objects.filter(source="share").update(last_id=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interactions', '0005_engagement_rollups'),
+        ('recipes', '0011_recipe_imported_rating'),
+    ]
+
+    operations = [
+        migrations.RemoveConstraint(
+            model_name='engagementrollup',
+            name='unique_engagement_rollup',
+        ),
+        migrations.AddField(
+            model_name='engagementrollup',
+            name='platform',
+            field=models.CharField(blank=True, choices=[('email', 'Email'), ('twitter', 'Twitter/X'), ('facebook', 'Facebook'), ('whatsapp', 'WhatsApp'), ('link', 'Copy Link'), ('other', 'Other')], default='', max_length=20),
+        ),
+        migrations.AddConstraint(
+            model_name='engagementrollup',
+            constraint=models.UniqueConstraint(fields=('recipe', 'metric', 'period', 'bucket', 'platform'), name='unique_engagement_rollup'),
+        ),
+        migrations.DeleteModel(
+            name='ShareRollup',
+        ),
+        migrations.RunPython(refold_shares, migrations.RunPython.noop),
+    ]
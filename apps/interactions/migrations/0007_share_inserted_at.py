@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:28
+
+import django.db.models.functions.datetime
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('interactions', '0006_share_rollups_by_platform'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipeshare',
+            name='inserted_at',
+            field=models.DateTimeField(db_default=django.db.models.functions.datetime.Now(), editable=False),
+        ),
+    ]
@@ -1,7 +1,11 @@
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
+from django.db import models, transaction
+from django.db.models import F, Max, Value
+from django.db.models.functions import Concat, Greatest, Now, Substr
+from django.utils import timezone
 
+from apps.core.models import ProtectedFieldsMixin
 from apps.recipes.models import Recipe
 
 # Create your models here.
@@ -26,9 +30,41 @@ class Rating(models.Model):
     def __str__(self) -> str:
         return f"{self.user.username} rated {self.recipe.name}: {self.score}/5"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the stored score so signals can apply the exact delta.
+        if "score" in instance.__dict__:
+            instance._loaded_score = instance.score
+        return instance
 
-class Comment(models.Model):
-    """A user comment on a recipe, supports nested replies."""
+
+# Each level of a comment's materialised path is its id in fixed-width base36,
+# so a path sorts threads depth-first and every subtree is one key range.
+PATH_STEP = 7
+PATH_MAX_LENGTH = 252
+MAX_COMMENT_DEPTH = PATH_MAX_LENGTH // PATH_STEP - 1
+_BASE36 = "0123456789abcdefghijklmnopqrstuvwxyz"
+
+
+def encode_path_step(pk: int) -> str:
+    digits = ""
+    while pk:
+        pk, remainder = divmod(pk, 36)
+        digits = _BASE36[remainder] + digits
+    return digits.rjust(PATH_STEP, "0")
+
+
+class Comment(ProtectedFieldsMixin, models.Model):
+    """
+    A user comment on a recipe, supports nested replies.
+
+    ``path`` is the chain of ancestor ids ending with the comment's own (see
+    ``encode_path_step``) and is assigned right after insert; ``depth`` is 0
+    for top-level comments.  ``last_activity_at`` is bumped on every ancestor
+    whenever a reply is posted anywhere below it.  Saving a comment with a
+    different ``parent`` moves its whole subtree (one range UPDATE).
+    """
 
     recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name="comments")
     author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="comments")
@@ -41,6 +77,9 @@ class Comment(models.Model):
     )
     body = models.TextField()
     is_edited = models.BooleanField(default=False)
+    path = models.CharField(max_length=PATH_MAX_LENGTH, blank=True, default="", editable=False)
+    depth = models.PositiveSmallIntegerField(default=0, editable=False)
+    last_activity_at = models.DateTimeField(default=timezone.now, editable=False)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -49,11 +88,96 @@ class Comment(models.Model):
         indexes = [
             models.Index(fields=["recipe"]),
             models.Index(fields=["author"]),
+            models.Index(fields=["path"], name="comment_path_idx"),
+            models.Index(fields=["recipe", "depth", "-last_activity_at"], name="comment_activity_idx"),
         ]
 
     def __str__(self) -> str:
         return f"{self.author.username} on {self.recipe.name}"
 
+    @property
+    def subtree_bounds(self) -> tuple[str, str]:
+        """``[lower, upper)`` range of ``path`` values covering this comment and its replies."""
+        parent_path, own = self.path[:-PATH_STEP], self.path[-PATH_STEP:]
+        return self.path, parent_path + encode_path_step(int(own, 36) + 1)
+
+    @property
+    def ancestor_ids(self) -> list[int]:
+        return [
+            int(self.path[start:start + PATH_STEP], 36)
+            for start in range(0, len(self.path) - PATH_STEP, PATH_STEP)
+        ]
+
+    @property
+    def path_parent_id(self) -> int | None:
+        """The parent recorded in ``path``, which ``parent`` differs from until a move is saved."""
+        return self.ancestor_ids[-1] if len(self.path) > PATH_STEP else None
+
+    # Maintained with queries over the tree.
+    PROTECTED_FIELDS = frozenset({"path", "depth", "last_activity_at"})
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            with transaction.atomic():
+                super().save(*args, **kwargs)
+                self._assign_path()
+        elif self.path and self.parent_id != self.path_parent_id:
+            with transaction.atomic():
+                self._check_move()
+                super().save(*args, **kwargs)
+                self._move_subtree()
+        else:
+            super().save(*args, **kwargs)
+
+    def _assign_path(self):
+        parent = self.parent
+        self.path = (parent.path if parent else "") + encode_path_step(self.pk)
+        self.depth = parent.depth + 1 if parent else 0
+        self.last_activity_at = self.created_at
+        Comment.objects.filter(pk=self.pk).update(
+            path=self.path, depth=self.depth, last_activity_at=self.last_activity_at
+        )
+        if parent:
+            Comment.objects.filter(pk__in=self.ancestor_ids).update(last_activity_at=self.created_at)
+
+    def _check_move(self):
+        parent = self.parent
+        if parent is None:
+            return
+        if parent.recipe_id != self.recipe_id:
+            raise ValueError("A comment can only move within its recipe's comments.")
+        if parent.path.startswith(self.path):
+            raise ValueError("A comment can't move below itself.")
+        lower, upper = self.subtree_bounds
+        deepest = Comment.objects.filter(path__gte=lower, path__lt=upper).aggregate(depth=Max("depth"))["depth"]
+        if deepest - self.depth + parent.depth + 1 > MAX_COMMENT_DEPTH:
+            raise ValueError("The thread would be nested too deeply.")
+
+    def _move_subtree(self):
+        """Re-root the paths and depths of this comment and its replies under the new parent."""
+        parent = self.parent
+        lower, upper = self.subtree_bounds
+        path = (parent.path if parent else "") + self.path[-PATH_STEP:]
+        depth = parent.depth + 1 if parent else 0
+        Comment.objects.filter(path__gte=lower, path__lt=upper).update(
+            path=Concat(Value(path), Substr("path", len(self.path) + 1), output_field=models.CharField()),
+            depth=F("depth") + (depth - self.depth),
+        )
+        self.path, self.depth = path, depth
+        if parent:
+            # A comment's stored activity already covers its replies.
+            self.last_activity_at = Comment.objects.values_list("last_activity_at", flat=True).get(pk=self.pk)
+            Comment.objects.filter(pk__in=self.ancestor_ids).update(
+                last_activity_at=Greatest(F("last_activity_at"), Value(self.last_activity_at))
+            )
+
+    def delete(self, *args, **kwargs):
+        # One range query finds the whole subtree instead of a walk per level.
+        if not self.path:
+            return super().delete(*args, **kwargs)
+        lower, upper = self.subtree_bounds
+        return Comment.objects.filter(path__gte=lower, path__lt=upper).delete()
+
 
 class SavedRecipe(models.Model):
     """A recipe saved to a user's personal collection."""
@@ -92,11 +216,66 @@ class RecipeShare(models.Model):
         related_name="shares",
     )
     platform = models.CharField(max_length=20, choices=PLATFORM_CHOICES, default="link")
-    created_at = models.DateTimeField(auto_now_add=True)
+    # Set by the request that logged the share, not when the batch is written.
+    created_at = models.DateTimeField(default=timezone.now, editable=False)
+    # When the batch was written; engagement rollups wait on this, not created_at.
+    inserted_at = models.DateTimeField(db_default=Now(), editable=False)
 
     class Meta:
         ordering = ["-created_at"]
         indexes = [models.Index(fields=["recipe"])]
 
     def __str__(self) -> str:
-        return f"{self.recipe.name} shared via {self.platform}"
\ No newline at end of file
+        return f"{self.recipe.name} shared via {self.platform}"
+
+
+class EngagementRollup(models.Model):
+    """
+    Count of new shares, saves, ratings or comments per recipe in one hour or
+    day, built incrementally by ``build_engagement_rollups``.
+    """
+
+    METRIC_CHOICES = [
+        ("share", "Share"),
+        ("save", "Save"),
+        ("rating", "Rating"),
+        ("comment", "Comment"),
+    ]
+    PERIOD_CHOICES = [
+        ("hour", "Hour"),
+        ("day", "Day"),
+    ]
+
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name="engagement_rollups")
+    metric = models.CharField(max_length=10, choices=METRIC_CHOICES)
+    period = models.CharField(max_length=4, choices=PERIOD_CHOICES)
+    bucket = models.DateTimeField()
+    # Share rollups are kept per platform; blank for the other metrics.
+    platform = models.CharField(max_length=20, choices=RecipeShare.PLATFORM_CHOICES, blank=True, default="")
+    count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        ordering = ["-bucket"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["recipe", "metric", "period", "bucket", "platform"],
+                name="unique_engagement_rollup",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["metric", "period", "bucket"], name="engagement_site_trend_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.recipe_id} {self.metric}/{self.period} {self.bucket:%Y-%m-%d %H:00}: {self.count}"
+
+
+class RollupWatermark(models.Model):
+    """Highest source row id already folded into the rollups, per source."""
+
+    source = models.CharField(max_length=32, unique=True)
+    last_id = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"{self.source} ≤ {self.last_id}"
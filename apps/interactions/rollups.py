@@ -0,0 +1,199 @@
+"""
+Hourly and daily engagement rollups.
+
+``build_rollups`` folds rows of the raw interaction tables (shares, saves,
+ratings, comments) into ``EngagementRollup`` counts, shares split by platform.  Each source has a
+``RollupWatermark`` holding the highest row id already counted; a run reads
+only ids above it, grouped by recipe and hour/day in the database, and moves
+the watermark in the same transaction as the counts, so every row is counted
+exactly once however often the command runs.  Rows inserted less than
+``lag`` ago are left for the next run, giving transactions that committed out
+of id order time to land.  Shares are written in batches behind the request,
+so for them that is ``inserted_at``, not the request's ``created_at``.
+
+``trend_series`` and ``share_totals`` serve charts and share statistics from
+the rollups, never from the raw tables.
+"""
+
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Count, F, Max, Sum, Value
+from django.db.models.functions import TruncDay, TruncHour
+from django.utils import timezone
+
+from apps.recipes.cache import invalidate
+
+from .models import Comment, EngagementRollup, Rating, RecipeShare, RollupWatermark, SavedRecipe
+
+# Metric → (model, bucket timestamp field, insert timestamp field, platform field or None).
+SOURCES = {
+    "share": (RecipeShare, "created_at", "inserted_at", "platform"),
+    "save": (SavedRecipe, "created_at", "created_at", None),
+    "rating": (Rating, "created_at", "created_at", None),
+    "comment": (Comment, "created_at", "created_at", None),
+}
+METRICS = tuple(SOURCES)
+PERIODS = {
+    "hour": (TruncHour, timedelta(hours=1)),
+    "day": (TruncDay, timedelta(days=1)),
+}
+
+# Cache namespace of the trend endpoints; bumped after every run.
+ENGAGEMENT = "engagement"
+
+
+def _upper_bound(model, field, after_id, lag):
+    """Highest id above ``after_id`` whose row was inserted at least ``lag`` ago."""
+    cutoff = timezone.now() - lag
+    return (
+        model.objects.filter(pk__gt=after_id, **{f"{field}__lte": cutoff})
+        .aggregate(upper=Max("pk"))["upper"]
+    )
+
+
+def _apply(increments) -> None:
+    """Add ``{(recipe_id, metric, period, bucket, platform): n}`` to the rollup table."""
+    if not increments:
+        return
+    existing = {
+        (row.recipe_id, row.metric, row.period, row.bucket, row.platform): row
+        for row in EngagementRollup.objects.select_for_update().filter(
+            recipe_id__in={key[0] for key in increments},
+            metric__in={key[1] for key in increments},
+            period__in={key[2] for key in increments},
+            bucket__in={key[3] for key in increments},
+        )
+    }
+    changed, created = [], []
+    for key, total in increments.items():
+        row = existing.get(key)
+        if row is None:
+            recipe_id, metric, period, bucket, platform = key
+            created.append(EngagementRollup(
+                recipe_id=recipe_id, metric=metric, period=period, bucket=bucket, platform=platform, count=total,
+            ))
+        else:
+            row.count += total
+            changed.append(row)
+    EngagementRollup.objects.bulk_update(changed, ["count"], batch_size=1000)
+    EngagementRollup.objects.bulk_create(created, batch_size=1000)
+
+
+@transaction.atomic
+def _fold_chunk(metric, upper, chunk_size):
+    """Fold the next ``chunk_size`` ids (at most up to ``upper``); ``None`` when caught up."""
+    model, field, _, platform_field = SOURCES[metric]
+    # Locking the watermark serialises concurrent runs, so no id is counted twice.
+    watermark = RollupWatermark.objects.select_for_update().get(source=metric)
+    if watermark.last_id >= upper:
+        return None
+    chunk_upper = min(upper, watermark.last_id + chunk_size)
+
+    rows = model.objects.filter(pk__gt=watermark.last_id, pk__lte=chunk_upper).order_by()
+    increments = {}
+    processed = 0
+    for period, (trunc, _) in PERIODS.items():
+        platform = F(platform_field) if platform_field else Value("")
+        grouped = (
+            rows.annotate(bucket=trunc(field), rollup_platform=platform)
+            .values("recipe_id", "bucket", "rollup_platform")
+            .annotate(total=Count("pk"))
+            .values_list("recipe_id", "bucket", "rollup_platform", "total")
+        )
+        for recipe_id, bucket, platform, total in grouped:
+            increments[(recipe_id, metric, period, bucket, platform)] = total
+            if period == "day":
+                processed += total
+    _apply(increments)
+    watermark.last_id = chunk_upper
+    watermark.save(update_fields=["last_id", "updated_at"])
+    return processed
+
+
+def build_rollups(metrics=METRICS, lag=timedelta(minutes=2), chunk_size=10_000) -> dict[str, int]:
+    """
+    Fold every new row of ``metrics`` into the rollups, ``chunk_size`` ids at
+    a time.  Returns the number of rows counted per metric.
+    """
+    counted = {}
+    for metric in metrics:
+        model, _, inserted_field, _ = SOURCES[metric]
+        watermark, _ = RollupWatermark.objects.get_or_create(source=metric)
+        upper = _upper_bound(model, inserted_field, watermark.last_id, lag)
+        counted[metric] = 0
+        while upper is not None:
+            processed = _fold_chunk(metric, upper, chunk_size)
+            if processed is None:
+                break
+            counted[metric] += processed
+    if any(counted.values()):
+        invalidate(ENGAGEMENT)
+    return counted
+
+
+def prune_hourly(older_than: timedelta) -> int:
+    """Delete hourly rollups older than ``older_than``; daily ones are kept."""
+    deleted, _ = EngagementRollup.objects.filter(
+        period="hour", bucket__lt=timezone.now() - older_than
+    ).delete()
+    return deleted
+
+
+def _window_start(period, buckets):
+    """Start of the last ``buckets`` hours/days, the current one included."""
+    _, step = PERIODS[period]
+    now = timezone.localtime()
+    if period == "hour":
+        end = now.replace(minute=0, second=0, microsecond=0)
+    else:
+        end = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return end - step * (buckets - 1)
+
+
+def trend_series(period, buckets, metrics=METRICS, recipe_id=None) -> dict:
+    """
+    Per-metric series of the last ``buckets`` hours/days, zero-filled and
+    oldest first, for one recipe or (``recipe_id=None``) the whole site.
+    """
+    _, step = PERIODS[period]
+    start = _window_start(period, buckets)
+
+    rollups = EngagementRollup.objects.filter(period=period, metric__in=metrics, bucket__gte=start)
+    if recipe_id is not None:
+        rollups = rollups.filter(recipe_id=recipe_id)
+    totals = {
+        (metric, bucket): total
+        for metric, bucket, total in rollups.order_by()
+        .values("metric", "bucket")
+        .annotate(total=Sum("count"))
+        .values_list("metric", "bucket", "total")
+    }
+
+    timeline = [start + step * index for index in range(buckets)]
+    return {
+        "period": period,
+        "start": start,
+        "series": {
+            metric: [{"bucket": bucket, "count": totals.get((metric, bucket), 0)} for bucket in timeline]
+            for metric in metrics
+        },
+    }
+
+
+def share_totals(recipe_id, days) -> dict:
+    """A recipe's shares of the last ``days`` days, per platform and per day (oldest first)."""
+    rollups = EngagementRollup.objects.filter(
+        recipe_id=recipe_id, metric="share", period="day", bucket__gte=_window_start("day", days)
+    ).order_by("bucket")
+    by_platform, by_day = {}, {}
+    for bucket, platform, count in rollups.values_list("bucket", "platform", "count"):
+        by_platform[platform] = by_platform.get(platform, 0) + count
+        day = timezone.localdate(bucket)
+        by_day[day] = by_day.get(day, 0) + count
+    return {
+        "days": days,
+        "total": sum(by_platform.values()),
+        "by_platform": by_platform,
+        "by_day": [{"day": day, "total": total} for day, total in by_day.items()],
+    }
@@ -3,6 +3,7 @@ from rest_framework import serializers
 
 from apps.recipes.serializers import RecipeListSerializer
 from apps.users.serializers import UserPublicSerializer
+from .comments import load_comment_tree
 from .models import Comment, Rating, RecipeShare, SavedRecipe
 
 
@@ -20,21 +21,73 @@ class RatingSerializer(serializers.ModelSerializer):
         return value
 
 
+class BulkRatingItemSerializer(serializers.Serializer):
+    recipe_id = serializers.IntegerField(min_value=1)
+    score = serializers.IntegerField(min_value=1, max_value=5)
+
+
+class BulkRatingSerializer(serializers.Serializer):
+    MAX_BATCH = 500
+
+    ratings = BulkRatingItemSerializer(many=True, allow_empty=False, max_length=MAX_BATCH)
+
+
+class BulkRatingResultSerializer(serializers.Serializer):
+    created = serializers.IntegerField()
+    updated = serializers.IntegerField()
+    unchanged = serializers.IntegerField()
+    skipped = serializers.ListField(child=serializers.IntegerField())
+
+
 class CommentSerializer(serializers.ModelSerializer):
     author = UserPublicSerializer(read_only=True)
     replies = serializers.SerializerMethodField()
+    reply_count = serializers.SerializerMethodField()
+    descendant_count = serializers.SerializerMethodField()
 
     class Meta:
         model = Comment
-        fields = ("id", "author", "parent", "body", "is_edited", "replies", "created_at", "updated_at")
+        fields = (
+            "id", "author", "parent", "depth", "body", "is_edited",
+            "reply_count", "descendant_count", "replies",
+            "last_activity_at", "created_at", "updated_at",
+        )
         read_only_fields = ("id", "author", "is_edited", "created_at", "updated_at")
 
+    def validate_parent(self, value):
+        if self.instance is not None and value != self.instance.parent:
+            raise serializers.ValidationError("A comment can't be moved to another thread.")
+        return value
+
+    def _load_tree(self, obj):
+        # Views load whole pages at once; this only runs for single objects.
+        if not hasattr(obj, "loaded_replies"):
+            load_comment_tree([obj], **self.context.get("comment_tree", {}))
+
     def get_replies(self, obj):
-        """Return one level of replies (children only)."""
-        if obj.parent is not None:
-            return []
-        qs = obj.replies.select_related("author").order_by("created_at")
-        return CommentSerializer(qs, many=True).data
+        """Replies loaded by ``load_comment_tree``, serialized recursively."""
+        self._load_tree(obj)
+        return CommentSerializer(obj.loaded_replies, many=True, context=self.context).data
+
+    def get_reply_count(self, obj) -> int:
+        self._load_tree(obj)
+        return obj.reply_count
+
+    def get_descendant_count(self, obj) -> int | None:
+        """Whole-subtree size; only computed for the top level of a response."""
+        self._load_tree(obj)
+        return getattr(obj, "descendant_count", None)
+
+
+class CommentThreadSerializer(serializers.ModelSerializer):
+    """Flat thread item — the tree shape is given by ``parent`` and ``depth``."""
+
+    author = UserPublicSerializer(read_only=True)
+
+    class Meta:
+        model = Comment
+        fields = ("id", "author", "parent", "depth", "body", "is_edited", "created_at", "updated_at")
+        read_only_fields = fields
 
 
 class SavedRecipeSerializer(serializers.ModelSerializer):
@@ -50,4 +103,27 @@ class RecipeShareSerializer(serializers.ModelSerializer):
     class Meta:
         model = RecipeShare
         fields = ("id", "platform", "created_at")
-        read_only_fields = ("id", "created_at")
\ No newline at end of file
+        read_only_fields = ("id", "created_at")
+
+
+class ShareDaySerializer(serializers.Serializer):
+    day = serializers.DateField()
+    total = serializers.IntegerField()
+
+
+class ShareStatsSerializer(serializers.Serializer):
+    days = serializers.IntegerField()
+    total = serializers.IntegerField()
+    by_platform = serializers.DictField(child=serializers.IntegerField())
+    by_day = ShareDaySerializer(many=True)
+
+
+class TrendPointSerializer(serializers.Serializer):
+    bucket = serializers.DateTimeField()
+    count = serializers.IntegerField()
+
+
+class TrendSerializer(serializers.Serializer):
+    period = serializers.CharField()
+    start = serializers.DateTimeField()
+    series = serializers.DictField(child=TrendPointSerializer(many=True))
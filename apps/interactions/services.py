@@ -0,0 +1,168 @@
+from collections import Counter
+
+from django.contrib.auth import get_user_model
+from django.db import transaction
+from django.db.models import Case, DecimalField, F, FloatField, Value, When
+from django.db.models.functions import Greatest, Round
+from django.db.models.lookups import GreaterThan
+
+from apps.notifications.services import create_notifications
+from apps.recipes.cache import invalidate_recipe_counters
+from apps.recipes.models import Recipe
+from apps.recipes.trending import trending_update, weight_of
+
+from .models import Rating, RecipeShare
+
+
+def apply_rating_delta(recipe_id: int, score_delta: int, count_delta: int) -> None:
+    """
+    Apply a change to a recipe's denormalised rating in one atomic UPDATE.
+
+    ``rating_sum`` and ``review_count`` move by the given deltas and ``rating``
+    is recomputed from the *new* values in the same statement, so the cost is
+    O(1) however many ratings the recipe has and concurrent votes can't lose
+    updates.  New ratings also count towards the trending score.
+    """
+    new_sum = F("rating_sum") + score_delta
+    new_count = F("review_count") + count_delta
+    average = Round(new_sum * Value(1.0) / new_count, 1, output_field=FloatField())
+
+    changes = {}
+    if count_delta > 0:
+        changes["trending_score"] = trending_update(weight_of({"rating": count_delta}))
+    Recipe.objects.filter(pk=recipe_id).update(
+        rating_sum=new_sum,
+        review_count=new_count,
+        rating=Case(
+            When(GreaterThan(new_count, 0), then=average),
+            default=Value(0),
+            output_field=DecimalField(max_digits=3, decimal_places=1),
+        ),
+        **changes,
+    )
+    invalidate_recipe_counters(recipe_id)
+
+
+def adjust_recipe_counters(recipe_id: int, activity=None, at=None, **deltas: int) -> None:
+    """
+    Move the recipe's engagement counters (``comment_count``, ``save_count``,
+    ``share_count``) by ``deltas`` in one atomic UPDATE, never below zero.
+
+    ``activity`` (e.g. ``{"save": 1}``) is added to the trending score in the
+    same statement, as of ``at`` (default: now).
+    """
+    changes = {
+        field: Greatest(F(field) + delta, Value(0)) if delta < 0 else F(field) + delta
+        for field, delta in deltas.items()
+        if delta
+    }
+    if activity:
+        changes["trending_score"] = trending_update(weight_of(activity), at)
+    if changes:
+        Recipe.objects.filter(pk=recipe_id).update(**changes)
+        invalidate_recipe_counters(recipe_id)
+
+
+def lock_ratings(user) -> None:
+    """
+    Serialize writes of ``user``'s ratings until the transaction ends.
+
+    A rating that doesn't exist yet has no row to lock, so two writers could
+    both see "no previous score" and both count a new review; locking the
+    user row instead makes every rating write of one user wait its turn.
+    """
+    list(get_user_model().objects.select_for_update().filter(pk=user.pk).values_list("pk", flat=True))
+
+
+@transaction.atomic
+def bulk_rate(user, scores) -> dict:
+    """
+    Upsert many of ``user``'s ratings at once.
+
+    ``scores`` is an iterable of ``(recipe_id, score)`` pairs; when a recipe
+    appears more than once the last score wins.  Unknown or unpublished
+    recipes are skipped.  The work is a fixed number of queries — one lookup
+    of the recipes, one of the user's existing scores (under
+    ``lock_ratings``), one upsert and one notification insert — plus one
+    aggregate UPDATE per changed recipe.
+    """
+    wanted = dict(scores)
+    recipes = {
+        recipe.pk: recipe
+        for recipe in Recipe.objects.filter(pk__in=wanted, is_published=True).only("pk", "name", "author_id")
+    }
+    lock_ratings(user)
+    previous = dict(
+        Rating.objects.filter(user=user, recipe_id__in=recipes).values_list("recipe_id", "score")
+    )
+
+    rows, deltas, notifications = [], {}, []
+    for recipe_id, recipe in recipes.items():
+        score = wanted[recipe_id]
+        old = previous.get(recipe_id)
+        if old == score:
+            continue
+        rows.append(Rating(recipe_id=recipe_id, user=user, score=score))
+        if old is None:
+            deltas[recipe_id] = (score, 1)
+            notifications.append({
+                "recipient_id": recipe.author_id,
+                "actor": user,
+                "verb": f"rated your recipe '{recipe.name}'",
+                "notification_type": "rating",
+                "target_id": recipe_id,
+            })
+        else:
+            deltas[recipe_id] = (score - old, 0)
+
+    Rating.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["recipe", "user"],
+        update_fields=["score", "updated_at"],
+    )
+    # bulk_create sends no signals, so the aggregates are moved here.
+    for recipe_id, (score_delta, count_delta) in deltas.items():
+        apply_rating_delta(recipe_id, score_delta, count_delta)
+    create_notifications(notifications)
+
+    created = sum(1 for _, count in deltas.values() if count)
+    return {
+        "created": created,
+        "updated": len(deltas) - created,
+        "unchanged": len(recipes) - len(deltas),
+        "skipped": sorted(set(wanted) - recipes.keys()),
+    }
+
+
+@transaction.atomic
+def record_shares(events) -> int:
+    """
+    Persist a batch of share events: one ``bulk_create`` of the raw rows and
+    one ``share_count`` bump per recipe.  ``build_engagement_rollups`` folds
+    the rows into the per-platform analytics later.
+
+    Each event is a dict with ``recipe_id``, ``user_id`` (or ``None``),
+    ``platform`` and ``created_at``.
+    """
+    events = list(events)
+    live = set(Recipe.objects.filter(pk__in={e["recipe_id"] for e in events}).values_list("pk", flat=True))
+    events = [event for event in events if event["recipe_id"] in live]
+    if not events:
+        return 0
+
+    RecipeShare.objects.bulk_create([
+        RecipeShare(
+            recipe_id=event["recipe_id"],
+            shared_by_id=event["user_id"],
+            platform=event["platform"],
+            created_at=event["created_at"],
+        )
+        for event in events
+    ])
+    latest = {}
+    for event in events:
+        latest[event["recipe_id"]] = max(event["created_at"], latest.get(event["recipe_id"], event["created_at"]))
+    for recipe_id, total in Counter(event["recipe_id"] for event in events).items():
+        adjust_recipe_counters(recipe_id, activity={"share": total}, at=latest[recipe_id], share_count=total)
+    return len(events)
@@ -0,0 +1,38 @@
+"""
+Write-behind pipeline for share events.
+
+``RecipeShareView`` only appends an event to ``share_writer``; a background
+thread writes the buffered events in batches with ``record_shares`` (raw
+``RecipeShare`` rows and ``Recipe.share_count``).
+Configured by ``settings.SHARE_EVENTS``.
+"""
+
+from django.conf import settings
+from django.utils import timezone
+
+from apps.core.batching import BatchWriter
+
+from .services import record_shares
+
+_config = getattr(settings, "SHARE_EVENTS", {})
+
+share_writer = BatchWriter(
+    "shares",
+    record_shares,
+    batch_size=_config.get("BATCH_SIZE", 500),
+    flush_interval=_config.get("FLUSH_INTERVAL", 2.0),
+    max_pending=_config.get("MAX_PENDING", 10_000),
+    run_async=_config.get("ASYNC", True),
+)
+
+
+def log_share(recipe_id: int, user, platform: str) -> dict:
+    """Queue a share event and return it."""
+    event = {
+        "recipe_id": recipe_id,
+        "user_id": user.pk if user is not None and user.is_authenticated else None,
+        "platform": platform,
+        "created_at": timezone.now(),
+    }
+    share_writer.submit(event)
+    return event
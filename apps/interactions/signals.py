@@ -1,24 +1,36 @@
-from django.db.models import Avg
-from django.db.models.signals import post_delete, post_save
+from django.db.models.signals import post_delete, post_save, pre_save
 from django.dispatch import receiver
 
 from .models import Rating
+from .services import apply_rating_delta
 
 
-def _refresh_recipe_rating(recipe):
-    """Recompute the denormalised rating fields on the recipe."""
-    agg = Rating.objects.filter(recipe=recipe).aggregate(avg=Avg("score"))
-    avg = round(agg["avg"] or 0, 1)
-    count = Rating.objects.filter(recipe=recipe).count()
-    recipe.__class__.objects.filter(pk=recipe.pk).update(rating=avg, review_count=count)
+@receiver(pre_save, sender=Rating)
+def on_rating_pre_save(sender, instance, raw=False, **kwargs):
+    # Ratings loaded from the database already know their stored score.
+    if raw or instance.pk is None or hasattr(instance, "_loaded_score"):
+        return
+    instance._loaded_score = (
+        Rating.objects.filter(pk=instance.pk).values_list("score", flat=True).first()
+    )
 
 
 @receiver(post_save, sender=Rating)
-def on_rating_save(sender, instance, **kwargs):
-    _refresh_recipe_rating(instance.recipe)
+def on_rating_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    if created:
+        apply_rating_delta(instance.recipe_id, instance.score, 1)
+    else:
+        previous = getattr(instance, "_loaded_score", None)
+        if previous is None:
+            apply_rating_delta(instance.recipe_id, instance.score, 1)
+        elif instance.score != previous:
+            apply_rating_delta(instance.recipe_id, instance.score - previous, 0)
+    instance._loaded_score = instance.score
 
 
 @receiver(post_delete, sender=Rating)
 def on_rating_delete(sender, instance, **kwargs):
-    _refresh_recipe_rating(instance.recipe)
-    
\ No newline at end of file
+    score = getattr(instance, "_loaded_score", None) or instance.score
+    apply_rating_delta(instance.recipe_id, -score, -1)
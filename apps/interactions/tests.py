@@ -1,3 +1,527 @@
-from django.test import TestCase
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from apps.core.batching import BatchWriter
+from apps.notifications.models import Notification
+from apps.recipes.models import Recipe
+
+from .comments import subtree
+from .models import (
+    Comment, EngagementRollup, Rating, RecipeShare, RollupWatermark, SavedRecipe, encode_path_step,
+)
+from .rollups import build_rollups
+from .services import adjust_recipe_counters, record_shares
+
+User = get_user_model()
+
+
+class InteractionTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.author = User.objects.create_user(username="author", email="author@example.com")
+        self.voters = [
+            User.objects.create_user(username=f"voter{number}", email=f"voter{number}@example.com")
+            for number in range(3)
+        ]
+        self.recipe = Recipe.objects.create(author=self.author, name="Pizza", ingredients=["Flour"])
+
+    def seed(self, recipe, rating, review_count):
+        """Give ``recipe`` the aggregate an import would have brought."""
+        rating_sum = round(rating * review_count)
+        Recipe.objects.filter(pk=recipe.pk).update(
+            rating=rating, review_count=review_count, rating_sum=rating_sum,
+            imported_rating_sum=rating_sum, imported_review_count=review_count,
+        )
+
+    def aggregate(self, recipe=None):
+        recipe = Recipe.objects.get(pk=(recipe or self.recipe).pk)
+        return float(recipe.rating), recipe.review_count, recipe.rating_sum
+
+    def reconcile(self, *args):
+        out = StringIO()
+        call_command("reconcile_recipe_stats", *args, stdout=out)
+        return out.getvalue()
+
+
+# ─── Rating aggregates ─────────────────────────────────────────────────────────
+
+class RatingAggregateTests(InteractionTestCase):
+    def test_votes_move_the_aggregate_incrementally(self):
+        first = Rating.objects.create(recipe=self.recipe, user=self.voters[0], score=5)
+        Rating.objects.create(recipe=self.recipe, user=self.voters[1], score=2)
+        self.assertEqual(self.aggregate(), (3.5, 2, 7))
+
+        first.score = 3
+        first.save()
+        self.assertEqual(self.aggregate(), (2.5, 2, 5))
+
+        Rating.objects.get(pk=first.pk).delete()
+        self.assertEqual(self.aggregate(), (2.0, 1, 2))
+
+    def test_votes_blend_into_an_imported_aggregate(self):
+        self.seed(self.recipe, 4.5, 10)
+        Rating.objects.create(recipe=self.recipe, user=self.voters[0], score=1)
+        self.assertEqual(self.aggregate(), (4.2, 11, 46))
+
+    def test_a_full_save_keeps_concurrent_votes(self):
+        stale = Recipe.objects.get(pk=self.recipe.pk)
+        Rating.objects.create(recipe=self.recipe, user=self.voters[0], score=4)
+        stale.name = "Pizza Bianca"
+        stale.save()
+        self.assertEqual(self.aggregate(), (4.0, 1, 4))
+
+
+class BulkRatingTests(InteractionTestCase):
+    def setUp(self):
+        super().setUp()
+        self.voter = self.voters[0]
+        self.client.force_authenticate(self.voter)
+        self.soup = Recipe.objects.create(author=self.author, name="Soup")
+        self.draft = Recipe.objects.create(author=self.author, name="Draft", is_published=False)
+
+    def bulk(self, *pairs):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                "/api/v1/interactions/ratings/bulk/",
+                {"ratings": [{"recipe_id": pk, "score": score} for pk, score in pairs]},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data
+
+    def rate(self, recipe, score):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(f"/api/v1/interactions/recipes/{recipe.pk}/rate/", {"score": score})
+
+    def test_creates_updates_and_reports_each_vote(self):
+        Rating.objects.create(recipe=self.soup, user=self.voter, score=2)
+        result = self.bulk(
+            (self.recipe.pk, 3), (self.recipe.pk, 5), (self.soup.pk, 4), (self.draft.pk, 1), (999999, 1),
+        )
+        self.assertEqual(result, {"created": 1, "updated": 1, "unchanged": 0, "skipped": [self.draft.pk, 999999]})
+        self.assertEqual(self.aggregate(), (5.0, 1, 5))
+        self.assertEqual(self.aggregate(self.soup), (4.0, 1, 4))
+
+        result = self.bulk((self.recipe.pk, 5))
+        self.assertEqual(result["unchanged"], 1)
+        self.assertEqual(self.aggregate(), (5.0, 1, 5))
+
+    def test_single_and_bulk_votes_count_one_review(self):
+        self.assertEqual(self.rate(self.recipe, 2).status_code, 201)
+        self.assertEqual(self.bulk((self.recipe.pk, 4))["updated"], 1)
+        response = self.rate(self.recipe, 5)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["score"], 5)
+        self.assertEqual(self.aggregate(), (5.0, 1, 5))
+        self.assertEqual(Rating.objects.filter(recipe=self.recipe).count(), 1)
+
+    def test_only_new_votes_notify_the_author(self):
+        self.bulk((self.recipe.pk, 3), (self.soup.pk, 4))
+        self.bulk((self.recipe.pk, 1))
+        self.rate(self.soup, 2)
+        notifications = Notification.objects.filter(recipient=self.author, notification_type="rating")
+        self.assertCountEqual(notifications.values_list("target_id", flat=True), [self.recipe.pk, self.soup.pk])
+
+    def test_deleting_a_vote_removes_it_from_the_aggregate(self):
+        self.seed(self.recipe, 4.0, 2)
+        self.rate(self.recipe, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.delete(f"/api/v1/interactions/recipes/{self.recipe.pk}/rate/")
+        self.assertEqual(response.status_code, 204)
+        self.assertEqual(self.aggregate(), (4.0, 2, 8))
+        response = self.client.delete(f"/api/v1/interactions/recipes/{self.recipe.pk}/rate/")
+        self.assertEqual(response.status_code, 404)
+
+
+class ReconcileRecipeStatsTests(InteractionTestCase):
+    def test_consistent_aggregates_are_left_alone(self):
+        self.seed(self.recipe, 4.5, 10)
+        Rating.objects.create(recipe=self.recipe, user=self.voters[0], score=5)
+        unrated = Recipe.objects.create(author=self.author, name="Soup")
+        self.seed(unrated, 3.0, 4)
+
+        self.assertIn("Ratings: 0 recipe(s) repaired.", self.reconcile())
+        self.assertEqual(self.aggregate(), (4.5, 11, 50))
+        self.assertEqual(self.aggregate(unrated), (3.0, 4, 12))
+
+    def test_drift_is_repaired_to_imported_baseline_plus_votes(self):
+        self.seed(self.recipe, 4.0, 5)
+        for voter, score in zip(self.voters, (5, 3, 1)):
+            Rating.objects.create(recipe=self.recipe, user=voter, score=score)
+        Recipe.objects.filter(pk=self.recipe.pk).update(rating=1, rating_sum=3, review_count=1)
+
+        self.assertIn("Ratings: 1 recipe(s) repaired.", self.reconcile())
+        self.assertEqual(self.aggregate(), (3.6, 8, 29))
+
+    def test_engagement_counters_are_repaired(self):
+        Recipe.objects.filter(pk=self.recipe.pk).update(comment_count=7, save_count=3, share_count=2)
+        other = Recipe.objects.create(author=self.author, name="Soup")
+        Recipe.objects.filter(pk=other.pk).update(save_count=1)
+
+        self.assertIn("Counters: 1 recipe(s) repaired.", self.reconcile("--recipe", str(self.recipe.pk)))
+        self.recipe.refresh_from_db()
+        self.assertEqual((self.recipe.comment_count, self.recipe.save_count, self.recipe.share_count), (0, 0, 0))
+        self.assertEqual(Recipe.objects.get(pk=other.pk).save_count, 1)
+
+
+# ─── Comment threads ───────────────────────────────────────────────────────────
+
+class CommentTestCase(InteractionTestCase):
+    def comment(self, parent=None, body="Nice", recipe=None):
+        recipe = parent.recipe if parent else recipe or self.recipe
+        return Comment.objects.create(recipe=recipe, author=self.author, parent=parent, body=body)
+
+    def thread(self, replies=2, depth=2):
+        """A top-level comment with ``replies`` replies per comment, ``depth`` levels deep."""
+        root = self.comment()
+        level = [root]
+        for _ in range(depth):
+            level = [self.comment(parent) for parent in level for _ in range(replies)]
+        return root
+
+
+class CommentTreeLoadingTests(CommentTestCase):
+    url = property(lambda self: f"/api/v1/interactions/recipes/{self.recipe.pk}/comments/")
+
+    def count_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            self.assertEqual(self.client.get(self.url).status_code, 200)
+        return len(context.captured_queries)
+
+    def test_queries_do_not_grow_with_the_number_of_threads(self):
+        self.thread()
+        self.thread()
+        queries = self.count_queries()
+        for _ in range(4):
+            self.thread()
+        self.assertEqual(self.count_queries(), queries)
+
+    def test_replies_are_capped_and_counted_per_level(self):
+        root = self.thread(replies=4, depth=3)
+        response = self.client.get(self.url, {"reply_limit": 2, "depth": 2})
+        [item] = response.data["results"]
+        self.assertEqual(item["id"], root.pk)
+        self.assertEqual(item["reply_count"], 4)
+        self.assertEqual(item["descendant_count"], 4 + 16 + 64)
+        self.assertEqual(len(item["replies"]), 2)
+        child = item["replies"][0]
+        self.assertEqual((child["reply_count"], len(child["replies"])), (4, 2))
+        grandchild = child["replies"][0]
+        # Below ``depth`` replies are only counted.
+        self.assertEqual((grandchild["reply_count"], grandchild["replies"]), (4, []))
+
+    def test_replies_come_oldest_first_and_pages_continue_them(self):
+        root = self.comment()
+        replies = [self.comment(root, body=f"Reply {number}") for number in range(5)]
+        response = self.client.get(self.url, {"reply_limit": 3})
+        loaded = response.data["results"][0]["replies"]
+        self.assertEqual([item["id"] for item in loaded], [reply.pk for reply in replies[:3]])
+
+        response = self.client.get(f"/api/v1/interactions/comments/{root.pk}/replies/")
+        self.assertEqual([item["id"] for item in response.data["results"]], [reply.pk for reply in replies])
+
+    def test_out_of_range_options_are_rejected(self):
+        self.thread()
+        self.assertEqual(self.client.get(self.url, {"depth": 99}).status_code, 400)
+        self.assertEqual(self.client.get(self.url, {"reply_limit": "x"}).status_code, 400)
+
+
+class CommentPathTests(CommentTestCase):
+    def assertTreeConsistent(self):
+        """Every comment's path and depth match its chain of parents."""
+        comments = {comment.pk: comment for comment in Comment.objects.all()}
+        for comment in comments.values():
+            chain, node = [], comment
+            while node is not None:
+                chain.insert(0, node.pk)
+                node = comments.get(node.parent_id)
+            self.assertEqual(comment.path, "".join(encode_path_step(pk) for pk in chain))
+            self.assertEqual(comment.depth, len(chain) - 1)
+
+    def test_thread_endpoint_streams_the_subtree_depth_first(self):
+        root = self.comment()
+        first = self.comment(root)
+        second = self.comment(root)
+        nested = self.comment(first)
+        self.comment()  # another thread
+        response = self.client.get(f"/api/v1/interactions/comments/{root.pk}/thread/")
+        self.assertEqual(
+            [(item["id"], item["depth"]) for item in response.data["results"]],
+            [(root.pk, 0), (first.pk, 1), (nested.pk, 2), (second.pk, 1)],
+        )
+
+    def test_moving_a_comment_moves_its_subtree(self):
+        old_root, new_root = self.comment(), self.comment()
+        moved = self.comment(old_root)
+        below = self.comment(self.comment(moved))
+        self.comment(old_root)
+
+        moved.parent = new_root
+        moved.save()
+        self.assertTreeConsistent()
+        self.assertEqual(list(subtree(new_root).values_list("pk", flat=True))[-1], below.pk)
+        self.assertEqual(subtree(old_root).count(), 2)
+        self.assertGreaterEqual(Comment.objects.get(pk=new_root.pk).last_activity_at, below.created_at)
+
+        moved.parent = None
+        moved.save()
+        self.assertTreeConsistent()
+        self.assertEqual(Comment.objects.get(pk=below.pk).depth, 2)
+
+    def test_invalid_moves_are_refused(self):
+        root = self.comment()
+        child = self.comment(root)
+        grandchild = self.comment(child)
+        root.parent = grandchild
+        with self.assertRaises(ValueError):
+            root.save()
+
+        elsewhere = self.comment(recipe=Recipe.objects.create(author=self.author, name="Soup"))
+        child.parent = elsewhere
+        with self.assertRaises(ValueError):
+            child.save()
+        self.assertTreeConsistent()
+
+    def test_editing_a_stale_comment_keeps_the_tree_fields(self):
+        root = self.comment()
+        stale = Comment.objects.get(pk=root.pk)
+        reply = self.comment(root)
+        stale.body = "Edited"
+        stale.save()
+        root.refresh_from_db()
+        self.assertEqual((root.body, root.last_activity_at), ("Edited", reply.created_at))
+
+    def test_the_api_does_not_move_comments(self):
+        root, other = self.comment(), self.comment()
+        reply = self.comment(root)
+        self.client.force_authenticate(self.author)
+        response = self.client.patch(f"/api/v1/interactions/comments/{reply.pk}/", {"parent": other.pk})
+        self.assertEqual(response.status_code, 400)
+
+    def test_deleting_a_comment_deletes_its_subtree_and_counts_it(self):
+        self.client.force_authenticate(self.author)
+        root = self.thread(replies=2, depth=2)
+        keep = self.thread(replies=1, depth=1)
+        Recipe.objects.filter(pk=self.recipe.pk).update(comment_count=Comment.objects.count())
+
+        response = self.client.delete(f"/api/v1/interactions/comments/{root.pk}/")
+        self.assertEqual(response.status_code, 204)
+        remaining = Comment.objects.values_list("pk", flat=True)
+        self.assertCountEqual(remaining, subtree(keep).values_list("pk", flat=True))
+        self.assertEqual(Recipe.objects.get(pk=self.recipe.pk).comment_count, 2)
+
+
+# ─── Engagement counters ───────────────────────────────────────────────────────
+
+class EngagementCounterTests(InteractionTestCase):
+    def counters(self):
+        recipe = Recipe.objects.get(pk=self.recipe.pk)
+        return recipe.comment_count, recipe.save_count, recipe.share_count
+
+    def test_saving_toggles_the_save_count(self):
+        url = f"/api/v1/interactions/recipes/{self.recipe.pk}/save/"
+        for voter in self.voters:
+            self.client.force_authenticate(voter)
+            self.assertEqual(self.client.post(url).status_code, 201)
+        self.assertEqual(self.counters(), (0, 3, 0))
+        self.assertFalse(self.client.post(url).data["saved"])
+        self.assertEqual(self.counters(), (0, 2, 0))
+
+    def test_comments_are_counted_with_their_replies(self):
+        self.client.force_authenticate(self.voters[0])
+        url = f"/api/v1/interactions/recipes/{self.recipe.pk}/comments/"
+        root = self.client.post(url, {"body": "Great"}).data["id"]
+        self.client.post(url, {"body": "Agreed", "parent": root})
+        self.client.post(url, {"body": "Also"})
+        self.assertEqual(self.counters(), (3, 0, 0))
+        self.client.delete(f"/api/v1/interactions/comments/{root}/")
+        self.assertEqual(self.counters(), (1, 0, 0))
+
+    def test_shares_are_counted_in_batches(self):
+        now = timezone.now()
+        events = [
+            {"recipe_id": self.recipe.pk, "user_id": None, "platform": "link", "created_at": now},
+            {"recipe_id": self.recipe.pk, "user_id": self.voters[0].pk, "platform": "email", "created_at": now},
+            {"recipe_id": 999999, "user_id": None, "platform": "link", "created_at": now},
+        ]
+        self.assertEqual(record_shares(events), 2)
+        self.assertEqual(self.counters(), (0, 0, 2))
+
+    def test_counters_never_drop_below_zero(self):
+        adjust_recipe_counters(self.recipe.pk, comment_count=-5, save_count=2)
+        self.assertEqual(self.counters(), (0, 2, 0))
+
+    def test_a_full_save_keeps_concurrent_counts(self):
+        stale = Recipe.objects.get(pk=self.recipe.pk)
+        adjust_recipe_counters(self.recipe.pk, comment_count=1, save_count=1, share_count=1)
+        stale.description = "Edited"
+        stale.save()
+        self.assertEqual(self.counters(), (1, 1, 1))
+        self.assertEqual(Recipe.objects.get(pk=self.recipe.pk).description, "Edited")
+
+
+# ─── Share pipeline ────────────────────────────────────────────────────────────
+
+class SharePipelineTests(InteractionTestCase):
+    def share(self, platform, created_at, recipe=None):
+        return {
+            "recipe_id": (recipe or self.recipe).pk,
+            "user_id": None,
+            "platform": platform,
+            "created_at": created_at,
+        }
+
+    def test_backpressure_writes_one_batch_on_the_caller(self):
+        batches = []
+        writer = BatchWriter("test-backpressure", batches.append, batch_size=2, max_pending=5)
+        # No worker thread: only the producer flushes.
+        with mock.patch.object(writer, "_ensure_worker"):
+            for item in range(5):
+                writer.submit(item)
+            self.assertEqual(batches, [[0, 1]])
+            stats = writer.stats()
+            self.assertEqual((stats["pending"], stats["backpressure"]), (3, 1))
+
+            writer.submit(5)
+            self.assertEqual(len(batches), 1)
+        writer.flush()
+        self.assertEqual(batches, [[0, 1], [2, 3, 4, 5]])
+        self.assertEqual(writer.stats()["flushed"], 6)
+
+    def test_share_stats_are_read_from_the_engagement_rollups(self):
+        now = timezone.now()
+        yesterday = now - timedelta(days=1)
+        other = Recipe.objects.create(author=self.author, name="Curry", ingredients=["Rice"])
+        record_shares([
+            self.share("link", yesterday),
+            self.share("link", now),
+            self.share("email", now),
+            self.share("link", now, other),
+        ])
+        url = f"/api/v1/interactions/recipes/{self.recipe.pk}/shares/"
+        self.assertEqual(self.client.get(url).data["total"], 0)
+
+        self.assertEqual(build_rollups(lag=timedelta(0))["share"], 4)
+        data = self.client.get(url, {"days": 7}).data
+        self.assertEqual(data["total"], 3)
+        self.assertEqual(data["by_platform"], {"link": 2, "email": 1})
+        self.assertEqual(
+            [(day["day"], day["total"]) for day in data["by_day"]],
+            [(str(timezone.localdate(yesterday)), 1), (str(timezone.localdate(now)), 2)],
+        )
+        self.assertEqual(self.client.get(url, {"days": 1}).data["total"], 2)
+
+        # Site-wide trends add the platforms up.
+        trend = self.client.get("/api/v1/interactions/trends/", {"metric": "share", "buckets": 2}).data
+        self.assertEqual([point["count"] for point in trend["series"]["share"]], [1, 3])
+
+    def test_rollups_are_kept_per_platform_and_never_counted_twice(self):
+        now = timezone.now()
+        record_shares([self.share("link", now), self.share("email", now)])
+        build_rollups(lag=timedelta(0))
+        record_shares([self.share("link", now)])
+        build_rollups(lag=timedelta(0))
+        build_rollups(lag=timedelta(0))
+        daily = EngagementRollup.objects.filter(metric="share", period="day")
+        self.assertEqual(dict(daily.values_list("platform", "count")), {"link": 2, "email": 1})
+
+    def test_a_late_batch_does_not_move_the_watermark_past_uncommitted_shares(self):
+        # An id taken by a transaction that has not committed yet.
+        in_flight = RecipeShare.objects.create(recipe=self.recipe, platform="email")
+        in_flight_pk = in_flight.pk
+        in_flight.delete()
+        # A batch written now for shares requested ten minutes ago.
+        record_shares([self.share("link", timezone.now() - timedelta(minutes=10))])
+        self.assertEqual(build_rollups(metrics=["share"], lag=timedelta(minutes=2)), {"share": 0})
+
+        # The in-flight share commits below the batch's id, and both are counted once settled.
+        RecipeShare.objects.create(pk=in_flight_pk, recipe=self.recipe, platform="email")
+        RecipeShare.objects.update(inserted_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(build_rollups(metrics=["share"], lag=timedelta(minutes=2)), {"share": 2})
+
+
+# ─── Engagement rollups ────────────────────────────────────────────────────────
+
+class EngagementRollupTests(InteractionTestCase):
+    def engage(self):
+        """Two ratings, a comment and a save on the recipe, committed."""
+        with self.captureOnCommitCallbacks(execute=True):
+            for voter in self.voters[:2]:
+                Rating.objects.create(recipe=self.recipe, user=voter, score=4)
+            Comment.objects.create(recipe=self.recipe, author=self.voters[0], body="Nice")
+            SavedRecipe.objects.create(recipe=self.recipe, user=self.voters[2])
+
+    def build(self, *args):
+        out = StringIO()
+        call_command("build_engagement_rollups", "--lag", "0", *args, stdout=out)
+        return out.getvalue()
+
+    def rollups(self, period):
+        return dict(
+            EngagementRollup.objects.filter(recipe=self.recipe, period=period).values_list("metric", "count")
+        )
+
+    def test_every_row_is_counted_once_across_chunks_and_runs(self):
+        self.engage()
+        output = self.build("--chunk-size", "1")
+        self.assertIn("rating: 2 new row(s)", output)
+        expected = {"rating": 2, "comment": 1, "save": 1}
+        self.assertEqual(self.rollups("hour"), expected)
+        self.assertEqual(self.rollups("day"), expected)
+
+        self.assertIn("rating: 0 new row(s)", self.build())
+        self.assertEqual(self.rollups("day"), expected)
+        self.assertEqual(
+            RollupWatermark.objects.get(source="rating").last_id, Rating.objects.order_by("pk").last().pk
+        )
+
+    def test_rows_younger_than_the_lag_wait_for_a_later_run(self):
+        self.engage()
+        self.assertEqual(build_rollups(metrics=["rating"], lag=timedelta(minutes=2)), {"rating": 0})
+        Rating.objects.update(created_at=timezone.now() - timedelta(minutes=5))
+        self.assertEqual(build_rollups(metrics=["rating"], lag=timedelta(minutes=2)), {"rating": 2})
+
+    def test_old_hourly_rollups_are_pruned_and_daily_ones_kept(self):
+        self.engage()
+        self.build()
+        EngagementRollup.objects.update(bucket=timezone.now() - timedelta(days=3))
+        self.assertIn("Pruned 3 hourly rollup(s).", self.build("--keep-hourly-days", "2"))
+        self.assertEqual(self.rollups("hour"), {})
+        self.assertEqual(self.rollups("day"), {"rating": 2, "comment": 1, "save": 1})
+
+    def test_trend_endpoint_is_zero_filled_and_cached_until_the_next_run(self):
+        url = f"/api/v1/interactions/recipes/{self.recipe.pk}/trends/"
+        params = {"period": "hour", "buckets": 3, "metric": "rating,save"}
+        self.engage()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.build()
+
+        response = self.client.get(url, params)
+        self.assertEqual(response["X-Cache"], "MISS")
+        series = response.data["series"]
+        self.assertEqual(set(series), {"rating", "save"})
+        self.assertEqual([point["count"] for point in series["rating"]], [0, 0, 2])
+        self.assertEqual(self.client.get(url, params)["X-Cache"], "HIT")
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Rating.objects.create(recipe=self.recipe, user=self.voters[2], score=5)
+        self.assertEqual(self.client.get(url, params)["X-Cache"], "HIT")
+        with self.captureOnCommitCallbacks(execute=True):
+            self.build()
+        response = self.client.get(url, params)
+        self.assertEqual(response["X-Cache"], "MISS")
+        self.assertEqual(response.data["series"]["rating"][-1]["count"], 3)
+
+    def test_invalid_trend_parameters_are_rejected(self):
+        url = "/api/v1/interactions/trends/"
+        for params in ({"period": "week"}, {"buckets": 0}, {"buckets": "x"}, {"metric": "share,views"}):
+            self.assertEqual(self.client.get(url, params).status_code, 400, params)
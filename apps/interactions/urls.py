@@ -1,21 +1,34 @@
 from django.urls import path
 
 from .views import (
+    BulkRatingView,
     CommentDetailView,
+    CommentReplyListView,
+    CommentThreadView,
+    EngagementTrendView,
     RecipeCommentListCreateView,
     RecipeRatingListView,
     RecipeRatingView,
     RecipeSaveToggleView,
+    RecipeShareStatsView,
     RecipeShareView,
+    SharePipelineStatsView,
     SavedRecipeListView,
 )
 
 urlpatterns = [
     path("recipes/<int:recipe_id>/rate/", RecipeRatingView.as_view(), name="recipe-rate"),
+    path("ratings/bulk/", BulkRatingView.as_view(), name="ratings-bulk"),
     path("recipes/<int:recipe_id>/ratings/", RecipeRatingListView.as_view(), name="recipe-ratings"),
     path("recipes/<int:recipe_id>/comments/", RecipeCommentListCreateView.as_view(), name="recipe-comments"),
     path("comments/<int:pk>/", CommentDetailView.as_view(), name="comment-detail"),
+    path("comments/<int:pk>/replies/", CommentReplyListView.as_view(), name="comment-replies"),
+    path("comments/<int:pk>/thread/", CommentThreadView.as_view(), name="comment-thread"),
     path("saved/", SavedRecipeListView.as_view(), name="saved-list"),
     path("recipes/<int:recipe_id>/save/", RecipeSaveToggleView.as_view(), name="recipe-save"),
     path("recipes/<int:recipe_id>/share/", RecipeShareView.as_view(), name="recipe-share"),
+    path("recipes/<int:recipe_id>/shares/", RecipeShareStatsView.as_view(), name="recipe-share-stats"),
+    path("recipes/<int:recipe_id>/trends/", EngagementTrendView.as_view(), name="recipe-trends"),
+    path("trends/", EngagementTrendView.as_view(), name="engagement-trends"),
+    path("shares/pipeline/", SharePipelineStatsView.as_view(), name="share-pipeline-stats"),
 ]
\ No newline at end of file
@@ -1,17 +1,36 @@
+from django.db import transaction
 from django.shortcuts import get_object_or_404
-from drf_spectacular.utils import extend_schema, inline_serializer, OpenApiResponse
+from drf_spectacular.utils import extend_schema, inline_serializer, OpenApiParameter, OpenApiResponse
 from rest_framework import generics, permissions, serializers, status
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from apps.notifications.services import create_notification
+from apps.recipes.cache import CachedResponseMixin
 from apps.recipes.models import Recipe
-from .models import Comment, Rating, RecipeShare, SavedRecipe
+from .comments import (
+    DEFAULT_DEPTH,
+    DEFAULT_REPLY_LIMIT,
+    MAX_DEPTH,
+    MAX_REPLY_LIMIT,
+    load_comment_tree,
+    subtree,
+)
+from .models import MAX_COMMENT_DEPTH, Comment, Rating, SavedRecipe
+from .rollups import ENGAGEMENT, METRICS, PERIODS, share_totals, trend_series
+from .services import adjust_recipe_counters, bulk_rate, lock_ratings
+from .shares import log_share, share_writer
 from .serializers import (
+    BulkRatingResultSerializer,
+    BulkRatingSerializer,
     CommentSerializer,
+    CommentThreadSerializer,
     RatingSerializer,
     RecipeShareSerializer,
     SavedRecipeSerializer,
+    ShareStatsSerializer,
+    TrendSerializer,
 )
 
 
@@ -43,20 +62,11 @@ class RecipeRatingView(APIView):
         serializer = RatingSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
 
-        rating, created = Rating.objects.update_or_create(
-            recipe=recipe,
-            user=request.user,
-            defaults={"score": serializer.validated_data["score"]},
-        )
-
-        if created and recipe.author != request.user:
-            create_notification(
-                recipient=recipe.author,
-                actor=request.user,
-                verb=f"rated your recipe '{recipe.name}' {rating.score}/5",
-                notification_type="rating",
-                target_id=recipe.pk,
-            )
+        # Same path as bulk votes, so the two can't both count a new review.
+        with transaction.atomic():
+            result = bulk_rate(request.user, [(recipe.pk, serializer.validated_data["score"])])
+            rating = Rating.objects.get(recipe=recipe, user=request.user)
+        created = bool(result["created"])
 
         return Response(
             RatingSerializer(rating).data,
@@ -65,12 +75,40 @@ class RecipeRatingView(APIView):
 
     def delete(self, request, recipe_id):
         recipe = get_object_or_404(Recipe, pk=recipe_id)
-        deleted, _ = Rating.objects.filter(recipe=recipe, user=request.user).delete()
+        with transaction.atomic():
+            lock_ratings(request.user)
+            deleted, _ = Rating.objects.filter(recipe=recipe, user=request.user).delete()
         if deleted:
             return Response(status=status.HTTP_204_NO_CONTENT)
         return Response({"detail": "No rating found."}, status=status.HTTP_404_NOT_FOUND)
 
 
+@extend_schema(
+    request=BulkRatingSerializer,
+    responses={200: BulkRatingResultSerializer},
+    description="Create or update many of your ratings in one request "
+                f"(up to {BulkRatingSerializer.MAX_BATCH}).",
+)
+class BulkRatingView(APIView):
+    """
+    POST /api/v1/interactions/ratings/bulk/
+        body: {"ratings": [{"recipe_id": 1, "score": 1-5}, …]}
+    Upserts the calling user's ratings in one batch — e.g. votes queued by an
+    offline client.  Unknown or unpublished recipes are reported in ``skipped``.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = BulkRatingSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        result = bulk_rate(
+            request.user,
+            ((item["recipe_id"], item["score"]) for item in serializer.validated_data["ratings"]),
+        )
+        return Response(BulkRatingResultSerializer(result).data)
+
+
 class RecipeRatingListView(generics.ListAPIView):
     """GET /api/v1/interactions/recipes/<id>/ratings/ — all ratings for a recipe."""
 
@@ -86,28 +124,88 @@ class RecipeRatingListView(generics.ListAPIView):
 
 # ─── Comments ──────────────────────────────────────────────────────────────────
 
-class RecipeCommentListCreateView(generics.ListCreateAPIView):
+COMMENT_TREE_PARAMETERS = [
+    OpenApiParameter(
+        "reply_limit",
+        int,
+        description=f"Replies loaded per comment (1–{MAX_REPLY_LIMIT}, default {DEFAULT_REPLY_LIMIT}).",
+    ),
+    OpenApiParameter(
+        "depth",
+        int,
+        description=f"Levels of replies loaded (0–{MAX_DEPTH}, default {DEFAULT_DEPTH}).",
+    ),
+]
+
+
+def _bounded_int(request, name, default, minimum, maximum):
+    raw = request.query_params.get(name)
+    if raw in (None, ""):
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ValidationError({name: "Must be an integer."})
+    if not minimum <= value <= maximum:
+        raise ValidationError({name: f"Must be between {minimum} and {maximum}."})
+    return value
+
+
+class CommentTreeMixin:
+    """Load each page of comments together with their reply trees in batched queries."""
+
+    def get_comment_tree_options(self):
+        return {
+            "reply_limit": _bounded_int(self.request, "reply_limit", DEFAULT_REPLY_LIMIT, 1, MAX_REPLY_LIMIT),
+            "depth": _bounded_int(self.request, "depth", DEFAULT_DEPTH, 0, MAX_DEPTH),
+        }
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.request is not None and self.request.method == "GET":
+            context["comment_tree"] = self.get_comment_tree_options()
+        return context
+
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            page = load_comment_tree(page, **self.get_comment_tree_options())
+        return page
+
+
+@extend_schema(methods=["GET"], parameters=COMMENT_TREE_PARAMETERS)
+class RecipeCommentListCreateView(CommentTreeMixin, generics.ListCreateAPIView):
     """
     GET  /api/v1/interactions/recipes/<id>/comments/ — top-level comments with replies.
     POST /api/v1/interactions/recipes/<id>/comments/ — post a comment or reply.
+
+    Each thread carries up to ``reply_limit`` replies per comment, ``depth``
+    levels deep, plus ``reply_count`` / ``descendant_count``; fetch the rest
+    from ``/comments/<id>/replies/`` or ``/comments/<id>/thread/``.
+    ``?ordering=-last_activity_at`` lists the most recently active threads first.
     """
 
     serializer_class = CommentSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    ordering_fields = ["created_at", "last_activity_at"]
+    ordering = ["-created_at"]
 
     def get_queryset(self):
         if getattr(self, "swagger_fake_view", False):
             return Comment.objects.none()
         recipe = get_object_or_404(Recipe, pk=self.kwargs["recipe_id"])
-        return (
-            Comment.objects.filter(recipe=recipe, parent=None)
-            .select_related("author")
-            .prefetch_related("replies__author")
-        )
+        return Comment.objects.filter(recipe=recipe, depth=0).select_related("author")
 
     def perform_create(self, serializer):
         recipe = get_object_or_404(Recipe, pk=self.kwargs["recipe_id"])
-        comment = serializer.save(author=self.request.user, recipe=recipe)
+        parent = serializer.validated_data.get("parent")
+        if parent is not None and parent.recipe_id != recipe.pk:
+            raise ValidationError({"parent": "Reply to a comment on the same recipe."})
+        if parent is not None and parent.depth >= MAX_COMMENT_DEPTH:
+            raise ValidationError({"parent": "This thread is nested too deeply to reply to."})
+        with transaction.atomic():
+            comment = serializer.save(author=self.request.user, recipe=recipe)
+            adjust_recipe_counters(recipe.pk, activity={"comment": 1}, comment_count=1)
         # Notify recipe author (not self-comments)
         if recipe.author != self.request.user:
             create_notification(
@@ -120,7 +218,48 @@ class RecipeCommentListCreateView(generics.ListCreateAPIView):
         return comment
 
 
-class CommentDetailView(generics.RetrieveUpdateDestroyAPIView):
+@extend_schema(parameters=COMMENT_TREE_PARAMETERS)
+class CommentReplyListView(CommentTreeMixin, generics.ListAPIView):
+    """
+    GET /api/v1/interactions/comments/<id>/replies/ — direct replies to a
+    comment, oldest first, each with its own reply tree.
+    """
+
+    serializer_class = CommentSerializer
+    permission_classes = [permissions.AllowAny]
+
+    def get_queryset(self):
+        if getattr(self, "swagger_fake_view", False):
+            return Comment.objects.none()
+        parent = get_object_or_404(Comment, pk=self.kwargs["pk"])
+        return (
+            Comment.objects.filter(parent=parent)
+            .select_related("author")
+            .order_by("created_at", "pk")
+        )
+
+
+class CommentThreadView(generics.ListAPIView):
+    """
+    GET /api/v1/interactions/comments/<id>/thread/ — a comment and every reply
+    below it as one flat, depth-first list (each item carries ``depth``).
+    Read with one range query on the materialised path; use ``?cursor`` to
+    stream very large threads.
+    """
+
+    serializer_class = CommentThreadSerializer
+    permission_classes = [permissions.AllowAny]
+    filter_backends = []
+
+    def get_queryset(self):
+        if getattr(self, "swagger_fake_view", False):
+            return Comment.objects.none()
+        comment = get_object_or_404(Comment, pk=self.kwargs["pk"])
+        return subtree(comment).select_related("author")
+
+
+@extend_schema(methods=["GET"], parameters=COMMENT_TREE_PARAMETERS)
+class CommentDetailView(CommentTreeMixin, generics.RetrieveUpdateDestroyAPIView):
     """GET / PATCH / DELETE /api/v1/interactions/comments/<id>/"""
 
     serializer_class = CommentSerializer
@@ -140,6 +279,12 @@ class CommentDetailView(generics.RetrieveUpdateDestroyAPIView):
     def perform_update(self, serializer):
         serializer.save(is_edited=True)
 
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        # Replies go with the comment, so the counter drops by the subtree size.
+        _, deleted = instance.delete()
+        adjust_recipe_counters(instance.recipe_id, comment_count=-deleted.get(Comment._meta.label, 0))
+
 
 # ─── Saved Recipes (Favourites) ────────────────────────────────────────────────
 
@@ -177,10 +322,13 @@ class RecipeSaveToggleView(APIView):
 
     def post(self, request, recipe_id):
         recipe = get_object_or_404(Recipe, pk=recipe_id, is_published=True)
-        saved, created = SavedRecipe.objects.get_or_create(user=request.user, recipe=recipe)
-        if not created:
-            saved.delete()
-            return Response({"detail": "Recipe removed from saved.", "saved": False})
+        with transaction.atomic():
+            saved, created = SavedRecipe.objects.get_or_create(user=request.user, recipe=recipe)
+            if not created:
+                deleted, _ = saved.delete()
+                adjust_recipe_counters(recipe.pk, save_count=-deleted)
+                return Response({"detail": "Recipe removed from saved.", "saved": False})
+            adjust_recipe_counters(recipe.pk, activity={"save": 1}, save_count=1)
         return Response(
             {"detail": "Recipe saved.", "saved": True},
             status=status.HTTP_201_CREATED,
@@ -191,33 +339,130 @@ class RecipeSaveToggleView(APIView):
 
 @extend_schema(
     request=RecipeShareSerializer,
-    responses={201: inline_serializer("ShareResponse", fields={
-        "id": serializers.IntegerField(),
+    responses={202: inline_serializer("ShareResponse", fields={
         "platform": serializers.CharField(),
         "created_at": serializers.DateTimeField(),
         "share_url": serializers.URLField(),
     })},
-    description="Log a share event and receive a shareable URL.",
+    description="Log a share event and receive a shareable URL.  The event is "
+                "written in the background, so counts update within seconds.",
 )
 class RecipeShareView(APIView):
     """
     POST /api/v1/interactions/recipes/<id>/share/
         body: {"platform": "whatsapp"}
-    Logs a share event and returns a shareable URL.
+    Queues a share event (see ``apps.interactions.shares``) and returns a
+    shareable URL.
     """
 
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
     def post(self, request, recipe_id):
-        recipe = get_object_or_404(Recipe, pk=recipe_id, is_published=True)
+        recipe = get_object_or_404(Recipe.objects.only("pk"), pk=recipe_id, is_published=True)
         serializer = RecipeShareSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        share = serializer.save(
-            recipe=recipe,
-            shared_by=request.user if request.user.is_authenticated else None,
-        )
+        event = log_share(recipe.pk, request.user, serializer.validated_data["platform"])
         share_url = request.build_absolute_uri(f"/api/v1/recipes/{recipe.pk}/")
         return Response(
-            {**RecipeShareSerializer(share).data, "share_url": share_url},
-            status=status.HTTP_201_CREATED,
-        )
\ No newline at end of file
+            {
+                "platform": event["platform"],
+                "created_at": serializers.DateTimeField().to_representation(event["created_at"]),
+                "share_url": share_url,
+            },
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+@extend_schema(
+    parameters=[OpenApiParameter("days", int, description="Look-back window in days (default 30, max 365).")],
+    responses=ShareStatsSerializer,
+)
+class RecipeShareStatsView(APIView):
+    """
+    GET /api/v1/interactions/recipes/<id>/shares/?days=30
+    Share totals per platform and per day, read from the daily engagement
+    rollups (so as fresh as the last ``build_engagement_rollups`` run).
+    """
+
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, recipe_id):
+        recipe = get_object_or_404(Recipe.objects.only("pk"), pk=recipe_id, is_published=True)
+        days = _bounded_int(request, "days", 30, 1, 365)
+        return Response(ShareStatsSerializer(share_totals(recipe.pk, days)).data)
+
+
+@extend_schema(responses=inline_serializer("SharePipelineStats", fields={
+    "name": serializers.CharField(),
+    "pending": serializers.IntegerField(),
+    "max_pending": serializers.IntegerField(),
+    "oldest_pending_seconds": serializers.FloatField(allow_null=True),
+    "worker_alive": serializers.BooleanField(),
+    "submitted": serializers.IntegerField(),
+    "flushed": serializers.IntegerField(),
+    "batches": serializers.IntegerField(),
+    "failed": serializers.IntegerField(),
+    "backpressure": serializers.IntegerField(),
+    "last_flush_at": serializers.FloatField(allow_null=True),
+    "last_flush_ms": serializers.FloatField(allow_null=True),
+}))
+class SharePipelineStatsView(APIView):
+    """
+    GET /api/v1/interactions/shares/pipeline/ — staff only.
+    Buffer depth, throughput and backpressure of this process's share writer.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        return Response(share_writer.stats())
+
+
+# ─── Engagement trends ─────────────────────────────────────────────────────────
+
+MAX_TREND_BUCKETS = {"hour": 24 * 14, "day": 365}
+
+
+class BaseEngagementTrendView(APIView):
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request, recipe_id=None):
+        if recipe_id is not None:
+            get_object_or_404(Recipe.objects.only("pk"), pk=recipe_id, is_published=True)
+
+        period = request.query_params.get("period", "day")
+        if period not in PERIODS:
+            raise ValidationError({"period": f"Must be one of: {', '.join(PERIODS)}."})
+        buckets = _bounded_int(request, "buckets", 24 if period == "hour" else 30, 1, MAX_TREND_BUCKETS[period])
+        metrics = [
+            metric.strip()
+            for value in request.query_params.getlist("metric")
+            for metric in value.split(",")
+            if metric.strip()
+        ] or list(METRICS)
+        unknown = sorted(set(metrics) - set(METRICS))
+        if unknown:
+            raise ValidationError({"metric": f"Unknown metric(s): {', '.join(unknown)}."})
+
+        return Response(TrendSerializer(trend_series(period, buckets, metrics, recipe_id)).data)
+
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter("period", str, enum=list(PERIODS), description="Bucket size (default day)."),
+        OpenApiParameter("buckets", int, description="Number of buckets, newest last (default 24 hours / 30 days)."),
+        OpenApiParameter("metric", str, description=f"Comma-separated subset of: {', '.join(METRICS)}."),
+    ],
+    responses=TrendSerializer,
+)
+class EngagementTrendView(CachedResponseMixin, BaseEngagementTrendView):
+    """
+    GET /api/v1/interactions/trends/               — whole site
+    GET /api/v1/interactions/recipes/<id>/trends/  — one recipe
+        ?period=hour|day&buckets=30&metric=share,save
+
+    Zero-filled shares / saves / ratings / comments per hour or day, read
+    from the rollups built by ``build_engagement_rollups``.
+    """
+
+    cache_dependencies = [ENGAGEMENT]
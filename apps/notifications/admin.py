@@ -1,13 +1,27 @@
 from django.contrib import admin
-from .models import Notification
+from .models import Notification, NotificationArchive, UnreadCounter
 
 # Register your models here.
 
 @admin.register(Notification)
 class NotificationAdmin(admin.ModelAdmin):
-    list_display = ("recipient", "actor", "verb", "notification_type", "is_read", "created_at")
+    list_display = ("recipient", "actor", "verb", "actor_count", "notification_type", "is_read", "updated_at")
     list_filter = ("notification_type", "is_read")
     search_fields = ("recipient__username", "actor__username", "verb")
     raw_id_fields = ("recipient", "actor")
-    readonly_fields = ("created_at",)
- 
\ No newline at end of file
+    readonly_fields = ("created_at", "updated_at")
+
+
+@admin.register(UnreadCounter)
+class UnreadCounterAdmin(admin.ModelAdmin):
+    list_display = ("user", "count", "updated_at")
+    raw_id_fields = ("user",)
+
+
+@admin.register(NotificationArchive)
+class NotificationArchiveAdmin(admin.ModelAdmin):
+    list_display = ("recipient", "period", "count", "updated_at")
+    search_fields = ("recipient__username",)
+    raw_id_fields = ("recipient",)
+    exclude = ("payload",)
+    readonly_fields = ("period", "count", "updated_at")
@@ -0,0 +1,166 @@
+"""
+Pub/sub for real-time notification delivery.
+
+Writers call ``publish`` with ``(user_id, event)`` pairs once their changes
+have committed; the streaming views ``subscribe`` to one user's events.  The
+broker is chosen by ``settings.NOTIFICATIONS["BROKER"]``:
+
+* ``LocalBroker`` — in-process queues.  Only reaches connections served by the
+  same process, so it suits development, tests and single-process servers.
+* ``RedisBroker`` — Redis pub/sub (one channel per user); used automatically
+  when ``REDIS_URL`` is set, and reaches every process.
+
+Other brokers subclass ``Broker`` and implement its two methods.
+"""
+
+import asyncio
+import json
+import logging
+import threading
+from abc import ABC, abstractmethod
+from collections import defaultdict
+
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+class Broker(ABC):
+    @abstractmethod
+    def publish(self, messages) -> None:
+        """Send every ``(user_id, event)`` in ``messages``; must not block for long."""
+
+    @abstractmethod
+    async def subscribe(self, user_id):
+        """Return a subscription with ``async get()`` and ``async close()``."""
+
+
+# ─── In-process ────────────────────────────────────────────────────────────────
+
+class LocalSubscription:
+    def __init__(self, broker, user_id, max_queue):
+        self.broker = broker
+        self.user_id = user_id
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(maxsize=max_queue)
+
+    def deliver(self, event) -> None:
+        # Called from any thread; the queue belongs to the subscriber's loop.
+        try:
+            self.loop.call_soon_threadsafe(self._put, event)
+        except RuntimeError:
+            pass  # The subscriber's loop has closed.
+
+    def _put(self, event):
+        if self.queue.full():
+            # A stalled client loses its oldest events, not the server's memory.
+            self.queue.get_nowait()
+        self.queue.put_nowait(event)
+
+    async def get(self):
+        return await self.queue.get()
+
+    async def close(self) -> None:
+        self.broker._remove(self)
+
+
+class LocalBroker(Broker):
+    def __init__(self, max_queue=100):
+        self.max_queue = max_queue
+        self._subscribers = defaultdict(set)
+        self._lock = threading.Lock()
+
+    def publish(self, messages) -> None:
+        with self._lock:
+            targets = [
+                (subscription, event)
+                for user_id, event in messages
+                for subscription in self._subscribers.get(user_id, ())
+            ]
+        for subscription, event in targets:
+            subscription.deliver(event)
+
+    async def subscribe(self, user_id):
+        subscription = LocalSubscription(self, user_id, self.max_queue)
+        with self._lock:
+            self._subscribers[user_id].add(subscription)
+        return subscription
+
+    def _remove(self, subscription):
+        with self._lock:
+            subscribers = self._subscribers.get(subscription.user_id)
+            if subscribers is not None:
+                subscribers.discard(subscription)
+                if not subscribers:
+                    del self._subscribers[subscription.user_id]
+
+
+# ─── Redis ─────────────────────────────────────────────────────────────────────
+
+def _channel(user_id) -> str:
+    return f"notifications:{user_id}"
+
+
+class RedisSubscription:
+    def __init__(self, client, pubsub):
+        self.client = client
+        self.pubsub = pubsub
+
+    async def get(self):
+        while True:
+            message = await self.pubsub.get_message(ignore_subscribe_messages=True, timeout=None)
+            if message is not None:
+                return json.loads(message["data"])
+
+    async def close(self) -> None:
+        await self.pubsub.aclose()
+        await self.client.aclose()
+
+
+class RedisBroker(Broker):
+    def __init__(self, url=None):
+        self.url = url or settings.REDIS_URL
+        self._client = None
+
+    def publish(self, messages) -> None:
+        import redis
+
+        if self._client is None:
+            self._client = redis.Redis.from_url(self.url)
+        pipeline = self._client.pipeline(transaction=False)
+        for user_id, event in messages:
+            pipeline.publish(_channel(user_id), json.dumps(event, default=str))
+        pipeline.execute()
+
+    async def subscribe(self, user_id):
+        import redis.asyncio
+
+        client = redis.asyncio.Redis.from_url(self.url)
+        pubsub = client.pubsub()
+        await pubsub.subscribe(_channel(user_id))
+        return RedisSubscription(client, pubsub)
+
+
+def get_broker() -> Broker:
+    global _broker
+    with _broker_lock:
+        if _broker is None:
+            path = getattr(settings, "NOTIFICATIONS", {}).get("BROKER", "apps.notifications.broker.LocalBroker")
+            _broker = import_string(path)()
+        return _broker
+
+
+def publish(messages) -> None:
+    """Publish ``(user_id, event)`` pairs; failures are logged, never raised."""
+    messages = list(messages)
+    if not messages:
+        return
+    try:
+        get_broker().publish(messages)
+    except Exception:
+        # Streams are a convenience on top of the stored notifications.
+        logger.exception("Failed to publish %d notification event(s)", len(messages))
@@ -0,0 +1,84 @@
+"""
+Unread notification counters.
+
+``UnreadCounter`` holds each user's number of unread notifications.  It is
+moved by deltas: up when ``write_notifications`` adds a row (joining an
+already-unread group adds nothing), down when notifications are marked read or
+unread ones are deleted.  ``unread_count`` reads it through the cache when
+the cache is shared by every server process, so the badge poll is a cache hit
+or a primary-key lookup and never a ``COUNT(*)``.  A process-local cache
+would keep serving a count that another worker has since changed, so then
+every poll is the primary-key lookup.
+
+Cache entries are deleted after every change commits, when an ``unread``
+event is also published to the user's streams, and expire after
+``UNREAD_CACHE_TIMEOUT`` seconds.  ``reconcile_unread_counts`` repairs any
+drift in the stored counters.
+"""
+
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, cache, caches
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+from django.utils import timezone
+
+from apps.core.caches import is_shared
+
+from .broker import publish
+from .models import UnreadCounter
+
+DEFAULT_TIMEOUT = 300
+
+
+def _key(user_id) -> str:
+    return f"notifications:unread:{user_id}"
+
+
+def _timeout() -> int:
+    return getattr(settings, "NOTIFICATIONS", {}).get("UNREAD_CACHE_TIMEOUT", DEFAULT_TIMEOUT)
+
+
+def adjust_unread(deltas: dict) -> None:
+    """Move the counters of ``{user_id: delta}`` — one UPDATE per distinct delta."""
+    deltas = {user_id: delta for user_id, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    UnreadCounter.objects.bulk_create(
+        [UnreadCounter(user_id=user_id) for user_id in deltas],
+        ignore_conflicts=True,
+    )
+    by_delta = defaultdict(list)
+    for user_id, delta in deltas.items():
+        by_delta[delta].append(user_id)
+    now = timezone.now()
+    for delta, user_ids in by_delta.items():
+        count = Greatest(F("count") + delta, Value(0)) if delta < 0 else F("count") + delta
+        UnreadCounter.objects.filter(user_id__in=user_ids).update(count=count, updated_at=now)
+    keys = [_key(user_id) for user_id in deltas]
+    events = [(user_id, {"type": "unread"}) for user_id in deltas]
+
+    def after_commit():
+        cache.delete_many(keys)
+        publish(events)
+
+    transaction.on_commit(after_commit)
+
+
+def _stored_count(user_id) -> int:
+    return UnreadCounter.objects.filter(user_id=user_id).values_list("count", flat=True).first() or 0
+
+
+def unread_count(user_id) -> int:
+    """The user's unread count from a shared cache, falling back to ``UnreadCounter``."""
+    if not is_shared(caches[DEFAULT_CACHE_ALIAS]):
+        return _stored_count(user_id)
+    key = _key(user_id)
+    count = cache.get(key)
+    if count is None:
+        count = _stored_count(user_id)
+        cache.set(key, count, _timeout())
+    return count
+
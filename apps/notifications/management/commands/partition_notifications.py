@@ -0,0 +1,97 @@
+"""
+Usage:
+    python manage.py partition_notifications
+    python manage.py partition_notifications --months-ahead 6
+
+PostgreSQL only.  Converts the notification table into one range-partitioned
+by ``created_at``, one partition per month plus a default partition, so that
+``prune_notifications`` can drop expired months instead of deleting rows.
+Run again (or let ``prune_notifications`` do it) to create upcoming months.
+
+The conversion copies every row in a single transaction while holding an
+exclusive lock on the table: run it in a maintenance window.  The primary
+key becomes ``(id, created_at)``, as PostgreSQL requires; ids stay unique.
+"""
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from apps.notifications import retention
+from apps.notifications.models import Notification
+
+
+class Command(BaseCommand):
+    help = "Partition the notification table by month (PostgreSQL)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=3,
+            help="Number of future monthly partitions to create",
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != "postgresql":
+            raise CommandError("Partitioning is only supported on PostgreSQL.")
+        if not retention.is_partitioned():
+            self._convert()
+            self.stdout.write("Converted the notification table to monthly partitions.")
+        for name in retention.ensure_partitions(options["months_ahead"]):
+            self.stdout.write(f"Created partition {name}.")
+        self.stdout.write(self.style.SUCCESS("Done."))
+
+    @transaction.atomic
+    def _convert(self):
+        quote = connection.ops.quote_name
+        table = Notification._meta.db_table
+        old = f"{table}_unpartitioned"
+        sequence = f"{table}_id_seq"
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"LOCK TABLE {quote(table)} IN ACCESS EXCLUSIVE MODE")
+            # Captured before the rename, so they already name the new table.
+            cursor.execute(
+                "SELECT indexdef FROM pg_indexes WHERE tablename = %s "
+                "AND indexdef NOT LIKE 'CREATE UNIQUE INDEX%%'",
+                [table],
+            )
+            index_definitions = [row[0] for row in cursor.fetchall()]
+            cursor.execute(
+                "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+                "WHERE conrelid = %s::regclass AND contype = 'f'",
+                [table],
+            )
+            foreign_keys = cursor.fetchall()
+            cursor.execute(f"SELECT MIN(created_at), MAX(id) FROM {quote(table)}")
+            oldest, max_id = cursor.fetchone()
+
+            cursor.execute(f"ALTER TABLE {quote(table)} RENAME TO {quote(old)}")
+            cursor.execute(
+                f"CREATE TABLE {quote(table)} (LIKE {quote(old)} INCLUDING DEFAULTS) "
+                f"PARTITION BY RANGE (created_at)"
+            )
+            cursor.execute(f"CREATE TABLE {quote(table + '_default')} PARTITION OF {quote(table)} DEFAULT")
+
+        month = retention._month(timezone.localtime(oldest) if oldest else timezone.localdate())
+        current = retention._month(timezone.localdate())
+        while month <= current:
+            retention.create_partition(month)
+            month = retention._next_month(month)
+
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {quote(table)} SELECT * FROM {quote(old)}")
+            cursor.execute(f"DROP TABLE {quote(old)}")
+
+            cursor.execute(f"CREATE SEQUENCE {quote(sequence)} OWNED BY {quote(table)}.id")
+            cursor.execute("SELECT setval(%s, %s)", [sequence, (max_id or 0) + 1])
+            cursor.execute(
+                f"ALTER TABLE {quote(table)} ALTER COLUMN id SET DEFAULT nextval(%s::regclass)",
+                [sequence],
+            )
+            cursor.execute(f"ALTER TABLE {quote(table)} ADD PRIMARY KEY (id, created_at)")
+            for definition in index_definitions:
+                cursor.execute(definition)
+            for name, definition in foreign_keys:
+                cursor.execute(f"ALTER TABLE {quote(table)} ADD CONSTRAINT {quote(name)} {definition}")
@@ -0,0 +1,69 @@
+"""
+Usage:
+    python manage.py prune_notifications
+    python manage.py prune_notifications --chunk-size 5000 --pause 0.05
+    python manage.py prune_notifications --no-archive
+
+Archives old read notifications, deletes notifications past their type's TTL,
+drops expired archive months and forgets the actors of closed notification
+groups (run daily from cron).
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.notifications import retention
+from apps.notifications.services import prune_group_actors
+
+
+class Command(BaseCommand):
+    help = "Apply the notification retention policy (archive, expire, prune)"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Rows archived or deleted per transaction",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0.0,
+            help="Seconds to sleep between chunks, to spread the load",
+        )
+        parser.add_argument(
+            "--no-archive",
+            action="store_true",
+            help="Skip compacting read notifications into the archive",
+        )
+        parser.add_argument(
+            "--months-ahead",
+            type=int,
+            default=3,
+            help="Monthly partitions to keep created ahead (PostgreSQL, partitioned tables only)",
+        )
+
+    def handle(self, *args, **options):
+        chunk_size, pause = options["chunk_size"], options["pause"]
+        partitioned = retention.is_partitioned()
+
+        if partitioned:
+            for name in retention.ensure_partitions(options["months_ahead"]):
+                self.stdout.write(f"Created partition {name}.")
+
+        if not options["no_archive"]:
+            archived = retention.archive_read(chunk_size=chunk_size, pause=pause)
+            self.stdout.write(f"Archived {archived} read notification(s).")
+
+        if partitioned:
+            for name in retention.drop_expired_partitions():
+                self.stdout.write(f"Dropped partition {name}.")
+
+        for kind, deleted in retention.expire(chunk_size=chunk_size, pause=pause).items():
+            if deleted:
+                self.stdout.write(f"Expired {deleted} {kind} notification(s).")
+
+        pruned = retention.prune_archives()
+        self.stdout.write(f"Deleted {pruned} archive month(s).")
+        self.stdout.write(f"Forgot {prune_group_actors()} actor(s) of closed groups.")
+        self.stdout.write(self.style.SUCCESS("Done."))
@@ -0,0 +1,82 @@
+"""
+Usage:
+    python manage.py reconcile_unread_counts
+    python manage.py reconcile_unread_counts --user 12 --user 40
+
+Repairs the per-user unread notification counters (run periodically from cron).
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from apps.notifications.counters import adjust_unread
+from apps.notifications.models import Notification
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Repair drift in the per-user unread notification counters"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            type=int,
+            action="append",
+            default=[],
+            help="Only reconcile this user id (repeatable)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of users repaired per transaction",
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options["user"]:
+            users = users.filter(pk__in=options["user"])
+
+        true_count = Coalesce(
+            Subquery(
+                Notification.objects.filter(recipient=OuterRef("pk"), is_read=False)
+                .order_by()
+                .values("recipient")
+                .annotate(value=Count("pk"))
+                .values("value"),
+                output_field=IntegerField(),
+            ),
+            Value(0),
+        )
+        drifted = (
+            users.annotate(
+                stored=Coalesce(F("unread_counter__count"), Value(0)),
+                actual=true_count,
+            )
+            .filter(~Q(stored=F("actual")))
+            .order_by("pk")
+            .values_list("pk", "stored", "actual")
+        )
+
+        repaired = 0
+        batch = []
+        for row in drifted.iterator(chunk_size=options["chunk_size"]):
+            batch.append(row)
+            if len(batch) >= options["chunk_size"]:
+                repaired += self._repair(batch)
+                batch = []
+        if batch:
+            repaired += self._repair(batch)
+
+        self.stdout.write(f"Unread counters: {repaired} user(s) repaired.")
+        self.stdout.write(self.style.SUCCESS("Done."))
+
+    @transaction.atomic
+    def _repair(self, rows):
+        # Apply the difference as a delta so concurrent notifications aren't overwritten.
+        adjust_unread({pk: actual - stored for pk, stored, actual in rows})
+        return len(rows)
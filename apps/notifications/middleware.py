@@ -0,0 +1,29 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from .services import acollect_notifications, collect_notifications
+
+
+class NotificationBatchMiddleware:
+    """
+    Hold the notifications a request creates and write them together once
+    the view has returned (see ``apps.notifications.services``).  Works in
+    sync and async stacks, so streaming views stay async under ASGI.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        with collect_notifications():
+            return self.get_response(request)
+
+    async def __acall__(self, request):
+        async with acollect_notifications():
+            return await self.get_response(request)
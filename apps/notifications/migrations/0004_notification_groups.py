@@ -0,0 +1,54 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:09
+
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+def populate_groups(apps, schema_editor):
+    Notification = apps.get_model("notifications", "Notification")
+
+    Notification.objects.update(updated_at=models.F("created_at"))
+    batch = []
+    for notification in Notification.objects.filter(actor__isnull=False).only("pk", "actor_id").iterator():
+        notification.latest_actor_ids = [notification.actor_id]
+        batch.append(notification)
+        if len(batch) >= 1000:
+            Notification.objects.bulk_update(batch, ["latest_actor_ids"])
+            batch = []
+    Notification.objects.bulk_update(batch, ["latest_actor_ids"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('notifications', '0003_recipe_notifications'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='notification',
+            options={'ordering': ['-updated_at', '-pk']},
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='actor_count',
+            field=models.PositiveIntegerField(default=1),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='latest_actor_ids',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='notification',
+            name='updated_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', '-updated_at'], name='notification_inbox_idx'),
+        ),
+        migrations.RunPython(populate_groups, migrations.RunPython.noop),
+    ]
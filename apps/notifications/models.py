@@ -1,16 +1,29 @@
 # Create your models here.
+import json
+import zlib
+
 from django.db import models
 from django.contrib.auth import get_user_model
+from django.utils import timezone
 
 User = get_user_model()
 
 
 class Notification(models.Model):
+    """
+    One notification, or — for the grouped types — every event of one kind
+    about one target inside a time window ("Alice and 41 others rated your
+    recipe"), updated in place as events arrive.  ``actor`` is the latest
+    actor, ``latest_actor_ids`` the few most recent ones (newest first) and
+    ``actor_count`` the number of distinct actors (see ``NotificationActor``).
+    """
+
     TYPE_CHOICES = [
         ("follow", "Follow"),
         ("comment", "Comment"),
         ("rating", "Rating"),
         ("share", "Share"),
+        ("recipe", "New recipe"),
         ("system", "System"),
     ]
 
@@ -29,15 +42,106 @@ class Notification(models.Model):
     verb = models.CharField(max_length=255)
     notification_type = models.CharField(max_length=20, choices=TYPE_CHOICES, default="system")
     target_id = models.PositiveIntegerField(null=True, blank=True)
+    actor_count = models.PositiveIntegerField(default=1)
+    latest_actor_ids = models.JSONField(default=list, blank=True)
 
     is_read = models.BooleanField(default=False, db_index=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(default=timezone.now)
 
     class Meta:
-        ordering = ["-created_at"]
+        ordering = ["-updated_at", "-pk"]
         indexes = [
             models.Index(fields=["recipient", "is_read"]),
+            models.Index(fields=["recipient", "-created_at"], name="notification_recent_idx"),
+            models.Index(fields=["recipient", "-updated_at"], name="notification_inbox_idx"),
+            models.Index(fields=["notification_type", "created_at"], name="notification_expiry_idx"),
+            models.Index(fields=["updated_at"], condition=models.Q(is_read=True), name="notification_read_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"[{self.notification_type}] {self.actor} → {self.recipient}: {self.verb}"
+
+
+class NotificationActor(models.Model):
+    """
+    One actor already counted in an open notification group, so a second
+    event by them doesn't move ``actor_count``.  A group only takes events
+    for ``GROUP_WINDOW`` after ``group_created_at``; ``prune_notifications``
+    deletes the rows after that.
+    """
+
+    # A plain id, not a foreign key: the notification table may be
+    # partitioned (see partition_notifications), which rules out references.
+    group_id = models.BigIntegerField()
+    actor = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    group_created_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["group_id", "actor"], name="unique_notification_actor"),
+        ]
+        indexes = [models.Index(fields=["group_created_at"], name="notification_actor_age_idx")]
+
+    def __str__(self) -> str:
+        return f"{self.actor_id} in group {self.group_id}"
+
+
+class UnreadCounter(models.Model):
+    """
+    Number of unread notifications of ``user``, kept up to date by every
+    write and mark-read (see ``apps.notifications.counters``) so the badge
+    never counts rows.
+    """
+
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="unread_counter",
+    )
+    count = models.PositiveIntegerField(default=0)
+    updated_at = models.DateTimeField(default=timezone.now)
+
+    def __str__(self) -> str:
+        return f"{self.user_id}: {self.count} unread"
+
+
+class NotificationArchive(models.Model):
+    """
+    A recipient's read notifications of one month, compacted out of the
+    notification table by ``apps.notifications.retention``: a zlib-compressed
+    JSON array with one ``ENTRY_FIELDS`` row per notification.
+    """
+
+    ENTRY_FIELDS = ("notification_type", "actor_id", "target_id", "actor_count", "verb", "created_at")
+
+    recipient = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="notification_archives",
+    )
+    period = models.DateField(help_text="First day of the archived month")
+    count = models.PositiveIntegerField(default=0)
+    payload = models.BinaryField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["-period"]
+        constraints = [
+            models.UniqueConstraint(fields=["recipient", "period"], name="unique_notification_archive"),
         ]
 
     def __str__(self) -> str:
-        return f"[{self.notification_type}] {self.actor} → {self.recipient}: {self.verb}"
\ No newline at end of file
+        return f"{self.recipient_id} {self.period:%Y-%m}: {self.count} notification(s)"
+
+    @staticmethod
+    def pack(rows) -> bytes:
+        return zlib.compress(json.dumps(rows, separators=(",", ":"), default=str).encode(), 9)
+
+    @staticmethod
+    def unpack(payload) -> list:
+        return json.loads(zlib.decompress(bytes(payload))) if payload else []
+
+    def entries(self) -> list[dict]:
+        return [dict(zip(self.ENTRY_FIELDS, row)) for row in self.unpack(self.payload)]
@@ -0,0 +1,235 @@
+"""
+Notification retention.
+
+* ``archive_read`` moves read notifications not touched for
+  ``ARCHIVE_AFTER_DAYS`` out of the notification table into one compressed
+  ``NotificationArchive`` row per recipient and month.
+* ``expire`` deletes notifications older than their type's TTL
+  (``RETENTION[type]``, else ``RETENTION["DEFAULT"]``; ``None`` keeps them).
+* ``prune_archives`` deletes archive months older than ``ARCHIVE_TTL_DAYS``.
+
+Everything works in short transactions of ``chunk_size`` rows picked by
+primary key, so no lock is held for long, and unread counters are moved for
+every unread notification removed.
+
+On PostgreSQL the notification table can be range-partitioned by month
+(``manage.py partition_notifications``).  Then ``ensure_partitions`` creates
+upcoming months ahead of time and ``drop_expired_partitions`` removes whole
+months past every TTL with a ``DROP TABLE`` instead of row deletes.
+"""
+
+import time
+from collections import Counter, defaultdict
+from datetime import date, datetime, timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .counters import adjust_unread
+from .models import Notification, NotificationArchive
+
+DEFAULTS = {
+    "RETENTION": {"DEFAULT": 365},
+    "ARCHIVE_AFTER_DAYS": 30,
+    "ARCHIVE_TTL_DAYS": 730,
+}
+
+
+def _config() -> dict:
+    return {**DEFAULTS, **getattr(settings, "NOTIFICATIONS", {})}
+
+
+def ttl_days() -> dict:
+    """TTL in days (or ``None``) of every notification type."""
+    retention = _config()["RETENTION"]
+    default = retention.get("DEFAULT")
+    return {kind: retention.get(kind, default) for kind, _ in Notification.TYPE_CHOICES}
+
+
+def _month(value) -> date:
+    return date(value.year, value.month, 1)
+
+
+def _next_month(value: date) -> date:
+    return date(value.year + value.month // 12, value.month % 12 + 1, 1)
+
+
+# ─── Archive ───────────────────────────────────────────────────────────────────
+
+@transaction.atomic
+def _archive_chunk(cutoff, chunk_size) -> int:
+    rows = list(
+        Notification.objects.select_for_update()
+        .filter(is_read=True, updated_at__lt=cutoff)
+        .order_by("pk")
+        .values_list("pk", "recipient_id", *NotificationArchive.ENTRY_FIELDS)[:chunk_size]
+    )
+    if not rows:
+        return 0
+
+    by_month = defaultdict(list)
+    for pk, recipient_id, *entry in rows:
+        created_at = timezone.localtime(entry[-1])
+        entry[-1] = created_at.isoformat()
+        by_month[(recipient_id, _month(created_at))].append(entry)
+
+    existing = {
+        (archive.recipient_id, archive.period): archive
+        for archive in NotificationArchive.objects.select_for_update().filter(
+            recipient_id__in={key[0] for key in by_month},
+            period__in={key[1] for key in by_month},
+        )
+    }
+    created, changed = [], []
+    for (recipient_id, period), entries in by_month.items():
+        archive = existing.get((recipient_id, period))
+        if archive is None:
+            created.append(NotificationArchive(
+                recipient_id=recipient_id,
+                period=period,
+                count=len(entries),
+                payload=NotificationArchive.pack(entries),
+            ))
+        else:
+            archive.payload = NotificationArchive.pack(NotificationArchive.unpack(archive.payload) + entries)
+            archive.count += len(entries)
+            archive.updated_at = timezone.now()
+            changed.append(archive)
+    NotificationArchive.objects.bulk_create(created)
+    NotificationArchive.objects.bulk_update(changed, ["payload", "count", "updated_at"])
+    Notification.objects.filter(pk__in=[row[0] for row in rows]).delete()
+    return len(rows)
+
+
+def archive_read(days=None, chunk_size=1000, pause=0.0) -> int:
+    """Compact read notifications idle for ``days``; returns the number archived."""
+    days = _config()["ARCHIVE_AFTER_DAYS"] if days is None else days
+    cutoff = timezone.now() - timedelta(days=days)
+    archived = 0
+    while processed := _archive_chunk(cutoff, chunk_size):
+        archived += processed
+        time.sleep(pause)
+    return archived
+
+
+def prune_archives(days=None) -> int:
+    days = _config()["ARCHIVE_TTL_DAYS"] if days is None else days
+    if days is None:
+        return 0
+    cutoff = _month(timezone.localdate() - timedelta(days=days))
+    deleted, _ = NotificationArchive.objects.filter(period__lt=cutoff).delete()
+    return deleted
+
+
+# ─── Expiry ────────────────────────────────────────────────────────────────────
+
+@transaction.atomic
+def _delete_chunk(queryset, chunk_size) -> int:
+    rows = list(queryset.select_for_update().order_by("pk").values_list("pk", "recipient_id", "is_read")[:chunk_size])
+    if not rows:
+        return 0
+    Notification.objects.filter(pk__in=[pk for pk, _, _ in rows]).delete()
+    unread = Counter(recipient_id for _, recipient_id, is_read in rows if not is_read)
+    adjust_unread({recipient_id: -count for recipient_id, count in unread.items()})
+    return len(rows)
+
+
+def expire(chunk_size=1000, pause=0.0) -> dict[str, int]:
+    """Delete notifications past their type's TTL; returns the number deleted per type."""
+    now = timezone.now()
+    deleted = {}
+    for kind, days in ttl_days().items():
+        if days is None:
+            continue
+        expired = Notification.objects.filter(notification_type=kind, created_at__lt=now - timedelta(days=days))
+        deleted[kind] = 0
+        while processed := _delete_chunk(expired, chunk_size):
+            deleted[kind] += processed
+            time.sleep(pause)
+    return deleted
+
+
+# ─── PostgreSQL partitions ─────────────────────────────────────────────────────
+
+def partition_name(month: date) -> str:
+    return f"{Notification._meta.db_table}_p{month:%Y_%m}"
+
+
+def is_partitioned() -> bool:
+    if connection.vendor != "postgresql":
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass",
+            [Notification._meta.db_table],
+        )
+        return cursor.fetchone() is not None
+
+
+def partitions() -> dict[date, str]:
+    """Monthly partitions of the notification table, by first day of month."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT child.relname FROM pg_inherits "
+            "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+            "WHERE pg_inherits.inhparent = %s::regclass",
+            [Notification._meta.db_table],
+        )
+        names = [row[0] for row in cursor.fetchall()]
+    prefix = f"{Notification._meta.db_table}_p"
+    months = {}
+    for name in names:
+        if name.startswith(prefix):
+            months[datetime.strptime(name[len(prefix):], "%Y_%m").date()] = name
+    return months
+
+
+def create_partition(month: date) -> None:
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TABLE IF NOT EXISTS {quote(partition_name(month))} "
+            f"PARTITION OF {quote(Notification._meta.db_table)} "
+            f"FOR VALUES FROM (%s) TO (%s)",
+            [
+                timezone.make_aware(datetime.combine(month, datetime.min.time())),
+                timezone.make_aware(datetime.combine(_next_month(month), datetime.min.time())),
+            ],
+        )
+
+
+def ensure_partitions(months_ahead=3) -> list[str]:
+    """Create the partitions of this month and the next ``months_ahead``."""
+    existing = partitions()
+    month = _month(timezone.localdate())
+    created = []
+    for _ in range(months_ahead + 1):
+        if month not in existing:
+            create_partition(month)
+            created.append(partition_name(month))
+        month = _next_month(month)
+    return created
+
+
+def drop_expired_partitions() -> list[str]:
+    """Drop months in which every notification is past its TTL."""
+    days = list(ttl_days().values())
+    if not days or None in days:
+        return []
+    cutoff = timezone.localdate() - timedelta(days=max(days))
+    quote = connection.ops.quote_name
+    dropped = []
+    for month, name in sorted(partitions().items()):
+        if _next_month(month) > cutoff:
+            break
+        with transaction.atomic():
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT recipient_id, COUNT(*) FROM {quote(name)} WHERE NOT is_read GROUP BY recipient_id"
+                )
+                unread = dict(cursor.fetchall())
+                cursor.execute(f"DROP TABLE {quote(name)}")
+            adjust_unread({recipient_id: -count for recipient_id, count in unread.items()})
+        dropped.append(name)
+    return dropped
@@ -1,13 +1,62 @@
 from rest_framework import serializers
 
 from apps.users.serializers import UserPublicSerializer
-from .models import Notification
+from .models import Notification, NotificationArchive
+from .services import attach_latest_actors
 
 
 class NotificationSerializer(serializers.ModelSerializer):
     actor = UserPublicSerializer(read_only=True)
+    latest_actors = serializers.SerializerMethodField()
+    summary = serializers.SerializerMethodField()
 
     class Meta:
         model = Notification
-        fields = ("id", "actor", "verb", "notification_type", "target_id", "is_read", "created_at")
-        read_only_fields = ("id", "actor", "verb", "notification_type", "target_id", "created_at")
\ No newline at end of file
+        fields = (
+            "id",
+            "actor",
+            "verb",
+            "summary",
+            "actor_count",
+            "latest_actors",
+            "notification_type",
+            "target_id",
+            "is_read",
+            "created_at",
+            "updated_at",
+        )
+        read_only_fields = (
+            "id",
+            "actor",
+            "verb",
+            "actor_count",
+            "notification_type",
+            "target_id",
+            "created_at",
+            "updated_at",
+        )
+
+    def get_latest_actors(self, obj):
+        if not hasattr(obj, "latest_actors"):
+            attach_latest_actors([obj])
+        return UserPublicSerializer(obj.latest_actors, many=True, context=self.context).data
+
+    def get_summary(self, obj) -> str:
+        """e.g. "alice and 41 others rated your recipe 'Pad Thai'"."""
+        who = obj.actor.username if obj.actor else "Someone"
+        others = obj.actor_count - 1
+        if others > 0:
+            who += f" and {others} other{'s' if others > 1 else ''}"
+        return f"{who} {obj.verb}"
+
+
+class NotificationArchiveSerializer(serializers.ModelSerializer):
+    entries = serializers.SerializerMethodField()
+
+    class Meta:
+        model = NotificationArchive
+        fields = ("period", "count", "entries", "updated_at")
+        read_only_fields = fields
+
+    def get_entries(self, obj) -> list[dict]:
+        return obj.entries()
@@ -1,11 +1,80 @@
+"""
+Batched notification delivery.
+
+``create_notification``, ``create_notifications`` and ``notify_many`` never
+INSERT on the spot.  A notification queued inside a transaction is held until
+that transaction commits (and dropped if it rolls back).  While
+``collect_notifications()`` is active — ``NotificationBatchMiddleware`` wraps
+every request in it — committed notifications are held further, until the
+block exits, so a request writes all of its notifications together.
+
+Writing expands recipients (``notify_many`` accepts a lazy queryset, e.g. all
+followers of an author through ``notify_followers``) and inserts them ``BATCH_SIZE`` rows per
+``bulk_create``.  It drops self-notifications and any notification identical
+(recipient, actor, type, target, verb) to one sent in the last
+``DEDUPE_WINDOW`` seconds.  With ``ASYNC`` the write happens on a
+``BatchWriter`` thread instead of the request.  Configured by
+``settings.NOTIFICATIONS``.
+
+Events of the ``GROUPED_TYPES`` are coalesced: an event joins the unread
+notification with the same (recipient, type, target) started within
+``GROUP_WINDOW`` seconds, which is updated in place — latest actor and verb,
+``actor_count``, ``latest_actor_ids`` — instead of adding a row.  The table
+and the inbox therefore grow with distinct events, not raw volume.  Each
+group's actors are recorded in ``NotificationActor``, so ``actor_count``
+counts every actor once however many events they cause.  A group read
+between being selected and being updated is left alone; the events open a
+new group.
+"""
+
 from __future__ import annotations
 
+import logging
+import threading
+from collections import defaultdict
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+from itertools import islice
 from typing import TYPE_CHECKING
 
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.db.models import QuerySet
+from django.utils import timezone
+
+from apps.core.batching import BatchWriter
+
 if TYPE_CHECKING:
     from django.contrib.auth import get_user_model
     User = get_user_model()
 
+logger = logging.getLogger(__name__)
+
+DEFAULTS = {
+    "ASYNC": False,
+    "BATCH_SIZE": 1000,
+    "FLUSH_INTERVAL": 1.0,
+    "MAX_PENDING": 10_000,
+    "DEDUPE_WINDOW": 300,
+    "GROUP_WINDOW": 86400,
+    "GROUPED_TYPES": ("follow", "comment", "rating"),
+    "LATEST_ACTORS": 3,
+}
+
+# Stack of the active collect_notifications() buffers.  A context variable
+# (not a thread-local) so it follows a request across sync_to_async hops.
+_collectors = ContextVar("notification_collectors", default=())
+_writer = None
+_writer_lock = threading.Lock()
+
+
+def _config() -> dict:
+    return {**DEFAULTS, **getattr(settings, "NOTIFICATIONS", {})}
+
+
+# ─── Queueing ──────────────────────────────────────────────────────────────────
 
 def create_notification(
     *,
@@ -14,20 +83,374 @@ def create_notification(
     verb: str,
     notification_type: str = "system",
     target_id: int | None = None,
+) -> None:
+    """Queue one notification for ``recipient`` (a user or user id)."""
+    notify_many(
+        [recipient],
+        actor=actor,
+        verb=verb,
+        notification_type=notification_type,
+        target_id=target_id,
+    )
+
+
+def notify_many(
+    recipients,
+    *,
+    actor=None,
+    verb: str,
+    notification_type: str = "system",
+    target_id: int | None = None,
 ) -> None:
     """
-    Create a Notification record.  Import is deferred to avoid
-    circular dependency at module load time.
+    Queue the same notification for every user in ``recipients`` — users,
+    user ids, or a queryset of either.  A queryset is only evaluated when
+    the batch is written, in chunks, so it may cover any number of users.
     """
-    from .models import Notification
+    _enqueue([{
+        "recipients": recipients,
+        "actor_id": getattr(actor, "pk", actor),
+        "verb": verb,
+        "notification_type": notification_type,
+        "target_id": target_id,
+    }])
 
-    if actor and actor == recipient:
-        return
 
-    Notification.objects.create(
-        recipient=recipient,
-        actor=actor,
+def notify_followers(author, *, verb: str, notification_type: str = "system", target_id: int | None = None) -> None:
+    """Queue a notification from ``author`` for each of their followers."""
+    from apps.users.models import Follow
+
+    notify_many(
+        Follow.objects.filter(following=author).values_list("follower_id", flat=True),
+        actor=author,
         verb=verb,
         notification_type=notification_type,
         target_id=target_id,
-    )
\ No newline at end of file
+    )
+
+
+def create_notifications(notifications) -> int:
+    """
+    Queue many notifications at once.
+
+    ``notifications`` is an iterable of dicts of ``Notification`` field
+    values (``recipient`` or ``recipient_id``, ``actor``, ``verb``, …).
+    Returns the number queued.
+    """
+    specs = [
+        {
+            "recipients": [item["recipient_id"] if "recipient_id" in item else item["recipient"]],
+            "actor_id": item.get("actor_id", getattr(item.get("actor"), "pk", None)),
+            "verb": item["verb"],
+            "notification_type": item.get("notification_type", "system"),
+            "target_id": item.get("target_id"),
+        }
+        for item in notifications
+    ]
+    if specs:
+        _enqueue(specs)
+    return len(specs)
+
+
+def _enqueue(specs) -> None:
+    # Runs immediately outside a transaction; discarded on rollback.
+    transaction.on_commit(lambda: _deliver(specs), robust=True)
+
+
+def _deliver(specs) -> None:
+    collectors = _collectors.get()
+    if collectors:
+        collectors[-1].extend(specs)
+        return
+    if _config()["ASYNC"]:
+        writer = _get_writer()
+        for spec in specs:
+            writer.submit(spec)
+    else:
+        write_notifications(specs)
+
+
+def _start_collecting():
+    collected = []
+    token = _collectors.set((*_collectors.get(), collected))
+    return token, collected
+
+
+def _stop_collecting(token) -> None:
+    _collectors.reset(token)
+
+
+def _deliver_collected(collected) -> None:
+    if not collected:
+        return
+    try:
+        _deliver(collected)
+    except Exception:
+        # The work they describe is already committed; don't fail it.
+        logger.exception("Failed to write %d notification batch(es)", len(collected))
+
+
+@contextmanager
+def collect_notifications():
+    """Hold every notification committed inside the block and write them on exit."""
+    token, collected = _start_collecting()
+    try:
+        yield collected
+    finally:
+        _stop_collecting(token)
+        _deliver_collected(collected)
+
+
+@asynccontextmanager
+async def acollect_notifications():
+    """``collect_notifications`` for async code; the write runs in a worker thread."""
+    token, collected = _start_collecting()
+    try:
+        yield collected
+    finally:
+        _stop_collecting(token)
+        await sync_to_async(_deliver_collected)(collected)
+
+
+def _get_writer() -> BatchWriter:
+    global _writer
+    with _writer_lock:
+        if _writer is None:
+            config = _config()
+            _writer = BatchWriter(
+                "notifications",
+                write_notifications,
+                batch_size=config["BATCH_SIZE"],
+                flush_interval=config["FLUSH_INTERVAL"],
+                max_pending=config["MAX_PENDING"],
+            )
+        return _writer
+
+
+# ─── Writing ───────────────────────────────────────────────────────────────────
+
+def _recipient_ids(recipients, chunk_size):
+    if isinstance(recipients, QuerySet):
+        recipients = recipients.iterator(chunk_size=chunk_size)
+    for recipient in recipients:
+        yield getattr(recipient, "pk", recipient)
+
+
+def _expand(specs, chunk_size):
+    from .models import Notification
+
+    for spec in specs:
+        for recipient_id in _recipient_ids(spec["recipients"], chunk_size):
+            if recipient_id == spec["actor_id"]:
+                continue
+            yield Notification(
+                recipient_id=recipient_id,
+                actor_id=spec["actor_id"],
+                verb=spec["verb"],
+                notification_type=spec["notification_type"],
+                target_id=spec["target_id"],
+                latest_actor_ids=[spec["actor_id"]] if spec["actor_id"] is not None else [],
+            )
+
+
+def _key(notification) -> tuple:
+    return (
+        notification.recipient_id,
+        notification.actor_id,
+        notification.notification_type,
+        notification.target_id,
+        notification.verb,
+    )
+
+
+def _drop_duplicates(rows, seen, window) -> list:
+    """Rows not already in ``seen`` (this write) or sent within ``window`` seconds."""
+    from .models import Notification
+
+    if window:
+        recent = Notification.objects.filter(
+            recipient_id__in={row.recipient_id for row in rows},
+            notification_type__in={row.notification_type for row in rows},
+            updated_at__gte=timezone.now() - timedelta(seconds=window),
+        ).values_list("recipient_id", "actor_id", "notification_type", "target_id", "verb")
+        seen.update(recent)
+    fresh = []
+    for row in rows:
+        key = _key(row)
+        if key not in seen:
+            seen.add(key)
+            fresh.append(row)
+    return fresh
+
+
+def _fold(group, rows, known, config, now) -> list:
+    """Add ``rows`` to ``group``, once per actor not in ``known``; returns the actors added."""
+    added = []
+    for row in rows:
+        if row.actor_id is not None:
+            if row.actor_id in known:
+                # The same actor again (re-rating, a second comment): nothing new to say.
+                continue
+            known.add(row.actor_id)
+            added.append(row.actor_id)
+            group.latest_actor_ids = [row.actor_id, *group.latest_actor_ids][: config["LATEST_ACTORS"]]
+        group.actor_count += 1
+        group.actor_id = row.actor_id
+        group.verb = row.verb
+        group.updated_at = now
+    return added
+
+
+def _save_group(group) -> bool:
+    """Write ``group`` back unless it was marked read since it was selected."""
+    from .models import Notification
+
+    return bool(
+        Notification.objects.filter(pk=group.pk, is_read=False).update(
+            actor_id=group.actor_id,
+            verb=group.verb,
+            actor_count=group.actor_count,
+            latest_actor_ids=group.latest_actor_ids,
+            updated_at=group.updated_at,
+        )
+    )
+
+
+@transaction.atomic
+def _merge_groups(rows, config) -> tuple[int, list, list]:
+    """
+    Fold grouped-type ``rows`` into their open groups.  Returns the number of
+    events kept and the groups created and updated.
+    """
+    from .models import Notification, NotificationActor
+
+    if not rows:
+        return 0, [], []
+    now = timezone.now()
+    events = {}
+    for row in rows:
+        events.setdefault((row.recipient_id, row.notification_type, row.target_id), []).append(row)
+    open_groups = {}
+    candidates = (
+        Notification.objects.select_for_update()
+        .filter(
+            recipient_id__in={key[0] for key in events},
+            notification_type__in={key[1] for key in events},
+            is_read=False,
+            created_at__gte=now - timedelta(seconds=config["GROUP_WINDOW"]),
+        )
+        .order_by("created_at", "pk")
+    )
+    for group in candidates:
+        # Later groups win if a race ever opened two.
+        open_groups[(group.recipient_id, group.notification_type, group.target_id)] = group
+
+    # Actors already counted in the groups these events may join.  Groups
+    # older than the actor table only know their latest actors.
+    counted = defaultdict(set)
+    for group in open_groups.values():
+        counted[group.pk].update(group.latest_actor_ids)
+    for group_id, actor_id in NotificationActor.objects.filter(
+        group_id__in=[group.pk for group in open_groups.values()],
+        actor_id__in={row.actor_id for row in rows if row.actor_id is not None},
+    ).values_list("group_id", "actor_id"):
+        counted[group_id].add(actor_id)
+
+    created, changed, actors = [], [], []
+    kept = 0
+    for key, new_rows in events.items():
+        group = open_groups.get(key)
+        if group is not None:
+            before = group.actor_count
+            added = _fold(group, new_rows, counted[group.pk], config, now)
+            if group.actor_count == before:
+                continue
+            if _save_group(group):
+                kept += group.actor_count - before
+                changed.append(group)
+                actors.extend((group, actor_id) for actor_id in added)
+                continue
+            # Read since it was selected: the events open a new group instead.
+        group = new_rows[0]
+        group.actor_count = 0
+        group.latest_actor_ids = []
+        added = _fold(group, new_rows, set(), config, now)
+        kept += group.actor_count
+        created.append(group)
+        actors.extend((group, actor_id) for actor_id in added)
+    Notification.objects.bulk_create(created)
+    NotificationActor.objects.bulk_create(
+        [
+            NotificationActor(group_id=group.pk, actor_id=actor_id, group_created_at=group.created_at)
+            for group, actor_id in actors
+        ],
+        batch_size=500,
+        ignore_conflicts=True,
+    )
+    return kept, created, changed
+
+
+def prune_group_actors() -> int:
+    """Forget the actors of groups past ``GROUP_WINDOW``, which take no more events."""
+    from .models import NotificationActor
+
+    cutoff = timezone.now() - timedelta(seconds=_config()["GROUP_WINDOW"])
+    deleted, _ = NotificationActor.objects.filter(group_created_at__lt=cutoff).delete()
+    return deleted
+
+
+def write_notifications(specs) -> int:
+    """Write the notifications described by ``specs``; returns the number of events kept."""
+    from .broker import publish
+    from .counters import adjust_unread
+    from .models import Notification
+
+    config = _config()
+    grouped_types = set(config["GROUPED_TYPES"])
+    rows = _expand(specs, config["BATCH_SIZE"])
+    seen = set()
+    kept = 0
+    while chunk := list(islice(rows, config["BATCH_SIZE"])):
+        chunk = _drop_duplicates(chunk, seen, config["DEDUPE_WINDOW"])
+        single = [row for row in chunk if row.notification_type not in grouped_types]
+        Notification.objects.bulk_create(single)
+        grouped, created, changed = _merge_groups(
+            [row for row in chunk if row.notification_type in grouped_types], config
+        )
+        kept += len(single) + grouped
+
+        events = [(row.recipient_id, notification_event(row)) for row in [*single, *created, *changed]]
+        transaction.on_commit(lambda events=events: publish(events), robust=True)
+        unread = defaultdict(int)
+        for row in [*single, *created]:
+            unread[row.recipient_id] += 1
+        adjust_unread(unread)
+    return kept
+
+
+def notification_event(notification) -> dict:
+    """The real-time event announcing a new or updated ``notification``."""
+    return {
+        "type": "notification",
+        "data": {
+            "id": notification.pk,
+            "notification_type": notification.notification_type,
+            "verb": notification.verb,
+            "actor_id": notification.actor_id,
+            "actor_count": notification.actor_count,
+            "target_id": notification.target_id,
+            "updated_at": notification.updated_at.isoformat(),
+        },
+    }
+
+
+def attach_latest_actors(notifications):
+    """Set ``latest_actors`` (users, newest first) on every notification, with one query."""
+    from django.contrib.auth import get_user_model
+
+    notifications = list(notifications)
+    ids = {pk for notification in notifications for pk in notification.latest_actor_ids}
+    users = get_user_model().objects.in_bulk(ids) if ids else {}
+    for notification in notifications:
+        notification.latest_actors = [users[pk] for pk in notification.latest_actor_ids if pk in users]
+    return notifications
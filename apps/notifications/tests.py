@@ -1,3 +1,473 @@
-from django.test import TestCase
+import asyncio
+import json
+import time
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection, transaction
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.test import APITestCase
+from rest_framework_simplejwt.tokens import AccessToken
+
+from . import broker, retention, services
+from .broker import Broker, LocalBroker
+from .counters import _key, adjust_unread, unread_count
+from .models import Notification, NotificationActor, NotificationArchive, UnreadCounter
+from .services import collect_notifications, create_notification, notify_many
+from .views import stream_ticket
+
+User = get_user_model()
+
+
+class NotificationTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.cook = User.objects.create_user(username="cook", email="cook@example.com")
+        self.fans = [
+            User.objects.create_user(username=f"fan{number}", email=f"fan{number}@example.com")
+            for number in range(4)
+        ]
+
+    def notify(self, recipient, actor=None, verb="shared your recipe", notification_type="share", target_id=1):
+        create_notification(
+            recipient=recipient, actor=actor, verb=verb, notification_type=notification_type, target_id=target_id,
+        )
+
+    def inbox(self, user=None):
+        return Notification.objects.filter(recipient=user or self.cook)
+
+
+# ─── Batched writes ────────────────────────────────────────────────────────────
+
+class NotificationBatchingTests(NotificationTestCase):
+    def test_written_on_commit_and_dropped_on_rollback(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.notify(self.cook, self.fans[0])
+            self.assertFalse(self.inbox().exists())
+            try:
+                with transaction.atomic():
+                    self.notify(self.cook, self.fans[1])
+                    raise RuntimeError
+            except RuntimeError:
+                pass
+        self.assertEqual(list(self.inbox().values_list("actor", flat=True)), [self.fans[0].pk])
+
+    def test_collected_notifications_are_written_together_on_exit(self):
+        with collect_notifications():
+            with self.captureOnCommitCallbacks(execute=True):
+                for fan in self.fans:
+                    self.notify(self.cook, fan)
+            self.assertFalse(self.inbox().exists())
+        self.assertEqual(self.inbox().count(), 4)
+
+    def test_notify_many_expands_a_queryset_in_batches_and_skips_the_actor(self):
+        with self.settings(NOTIFICATIONS={"BATCH_SIZE": 2}):
+            with CaptureQueriesContext(connection) as queries:
+                with self.captureOnCommitCallbacks(execute=True):
+                    notify_many(
+                        User.objects.order_by("pk"), actor=self.cook, verb="posted an update",
+                        notification_type="system",
+                    )
+        self.assertEqual(
+            set(Notification.objects.values_list("recipient", flat=True)), {fan.pk for fan in self.fans}
+        )
+        insert = 'INSERT INTO "notifications_notification"'
+        self.assertEqual(sum(query["sql"].startswith(insert) for query in queries), 2)
+
+    def test_identical_notifications_within_the_window_are_dropped(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.notify(self.cook, self.fans[0])
+            self.notify(self.cook, self.fans[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.notify(self.cook, self.fans[0])
+            self.notify(self.cook, self.fans[0], target_id=2)
+        self.assertEqual(sorted(self.inbox().values_list("target_id", flat=True)), [1, 2])
+
+        with self.settings(NOTIFICATIONS={"DEDUPE_WINDOW": 0}):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.notify(self.cook, self.fans[0])
+        self.assertEqual(self.inbox().count(), 3)
+
+    def test_self_notifications_are_never_written(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.notify(self.cook, self.cook)
+        self.assertFalse(self.inbox().exists())
+
+
+# ─── Grouping ──────────────────────────────────────────────────────────────────
+
+class NotificationGroupingTests(NotificationTestCase):
+    def rate(self, *actors, target_id=1):
+        with self.captureOnCommitCallbacks(execute=True):
+            for actor in actors:
+                self.notify(self.cook, actor, "rated your recipe 'Pizza'", "rating", target_id)
+
+    def group(self):
+        return self.inbox().get(is_read=False)
+
+    def test_events_about_one_target_share_a_notification(self):
+        self.rate(*self.fans)
+        self.rate(self.fans[0], target_id=2)
+        group = self.inbox().get(target_id=1)
+        self.assertEqual(group.actor_count, 4)
+        self.assertEqual(group.actor_id, self.fans[3].pk)
+        self.assertEqual(group.latest_actor_ids, [fan.pk for fan in self.fans[:0:-1]])
+        self.assertEqual(unread_count(self.cook.pk), 2)
+
+        self.client.force_authenticate(self.cook)
+        summaries = [item["summary"] for item in self.client.get("/api/v1/notifications/").data["results"]]
+        self.assertEqual(summaries, ["fan0 rated your recipe 'Pizza'", "fan3 and 3 others rated your recipe 'Pizza'"])
+
+    def test_repeat_actors_are_counted_once_beyond_the_latest_few(self):
+        self.rate(*self.fans)
+        # fan0 has dropped out of the three latest actors, in this write and the next.
+        self.rate(self.fans[0], self.fans[1])
+        group = self.group()
+        self.assertEqual(group.actor_count, 4)
+        self.assertEqual(
+            set(NotificationActor.objects.filter(group_id=group.pk).values_list("actor", flat=True)),
+            {fan.pk for fan in self.fans},
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            self.notify(self.cook, self.fans[0], "rated your recipe 'Pizza'", "rating", 1)
+            self.notify(self.cook, self.fans[0], "rated your recipe 'Pizza' again", "rating", 1)
+        self.assertEqual(self.group().actor_count, 4)
+
+    def test_a_read_or_old_group_is_not_reopened(self):
+        self.rate(self.fans[0])
+        self.inbox().update(is_read=True)
+        self.rate(self.fans[1])
+        self.assertEqual(self.inbox().count(), 2)
+        self.assertEqual(self.group().actor_count, 1)
+
+        self.inbox().update(created_at=timezone.now() - timedelta(days=2))
+        self.rate(self.fans[2])
+        self.assertEqual(self.inbox().filter(is_read=False).count(), 2)
+
+    def test_a_group_read_while_merging_keeps_the_event(self):
+        self.rate(self.fans[0])
+        fold = services._fold
+        calls = []
+
+        def read_first(group, *args):
+            # Another request marks the group read after it was selected.
+            if not calls:
+                Notification.objects.filter(pk=group.pk).update(is_read=True)
+            calls.append(group.pk)
+            return fold(group, *args)
+
+        with mock.patch.object(services, "_fold", side_effect=read_first):
+            self.rate(self.fans[1])
+        read, fresh = self.inbox().order_by("pk")
+        self.assertTrue(read.is_read)
+        self.assertEqual((read.actor_count, read.latest_actor_ids), (1, [self.fans[0].pk]))
+        self.assertEqual((fresh.is_read, fresh.actor_count, fresh.actor_id), (False, 1, self.fans[1].pk))
+
+    def test_actors_of_closed_groups_are_pruned(self):
+        self.rate(self.fans[0], self.fans[1])
+        self.rate(self.fans[2], target_id=2)
+        NotificationActor.objects.filter(actor=self.fans[2]).update(
+            group_created_at=timezone.now() - timedelta(days=2)
+        )
+        out = StringIO()
+        call_command("prune_notifications", stdout=out)
+        self.assertIn("Forgot 1 actor(s) of closed groups.", out.getvalue())
+        self.assertEqual(NotificationActor.objects.count(), 2)
+
+
+# ─── Unread counter ────────────────────────────────────────────────────────────
+
+class UnreadCountTests(NotificationTestCase):
+    url = "/api/v1/notifications/unread-count/"
+
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.cook)
+
+    def badge(self):
+        return self.client.get(self.url).data["unread_count"]
+
+    def share(self, *fans):
+        with self.captureOnCommitCallbacks(execute=True):
+            for number, fan in enumerate(fans):
+                self.notify(self.cook, fan, target_id=number)
+
+    def test_writes_reads_and_deletes_move_the_count(self):
+        self.share(*self.fans)
+        self.assertEqual(self.badge(), 4)
+        first, second, *_ = self.inbox().order_by("pk").values_list("pk", flat=True)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/v1/notifications/mark-read/", {"ids": [first]}, format="json")
+        self.assertEqual(self.badge(), 3)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(f"/api/v1/notifications/{second}/")
+            self.client.delete(f"/api/v1/notifications/{first}/")
+        self.assertEqual(self.badge(), 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post("/api/v1/notifications/mark-read/", {}, format="json")
+        self.assertEqual(self.badge(), 0)
+
+    def test_process_local_cache_is_not_trusted(self):
+        self.share(self.fans[0])
+        # What another worker's local cache could still hold.
+        cache.set(_key(self.cook.pk), 7)
+        self.assertEqual(self.badge(), 1)
+
+    def test_shared_cache_is_used_and_invalidated_on_change(self):
+        with mock.patch("apps.notifications.counters.is_shared", return_value=True):
+            self.share(self.fans[0])
+            self.assertEqual(self.badge(), 1)
+            UnreadCounter.objects.update(count=5)
+            self.assertEqual(self.badge(), 1)
+            with self.captureOnCommitCallbacks(execute=True):
+                adjust_unread({self.cook.pk: 1})
+            self.assertEqual(self.badge(), 6)
+
+    def test_reconcile_repairs_drift(self):
+        self.share(*self.fans[:2])
+        UnreadCounter.objects.update(count=9)
+        out = StringIO()
+        call_command("reconcile_unread_counts", stdout=out)
+        self.assertIn("1 user(s) repaired", out.getvalue())
+        self.assertEqual(self.badge(), 2)
+
+
+# ─── Real-time broker ──────────────────────────────────────────────────────────
+
+class BrokerTests(APITestCase):
+    def test_brokers_must_implement_both_methods(self):
+        class PublishOnly(Broker):
+            def publish(self, messages):
+                pass
+
+        with self.assertRaises(TypeError):
+            Broker()
+        with self.assertRaises(TypeError):
+            PublishOnly()
+
+    async def test_local_broker_delivers_to_each_users_subscribers(self):
+        local = LocalBroker()
+        first, second = await local.subscribe(1), await local.subscribe(1)
+        other = await local.subscribe(2)
+        local.publish([(1, {"type": "unread"}), (3, {"type": "ignored"})])
+        self.assertEqual(await first.get(), {"type": "unread"})
+        self.assertEqual(await second.get(), {"type": "unread"})
+        self.assertTrue(other.queue.empty())
+
+        await first.close()
+        await second.close()
+        await other.close()
+        self.assertEqual(dict(local._subscribers), {})
+
+    async def test_a_stalled_subscriber_loses_its_oldest_events(self):
+        local = LocalBroker(max_queue=2)
+        subscription = await local.subscribe(1)
+        local.publish([(1, {"n": number}) for number in range(3)])
+        self.assertEqual([await subscription.get(), await subscription.get()], [{"n": 1}, {"n": 2}])
+        await subscription.close()
+
+    def test_publish_failures_are_logged_not_raised(self):
+        class Failing(LocalBroker):
+            def publish(self, messages):
+                raise ConnectionError
+
+        with mock.patch.object(broker, "_broker", Failing()):
+            with self.assertLogs("apps.notifications.broker", "ERROR"):
+                broker.publish([(1, {"type": "unread"})])
+
+
+# ─── Stream and long poll ──────────────────────────────────────────────────────
+
+@override_settings(NOTIFICATIONS={"STREAM_KEEPALIVE": 60, "STREAM_MAX_SECONDS": 1, "POLL_TIMEOUT": 1})
+class NotificationStreamTests(NotificationTestCase):
+    def setUp(self):
+        super().setUp()
+        self.broker = LocalBroker()
+        patcher = mock.patch.object(broker, "_broker", self.broker)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.auth = {"authorization": f"Bearer {AccessToken.for_user(self.cook)}"}
+
+    def deliver(self, *fans):
+        """Notify the cook once per fan, each about their own target, and publish on commit."""
+        with self.captureOnCommitCallbacks(execute=True):
+            for number, fan in enumerate(fans):
+                self.notify(self.cook, fan, target_id=number)
+
+    async def open_stream(self, params=None, headers=None):
+        response = await self.async_client.get("/api/v1/notifications/stream/", params, headers=headers)
+        self.assertEqual(response.status_code, 200)
+        return aiter(response.streaming_content)
+
+    async def next_event(self, stream):
+        """The next ``(event, id, data)`` of ``stream``, skipping comments and the retry hint."""
+        while True:
+            lines = (await anext(stream)).decode().strip().splitlines()
+            fields = dict(line.split(": ", 1) for line in lines if not line.startswith(":"))
+            if "event" in fields:
+                return fields["event"], fields.get("id"), json.loads(fields["data"])
+
+    async def close_stream(self, stream):
+        """Read ``stream`` until the server ends it and check the subscription went with it."""
+        async for _ in stream:
+            pass
+        self.assertEqual(dict(self.broker._subscribers), {})
+
+    async def poll(self, **params):
+        response = await self.async_client.get("/api/v1/notifications/poll/", params, headers=self.auth)
+        self.assertEqual(response.status_code, 200)
+        return response.json()
+
+    async def test_stream_sends_notifications_created_after_it_opened(self):
+        stream = await self.open_stream(headers=self.auth)
+        self.assertEqual(await self.next_event(stream), ("unread", None, {"unread_count": 0}))
+
+        await sync_to_async(self.deliver)(self.fans[0])
+        event, event_id, data = await self.next_event(stream)
+        self.assertEqual((event, data["verb"], data["actor_count"]), ("notification", "shared your recipe", 1))
+        self.assertEqual(event_id, data["updated_at"])
+        self.assertEqual(await self.next_event(stream), ("unread", None, {"unread_count": 1}))
+        await self.close_stream(stream)
+
+    async def test_reconnect_replays_what_changed_after_last_event_id(self):
+        await sync_to_async(self.deliver)(*self.fans[:2])
+        seen = timezone.now() - timedelta(minutes=1)
+        await Notification.objects.filter(target_id=0).aupdate(updated_at=seen - timedelta(minutes=1))
+
+        stream = await self.open_stream(headers={**self.auth, "last-event-id": seen.isoformat()})
+        event, _, data = await self.next_event(stream)
+        self.assertEqual((event, data["target_id"]), ("notification", 1))
+        self.assertEqual(await self.next_event(stream), ("unread", None, {"unread_count": 2}))
+        await self.close_stream(stream)
+
+    async def test_poll_returns_changes_since_or_waits_out_its_timeout(self):
+        await sync_to_async(self.deliver)(self.fans[0])
+        data = await self.poll(since=(timezone.now() - timedelta(minutes=1)).isoformat(), timeout=0)
+        self.assertEqual([item["target_id"] for item in data["results"]], [0])
+        self.assertEqual(data["unread_count"], 1)
+        self.assertEqual(parse_datetime(data["since"]), parse_datetime(data["results"][-1]["updated_at"]))
+
+        # Nothing newer: the poll waits for at most POLL_TIMEOUT and hands the same ``since`` back.
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        empty = await self.poll(since=data["since"], timeout=30)
+        self.assertGreaterEqual(loop.time() - started, 0.9)
+        self.assertEqual((empty["results"], empty["since"]), ([], data["since"]))
+
+    async def test_poll_returns_as_soon_as_a_notification_arrives(self):
+        since = timezone.now().isoformat()
+        with self.settings(NOTIFICATIONS={"POLL_TIMEOUT": 10}):
+            waiting = asyncio.ensure_future(self.poll(since=since))
+            await asyncio.sleep(0.2)
+            await sync_to_async(self.deliver)(self.fans[0])
+            data = await asyncio.wait_for(waiting, 5)
+        self.assertEqual([item["target_id"] for item in data["results"]], [0])
+
+    async def test_a_ticket_from_the_ticket_endpoint_opens_the_stream(self):
+        response = await self.async_client.post("/api/v1/notifications/stream/ticket/")
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.post("/api/v1/notifications/stream/ticket/", headers=self.auth)
+        self.assertEqual((response.status_code, response.json()["expires_in"]), (201, 60))
+
+        stream = await self.open_stream({"ticket": response.json()["ticket"]})
+        self.assertEqual(await self.next_event(stream), ("unread", None, {"unread_count": 0}))
+        await self.close_stream(stream)
+
+    async def test_missing_or_invalid_credentials_are_rejected(self):
+        ticket = stream_ticket(self.cook)
+        expired = time.time() + 61
+        for path, params, headers in [
+            ("stream", {}, {}),
+            ("poll", {}, {}),
+            ("stream", {}, {"authorization": "Bearer not-a-token"}),
+            ("poll", {}, {"authorization": "Bearer not-a-token"}),
+            # Access tokens are never read from the query string.
+            ("stream", {"token": str(AccessToken.for_user(self.cook))}, {}),
+            # Tickets only open the stream.
+            ("poll", {"ticket": ticket}, {}),
+            ("stream", {"ticket": ticket + "x"}, {}),
+        ]:
+            with self.subTest(path=path, params=params, headers=headers):
+                response = await self.async_client.get(f"/api/v1/notifications/{path}/", params, headers=headers)
+                self.assertEqual(response.status_code, 401)
+
+        with mock.patch("django.core.signing.time.time", return_value=expired):
+            response = await self.async_client.get("/api/v1/notifications/stream/", {"ticket": ticket})
+        self.assertEqual(response.status_code, 401)
+
+
+# ─── Retention ─────────────────────────────────────────────────────────────────
+
+class RetentionTests(NotificationTestCase):
+    def setUp(self):
+        super().setUp()
+        with self.captureOnCommitCallbacks(execute=True):
+            for number, fan in enumerate(self.fans):
+                self.notify(self.cook, fan, "rated your recipe", "rating", number)
+            self.notify(self.cook, self.fans[0], "Welcome!", "system", None)
+
+    def age(self, days, **filters):
+        then = timezone.now() - timedelta(days=days)
+        self.inbox().filter(**filters).update(created_at=then, updated_at=then)
+
+    def prune(self, *args):
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("prune_notifications", *args, stdout=out)
+        return out.getvalue()
+
+    def test_old_read_notifications_move_to_the_monthly_archive(self):
+        self.inbox().filter(target_id__in=[0, 1]).update(is_read=True)
+        self.age(40, target_id__in=[0, 1, 2])
+        self.assertIn("Archived 2 read notification(s).", self.prune())
+        self.assertEqual(set(self.inbox().values_list("target_id", flat=True)), {2, 3, None})
+
+        archive = NotificationArchive.objects.get(recipient=self.cook)
+        self.assertEqual(archive.count, 2)
+        self.assertEqual(sorted(entry["target_id"] for entry in archive.entries()), [0, 1])
+        self.assertEqual(archive.entries()[0]["verb"], "rated your recipe")
+
+        # A later run appends to the same month.
+        self.inbox().filter(target_id=2).update(is_read=True)
+        self.prune()
+        archive.refresh_from_db()
+        self.assertEqual(archive.count, 3)
+
+        self.client.force_authenticate(self.cook)
+        months = self.client.get("/api/v1/notifications/archive/").data["results"]
+        self.assertEqual([month["count"] for month in months], [3])
+
+    def test_expired_notifications_are_deleted_per_type_and_leave_the_badge(self):
+        self.assertEqual(unread_count(self.cook.pk), 5)
+        self.age(200)
+        output = self.prune("--no-archive")
+        self.assertIn("Expired 4 rating notification(s).", output)
+        # System notifications fall under the default TTL (365 days).
+        self.assertEqual(list(self.inbox().values_list("notification_type", flat=True)), ["system"])
+        self.assertEqual(unread_count(self.cook.pk), 1)
+
+    def test_types_without_a_ttl_are_kept(self):
+        self.age(1000)
+        with self.settings(NOTIFICATIONS={"RETENTION": {"DEFAULT": None, "rating": 30}}):
+            self.assertEqual(retention.expire(), {"rating": 4})
+        self.assertEqual(self.inbox().count(), 1)
+
+    def test_old_archive_months_are_pruned(self):
+        NotificationArchive.objects.create(
+            recipient=self.cook, period=timezone.localdate().replace(day=1) - timedelta(days=1000), count=1,
+            payload=NotificationArchive.pack([]),
+        )
+        self.assertIn("Deleted 1 archive month(s).", self.prune())
+        self.assertFalse(NotificationArchive.objects.exists())
+
+    def test_partitioning_needs_postgresql(self):
+        with self.assertRaisesMessage(CommandError, "only supported on PostgreSQL"):
+            call_command("partition_notifications", stdout=StringIO())
@@ -1,9 +1,13 @@
 from django.urls import path
 
 from .views import (
+    NotificationArchiveView,
     NotificationDetailView,
     NotificationListView,
     NotificationMarkReadView,
+    NotificationPollView,
+    NotificationStreamTicketView,
+    NotificationStreamView,
     UnreadCountView,
 )
 
@@ -11,5 +15,9 @@ urlpatterns = [
     path("", NotificationListView.as_view(), name="notification-list"),
     path("mark-read/", NotificationMarkReadView.as_view(), name="notification-mark-read"),
     path("unread-count/", UnreadCountView.as_view(), name="notification-unread-count"),
+    path("archive/", NotificationArchiveView.as_view(), name="notification-archive"),
+    path("stream/", NotificationStreamView.as_view(), name="notification-stream"),
+    path("stream/ticket/", NotificationStreamTicketView.as_view(), name="notification-stream-ticket"),
+    path("poll/", NotificationPollView.as_view(), name="notification-poll"),
     path("<int:pk>/", NotificationDetailView.as_view(), name="notification-detail"),
 ]
@@ -1,16 +1,35 @@
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.http import JsonResponse, StreamingHttpResponse
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from django.views import View
 from drf_spectacular.utils import extend_schema, inline_serializer
 from rest_framework import generics, permissions, serializers, status
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.response import Response
 from rest_framework.views import APIView
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 
-from .models import Notification
-from .serializers import NotificationSerializer
+from .broker import get_broker
+from .counters import adjust_unread, unread_count
+from .models import Notification, NotificationArchive
+from .serializers import NotificationArchiveSerializer, NotificationSerializer
+from .services import attach_latest_actors, notification_event
 
 
 class NotificationListView(generics.ListAPIView):
     """
     GET /api/v1/notifications/
         ?unread=true  — filter to unread only
+
+    Most recently active first; grouped notifications move up as they grow.
     """
 
     serializer_class = NotificationSerializer
@@ -24,6 +43,12 @@ class NotificationListView(generics.ListAPIView):
             qs = qs.filter(is_read=False)
         return qs
 
+    def paginate_queryset(self, queryset):
+        page = super().paginate_queryset(queryset)
+        if page is not None:
+            attach_latest_actors(page)
+        return page
+
 
 @extend_schema(
     request=inline_serializer("MarkReadRequest", fields={"ids": serializers.ListField(child=serializers.IntegerField(), required=False)}),
@@ -45,6 +70,7 @@ class NotificationMarkReadView(APIView):
         if ids:
             qs = qs.filter(pk__in=ids)
         updated = qs.update(is_read=True)
+        adjust_unread({request.user.pk: -updated})
         return Response({"detail": f"{updated} notification(s) marked as read."})
 
 
@@ -57,16 +83,244 @@ class NotificationDetailView(generics.RetrieveDestroyAPIView):
     def get_queryset(self):
         return Notification.objects.filter(recipient=self.request.user)
 
+    def perform_destroy(self, instance):
+        # Only the request that deletes it while unread moves the counter.
+        deleted, _ = Notification.objects.filter(pk=instance.pk, is_read=False).delete()
+        if deleted:
+            adjust_unread({instance.recipient_id: -1})
+        else:
+            instance.delete()
+
 
 @extend_schema(
     responses={200: inline_serializer("UnreadCountResponse", fields={"unread_count": serializers.IntegerField()})},
     description="Return the number of unread notifications for the authenticated user.",
 )
 class UnreadCountView(APIView):
-    """GET /api/v1/notifications/unread-count/ — quick badge count."""
+    """
+    GET /api/v1/notifications/unread-count/ — quick badge count, served from
+    the cached per-user counter (no COUNT over the table).
+    """
 
     permission_classes = [permissions.IsAuthenticated]
 
     def get(self, request):
-        count = Notification.objects.filter(recipient=request.user, is_read=False).count()
-        return Response({"unread_count": count})
\ No newline at end of file
+        return Response({"unread_count": unread_count(request.user.pk)})
+
+
+class NotificationArchiveView(generics.ListAPIView):
+    """
+    GET /api/v1/notifications/archive/
+
+    Read notifications compacted out of the inbox by prune_notifications,
+    one entry per month, newest month first.
+    """
+
+    serializer_class = NotificationArchiveSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        if getattr(self, "swagger_fake_view", False):
+            return NotificationArchive.objects.none()
+        return NotificationArchive.objects.filter(recipient=self.request.user)
+
+
+# ─── Real-time ─────────────────────────────────────────────────────────────────
+# Async views: serve them through config/asgi.py (e.g. uvicorn/daphne).  Under
+# WSGI every open stream holds a worker thread.
+
+STREAM_DEFAULTS = {
+    "STREAM_KEEPALIVE": 15,
+    "STREAM_MAX_SECONDS": 300,
+    "STREAM_TICKET_TTL": 60,
+    "POLL_TIMEOUT": 25,
+}
+REPLAY_LIMIT = 50
+STREAM_TICKET_SALT = "apps.notifications.stream"
+
+
+def _stream_config() -> dict:
+    return {**STREAM_DEFAULTS, **getattr(settings, "NOTIFICATIONS", {})}
+
+
+def stream_ticket(user) -> str:
+    """A signed ticket that opens ``user``'s event stream for ``STREAM_TICKET_TTL`` seconds."""
+    return signing.TimestampSigner(salt=STREAM_TICKET_SALT).sign(str(user.pk))
+
+
+def _ticket_user(ticket):
+    try:
+        user_id = signing.TimestampSigner(salt=STREAM_TICKET_SALT).unsign(
+            ticket, max_age=_stream_config()["STREAM_TICKET_TTL"]
+        )
+    except signing.BadSignature:
+        return None
+    return get_user_model().objects.filter(pk=user_id, is_active=True).first()
+
+
+async def _authenticate(request, allow_ticket=False):
+    """
+    The user of the JWT in the ``Authorization`` header or, with
+    ``allow_ticket``, of a stream ticket in the ``ticket`` parameter.
+
+    Only the SSE stream allows tickets, for ``EventSource`` clients that can't
+    set headers.  Query strings end up in access logs, so the parameter never
+    carries the access token itself.
+    """
+    authenticator = JWTAuthentication()
+    header = authenticator.get_header(request)
+    if header is None:
+        ticket = request.GET.get("ticket") if allow_ticket else None
+        return await sync_to_async(_ticket_user)(ticket) if ticket else None
+    raw_token = authenticator.get_raw_token(header)
+    if not raw_token:
+        return None
+    try:
+        validated = authenticator.get_validated_token(raw_token)
+        return await sync_to_async(authenticator.get_user)(validated)
+    except (AuthenticationFailed, InvalidToken, TokenError):
+        return None
+
+
+def _unauthorized():
+    return JsonResponse(
+        {"detail": "Authentication credentials were not provided or are invalid."},
+        status=status.HTTP_401_UNAUTHORIZED,
+    )
+
+
+def _changed_since(user_id, since):
+    return list(
+        Notification.objects.filter(recipient_id=user_id, updated_at__gt=since)
+        .select_related("actor")
+        .order_by("updated_at", "pk")[:REPLAY_LIMIT]
+    )
+
+
+def _sse(event, data, event_id=None) -> str:
+    lines = [f"event: {event}"]
+    if event_id:
+        lines.append(f"id: {event_id}")
+    lines.append(f"data: {json.dumps(data, default=str)}")
+    return "\n".join(lines) + "\n\n"
+
+
+async def _event_stream(user_id, since):
+    config = _stream_config()
+    loop = asyncio.get_running_loop()
+    subscription = await get_broker().subscribe(user_id)
+    try:
+        yield "retry: 3000\n\n"
+        if since is not None:
+            # Reconnect: replay what changed while the client was away.
+            for notification in await sync_to_async(_changed_since)(user_id, since):
+                data = notification_event(notification)["data"]
+                yield _sse("notification", data, event_id=data["updated_at"])
+        yield _sse("unread", {"unread_count": await sync_to_async(unread_count)(user_id)})
+
+        deadline = loop.time() + config["STREAM_MAX_SECONDS"]
+        while (remaining := deadline - loop.time()) > 0:
+            try:
+                event = await asyncio.wait_for(subscription.get(), min(config["STREAM_KEEPALIVE"], remaining))
+            except asyncio.TimeoutError:
+                yield ": keep-alive\n\n"
+                continue
+            if event["type"] == "unread":
+                yield _sse("unread", {"unread_count": await sync_to_async(unread_count)(user_id)})
+            else:
+                yield _sse(event["type"], event["data"], event_id=event["data"].get("updated_at"))
+    finally:
+        await subscription.close()
+
+
+@extend_schema(
+    request=None,
+    responses={201: inline_serializer("StreamTicketResponse", fields={
+        "ticket": serializers.CharField(),
+        "expires_in": serializers.IntegerField(),
+    })},
+    description="Issue a short-lived ticket for opening the notification stream as ?ticket=.",
+)
+class NotificationStreamTicketView(APIView):
+    """
+    POST /api/v1/notifications/stream/ticket/ — a ticket for
+    ``/stream/?ticket=``, valid for ``STREAM_TICKET_TTL`` seconds and for
+    nothing but opening the stream.
+    """
+
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        return Response(
+            {"ticket": stream_ticket(request.user), "expires_in": _stream_config()["STREAM_TICKET_TTL"]},
+            status=status.HTTP_201_CREATED,
+        )
+
+
+class NotificationStreamView(View):
+    """
+    GET /api/v1/notifications/stream/ — Server-Sent Events.
+
+    Sends ``notification`` events (new or grown notifications, ``id`` = their
+    ``updated_at``) and ``unread`` events (``{"unread_count": n}``), with a
+    keep-alive comment every ``STREAM_KEEPALIVE`` seconds.  The server ends the
+    stream after ``STREAM_MAX_SECONDS``; clients reconnect with
+    ``Last-Event-ID`` (or ``?since=``) and the missed notifications are
+    replayed.  ``EventSource`` clients authenticate with ``?ticket=`` from
+    ``/stream/ticket/``, fetching a fresh one for every reconnect.
+    """
+
+    async def get(self, request):
+        user = await _authenticate(request, allow_ticket=True)
+        if user is None:
+            return _unauthorized()
+        since = parse_datetime(request.headers.get("Last-Event-ID") or request.GET.get("since") or "")
+        response = StreamingHttpResponse(_event_stream(user.pk, since), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
+class NotificationPollView(View):
+    """
+    GET /api/v1/notifications/poll/?since=<updated_at>&timeout=25 — long poll.
+
+    Returns at once if notifications changed after ``since``, otherwise waits
+    up to ``timeout`` seconds for one (or for the unread count to change).
+    Pass the returned ``since`` to the next poll; nothing is missed between
+    polls.
+    """
+
+    async def get(self, request):
+        user = await _authenticate(request)
+        if user is None:
+            return _unauthorized()
+        config = _stream_config()
+        since = parse_datetime(request.GET.get("since") or "") or timezone.now()
+        try:
+            timeout = min(max(int(request.GET.get("timeout", config["POLL_TIMEOUT"])), 0), config["POLL_TIMEOUT"])
+        except ValueError:
+            return JsonResponse({"timeout": ["Must be an integer."]}, status=status.HTTP_400_BAD_REQUEST)
+
+        # Subscribe before looking, so an event between the two isn't lost.
+        subscription = await get_broker().subscribe(user.pk)
+        try:
+            changed = await sync_to_async(_changed_since)(user.pk, since)
+            if not changed and timeout:
+                try:
+                    await asyncio.wait_for(subscription.get(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+                changed = await sync_to_async(_changed_since)(user.pk, since)
+        finally:
+            await subscription.close()
+
+        def render():
+            attach_latest_actors(changed)
+            return NotificationSerializer(changed, many=True).data
+
+        return JsonResponse({
+            "results": await sync_to_async(render)(),
+            "unread_count": await sync_to_async(unread_count)(user.pk),
+            "since": (changed[-1].updated_at if changed else since).isoformat(),
+        })
@@ -1,15 +1,18 @@
 from django.contrib import admin
-from .models import Tag, MealType, Recipe
+from .models import Ingredient, Tag, MealType, Recipe
 
 # Register your models here.
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
     list_display = ("name", "author", "cuisine", "difficulty", "rating", "review_count", "is_published", "created_at")
     list_filter = ("difficulty", "cuisine", "is_published", "meal_types")
-    search_fields = ("name", "cuisine", "author__username")
+    search_fields = ("name", "cuisine", "author__username", "external_id")
     filter_horizontal = ("tags", "meal_types")
     raw_id_fields = ("author",)
-    readonly_fields = ("rating", "review_count", "created_at", "updated_at")
+    readonly_fields = (
+        "rating", "review_count", "rating_sum", "imported_rating_sum", "imported_review_count",
+        "comment_count", "save_count", "share_count", "ingredient_count", "external_source", "external_id", "content_hash", "created_at", "updated_at",
+    )
     ordering = ("-created_at",)
  
  
@@ -24,4 +27,9 @@ class TagAdmin(admin.ModelAdmin):
 class MealTypeAdmin(admin.ModelAdmin):
     list_display = ("name",)
     search_fields = ("name",)
- 
\ No newline at end of file
+
+
+@admin.register(Ingredient)
+class IngredientAdmin(admin.ModelAdmin):
+    list_display = ("name",)
+    search_fields = ("name",)
@@ -0,0 +1,264 @@
+"""
+Versioned response cache for the anonymous, read-mostly recipe endpoints.
+
+Rendered responses are stored in Django's cache framework (locmem by default,
+Redis when ``REDIS_URL`` is set) under a key built from the host, path,
+normalised query string and renderer.  Each entry records the versions of the
+*namespaces* it was built from; signals bump those versions after commit,
+which makes exactly the affected entries stale without scanning or deleting
+keys:
+
+* ``recipes`` — which recipes exist and their content (lists, cuisines);
+* ``taxonomy`` — tag and meal type names;
+* ``recipe:<id>`` — one recipe, including its rating and engagement counters.
+  List entries record the ``recipe:<id>`` of every recipe on the page, so a
+  vote refreshes the pages showing that recipe and nothing else;
+* ``recipe-counters`` — any counter, for lists filtered or ordered by one.
+
+When the cache is shared the versions live in it; with a per-process cache
+they are kept in the database instead (``ResponseCacheVersion``), so an
+invalidation reaches the entries of every worker.
+
+A stale entry is still served for ``STALE_WHILE_REVALIDATE`` seconds while a
+single request (guarded by a short lock) rebuilds it, so a cold or freshly
+invalidated list is never rebuilt by every concurrent request.  Responses
+carry an ``ETag`` and honour ``If-None-Match`` with ``304 Not Modified``.
+
+Only anonymous ``GET``/``HEAD`` requests are cached.  Data not covered by a
+namespace (e.g. author follower counts), and a counter that moves while a
+list page is being built, may be stale for up to ``TIMEOUT``.
+"""
+
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+
+from apps.core.caches import is_shared
+
+from .models import ResponseCacheVersion
+
+RECIPES = "recipes"
+TAXONOMY = "taxonomy"
+COUNTERS = "recipe-counters"
+
+DEFAULTS = {
+    "ALIAS": "default",
+    "TIMEOUT": 60,
+    "STALE_WHILE_REVALIDATE": 300,
+    "LOCK_TIMEOUT": 30,
+}
+
+
+def recipe_namespace(pk) -> str:
+    return f"recipe:{pk}"
+
+
+def _config() -> dict:
+    return {**DEFAULTS, **getattr(settings, "RESPONSE_CACHE", {})}
+
+
+def _cache():
+    return caches[_config()["ALIAS"]]
+
+
+def _version_key(namespace: str) -> str:
+    return f"rc:v:{namespace}"
+
+
+def _initial_version() -> int:
+    # Time-based so a version key that was evicted never restarts at a value
+    # an older cached entry may still carry.
+    return time.time_ns() // 1000
+
+
+def _versions(namespaces) -> dict:
+    """Current version of each of ``namespaces``, creating missing counters."""
+    namespaces = list(dict.fromkeys(namespaces))
+    if not namespaces:
+        return {}
+    cache = _cache()
+    if is_shared(cache):
+        stored = cache.get_many([_version_key(namespace) for namespace in namespaces])
+        versions = {}
+        for namespace in namespaces:
+            key = _version_key(namespace)
+            if key not in stored:
+                cache.add(key, _initial_version(), None)
+                stored[key] = cache.get(key)
+            versions[namespace] = stored[key]
+        return versions
+
+    versions = dict(
+        ResponseCacheVersion.objects.filter(namespace__in=namespaces).values_list("namespace", "version")
+    )
+    missing = [namespace for namespace in namespaces if namespace not in versions]
+    if missing:
+        ResponseCacheVersion.objects.bulk_create(
+            [ResponseCacheVersion(namespace=namespace, version=_initial_version()) for namespace in missing],
+            ignore_conflicts=True,
+        )
+        versions.update(
+            ResponseCacheVersion.objects.filter(namespace__in=missing).values_list("namespace", "version")
+        )
+    return versions
+
+
+def _bump(namespaces) -> None:
+    cache = _cache()
+    if is_shared(cache):
+        for namespace in namespaces:
+            key = _version_key(namespace)
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.add(key, _initial_version(), None)
+        return
+    # A namespace without a row has no entries to invalidate; _versions()
+    # creates it when one is built.
+    ResponseCacheVersion.objects.filter(namespace__in=namespaces).update(version=F("version") + 1)
+
+
+def invalidate(*namespaces) -> None:
+    """Mark every response built from ``namespaces`` stale once the transaction commits."""
+    if namespaces:
+        transaction.on_commit(lambda: _bump(namespaces))
+
+
+def invalidate_recipes(*recipe_ids) -> None:
+    """Invalidate recipe lists and the detail responses of ``recipe_ids``."""
+    invalidate(RECIPES, *(recipe_namespace(pk) for pk in recipe_ids))
+
+
+def invalidate_recipe_counters(*recipe_ids) -> None:
+    """
+    Invalidate the responses showing ``recipe_ids`` after a rating or
+    engagement counter moved, and the lists filtered or ordered by counters.
+    """
+    invalidate(COUNTERS, *(recipe_namespace(pk) for pk in recipe_ids))
+
+
+def is_cacheable(request) -> bool:
+    return request.method in ("GET", "HEAD") and not request.user.is_authenticated
+
+
+def response_key(request) -> str:
+    params = sorted((key, sorted(values)) for key, values in request.query_params.lists())
+    raw = "|".join([
+        request.scheme,
+        request.get_host(),
+        request.path,
+        urlencode(params, doseq=True),
+        request.accepted_renderer.format,
+    ])
+    return f"rc:r:{hashlib.sha1(raw.encode()).hexdigest()}"
+
+
+def _etag(content: bytes) -> str:
+    return f'"{hashlib.md5(content).hexdigest()}"'
+
+
+def _serve(request, entry, status_label):
+    response = HttpResponse(entry["content"], status=entry["status"], content_type=entry["type"])
+    response["ETag"] = entry["etag"]
+    response["X-Cache"] = status_label
+    return get_conditional_response(request, etag=entry["etag"], response=response)
+
+
+class CachedResponseMixin:
+    """
+    Serve anonymous reads of a DRF view from the response cache.
+
+    ``cache_dependencies`` lists the namespaces the view's output is built
+    from; override ``get_cache_dependencies`` when they depend on the URL.
+    With ``cache_recipe_members`` the entry also depends on every recipe in
+    the (paginated) list it holds.
+
+    A miss is stored from ``finalize_response``, once the view's response
+    has been finalized by ``dispatch``.
+    """
+
+    cache_dependencies = ()
+    cache_recipe_members = False
+
+    def get_cache_dependencies(self):
+        return list(self.cache_dependencies)
+
+    def get_cache_members(self, data) -> list[str]:
+        """Namespaces of the recipes in the response ``data``."""
+        if not self.cache_recipe_members:
+            return []
+        if isinstance(data, dict):
+            data = data.get("results", [])
+        return [recipe_namespace(item["id"]) for item in data if isinstance(item, dict) and "id" in item]
+
+    def get(self, request, *args, **kwargs):
+        self._cache_miss = None
+        if not is_cacheable(request):
+            return super().get(request, *args, **kwargs)
+
+        config = _config()
+        cache = _cache()
+        key = response_key(request)
+        dependencies = self.get_cache_dependencies()
+
+        locked = False
+        entry = cache.get(key)
+        members = entry.get("members", {}) if entry is not None else {}
+        versions = _versions([*dependencies, *members])
+        version = ".".join(str(versions[namespace]) for namespace in dependencies)
+        if entry is not None:
+            age = time.time() - entry["time"]
+            current = entry["version"] == version and all(
+                versions[namespace] == member_version for namespace, member_version in members.items()
+            )
+            if current and age < config["TIMEOUT"]:
+                return _serve(request, entry, "HIT")
+            locked = cache.add(f"{key}:lock", 1, config["LOCK_TIMEOUT"])
+            if not locked and age < config["TIMEOUT"] + config["STALE_WHILE_REVALIDATE"]:
+                # Someone else is already rebuilding this entry.
+                return _serve(request, entry, "STALE")
+
+        self._cache_miss = (key, version, locked)
+        return super().get(request, *args, **kwargs)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        miss = getattr(self, "_cache_miss", None)
+        if miss is None:
+            return response
+        self._cache_miss = None
+        key, version, locked = miss
+        cache = _cache()
+        try:
+            if response.status_code != 200:
+                return response
+            members = _versions(self.get_cache_members(response.data))
+            response.render()
+            etag = _etag(response.content)
+            config = _config()
+            cache.set(
+                key,
+                {
+                    "version": version,
+                    "members": members,
+                    "time": time.time(),
+                    "status": response.status_code,
+                    "type": response["Content-Type"],
+                    "content": response.content,
+                    "etag": etag,
+                },
+                config["TIMEOUT"] + config["STALE_WHILE_REVALIDATE"],
+            )
+            response["ETag"] = etag
+            response["X-Cache"] = "MISS"
+            return get_conditional_response(request, etag=etag, response=response)
+        finally:
+            if locked:
+                cache.delete(f"{key}:lock")
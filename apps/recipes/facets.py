@@ -0,0 +1,378 @@
+"""
+Facet counts for the recipe browser.
+
+``FacetIndex`` holds one ``Bitmap`` per facet value (recipe *n* in it ⇔
+published recipe *n* has that value) for every dimension the browser filters
+on: cuisine, difficulty, meal type, tag and calorie band.  Counting a facet
+under a selection is then an ``&`` of a few bitmaps and a ``bit_count()`` per
+value, with no query for the facet dimensions.  Each dimension is counted
+with every selection *except its own*, so the browser can show what switching
+that filter would give.  A bitmap is split into blocks of 2**16 recipe ids
+and only stores the blocks its recipes fall in, so a rare value costs a few
+bytes rather than a bit per recipe ever created.
+
+Every process keeps its own index, built from the database once and then
+kept current incrementally: ``mark_changed(*recipe_ids)`` (called by the
+recipe signals and the importer) logs the ids in a ``FacetChange`` row,
+committed with the change itself; ``get_index()`` re-reads just the recipes
+logged since the last row it saw, clearing and setting their bits in the
+blocks they fall in.  A process more than ``MAX_LAG`` changes behind, or that
+hasn't caught up for ``CHANGE_TTL`` seconds (``prune_changes`` deletes rows
+that old), rebuilds.  Change ids are allocated before their transaction
+commits, so one skipped over may still appear; it is looked for again for
+``GAP_TIMEOUT`` seconds.
+
+``query_counts`` gives the same counts with ``GROUP BY`` queries, for
+filters the index can't answer that match more than ``MAX_MATCHES`` recipes.
+Configured by ``settings.RECIPE_FACETS``.
+"""
+
+import threading
+import time
+from collections import defaultdict
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Case, CharField, Count, F, Max, Min, Q, Value, When
+from django.db.models.functions import Lower
+from django.utils import timezone
+
+from .models import FacetChange, Recipe
+
+DEFAULTS = {
+    "CHANGE_TTL": 86400,
+    "MAX_LAG": 1000,
+    "GAP_TIMEOUT": 300,
+    "MAX_MATCHES": 10_000,
+}
+
+DIMENSIONS = ("cuisine", "difficulty", "meal_type", "tag", "calories")
+# (value, lowest, highest) in calories per serving, inclusive.
+CALORIE_BANDS = (
+    ("0-299", 0, 299),
+    ("300-499", 300, 499),
+    ("500-699", 500, 699),
+    ("700+", 700, None),
+)
+# Dimensions whose values are matched case-insensitively.
+LOWERED = ("cuisine", "meal_type", "tag")
+FIELDS = {
+    "cuisine": "cuisine",
+    "difficulty": "difficulty",
+    "meal_type": "meal_types__name",
+    "tag": "tags__name",
+}
+
+BLOCK_BITS = 16
+_BLOCK_MASK = (1 << BLOCK_BITS) - 1
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def _config() -> dict:
+    return {**DEFAULTS, **getattr(settings, "RECIPE_FACETS", {})}
+
+
+def calorie_band(calories) -> str | None:
+    if calories is None:
+        return None
+    for value, lowest, highest in CALORIE_BANDS:
+        if calories >= lowest and (highest is None or calories <= highest):
+            return value
+    return None
+
+
+def calorie_bands(minimum, maximum) -> list[str] | None:
+    """
+    The bands exactly covering ``minimum``–``maximum`` (either may be
+    ``None``), or ``None`` if the range doesn't fall on band edges.
+    """
+    lows = {lowest for _, lowest, _ in CALORIE_BANDS}
+    highs = {highest for _, _, highest in CALORIE_BANDS}
+    if (minimum is not None and minimum not in lows) or (maximum is not None and maximum not in highs):
+        return None
+    return [
+        value
+        for value, lowest, highest in CALORIE_BANDS
+        if (minimum is None or lowest >= minimum)
+        and (maximum is None or (highest is not None and highest <= maximum))
+    ]
+
+
+def _pack(offsets) -> int:
+    """An int with the bits at ``offsets`` set."""
+    bits = bytearray(max(offsets) // 8 + 1)
+    for offset in offsets:
+        bits[offset >> 3] |= 1 << (offset & 7)
+    return int.from_bytes(bits, "little")
+
+
+class Bitmap:
+    """
+    A set of recipe ids as ``{block: int}``, bit *n* of block *b* standing
+    for id ``b * 2**16 + n``.  Empty blocks are never stored.  The index
+    treats its bitmaps as immutable (``|`` and ``-`` return new ones), so a
+    request counting while another refreshes sees a consistent index.
+    """
+
+    __slots__ = ("blocks",)
+
+    def __init__(self, blocks=None):
+        self.blocks = {} if blocks is None else blocks
+
+    @classmethod
+    def of(cls, positions) -> "Bitmap":
+        offsets = defaultdict(list)
+        for position in positions:
+            offsets[position >> BLOCK_BITS].append(position & _BLOCK_MASK)
+        return cls({block: _pack(block_offsets) for block, block_offsets in offsets.items()})
+
+    def __bool__(self) -> bool:
+        return bool(self.blocks)
+
+    def __contains__(self, position) -> bool:
+        return bool(self.blocks.get(position >> BLOCK_BITS, 0) >> (position & _BLOCK_MASK) & 1)
+
+    def __and__(self, other) -> "Bitmap":
+        smaller, larger = sorted((self.blocks, other.blocks), key=len)
+        blocks = {}
+        for block, bits in smaller.items():
+            if both := bits & larger.get(block, 0):
+                blocks[block] = both
+        return Bitmap(blocks)
+
+    def __or__(self, other) -> "Bitmap":
+        union = Bitmap(dict(self.blocks))
+        union.update(other)
+        return union
+
+    def __sub__(self, other) -> "Bitmap":
+        if not any(block in self.blocks for block in other.blocks):
+            return self
+        difference = Bitmap(dict(self.blocks))
+        difference.difference_update(other)
+        return difference
+
+    def update(self, other) -> None:
+        """Add the ids of ``other``."""
+        for block, bits in other.blocks.items():
+            self.blocks[block] = self.blocks.get(block, 0) | bits
+
+    def difference_update(self, other) -> None:
+        """Remove the ids of ``other``, touching only its blocks."""
+        for block, bits in other.blocks.items():
+            if block in self.blocks:
+                if remaining := self.blocks[block] & ~bits:
+                    self.blocks[block] = remaining
+                else:
+                    del self.blocks[block]
+
+    def bit_count(self) -> int:
+        return sum(bits.bit_count() for bits in self.blocks.values())
+
+    def intersection_count(self, other) -> int:
+        """``(self & other).bit_count()`` without building the intersection."""
+        smaller, larger = sorted((self.blocks, other.blocks), key=len)
+        return sum((bits & larger.get(block, 0)).bit_count() for block, bits in smaller.items())
+
+
+# ─── Index ─────────────────────────────────────────────────────────────────────
+
+class FacetIndex:
+    def __init__(self, version=0):
+        self.version = version
+        # Change ids below ``version`` not seen yet -> time.monotonic() when first missed.
+        self.gaps = {}
+        self.synced_at = timezone.now()
+        self.published = Bitmap()
+        self.bitmaps = {dimension: {} for dimension in DIMENSIONS}
+        self.labels = {dimension: {} for dimension in DIMENSIONS}
+
+    @classmethod
+    def build(cls) -> "FacetIndex":
+        """Load every published recipe, as of the latest logged change."""
+        horizon = timezone.now() - timedelta(seconds=_config()["GAP_TIMEOUT"])
+        recent = set(FacetChange.objects.filter(created_at__gte=horizon).values_list("pk", flat=True))
+        settled = FacetChange.objects.filter(created_at__lt=horizon).aggregate(last=Max("pk"))["last"]
+        if settled is None:
+            settled = min(recent, default=1) - 1
+        index = cls(max(recent, default=settled))
+        now = time.monotonic()
+        index.gaps = {pk: now for pk in range(settled + 1, index.version) if pk not in recent}
+        index._load(Recipe.objects.all())
+        return index
+
+    def _load(self, recipes, published=None, bitmaps=None) -> None:
+        """
+        Add the facet values of the published ``recipes`` to ``published`` and
+        ``bitmaps`` (by default the index's own), then swap them in.
+        """
+        recipes = recipes.filter(is_published=True)
+        positions = defaultdict(list)
+        loaded = []
+
+        def add(dimension, label, pk):
+            if label:
+                key = label.lower() if dimension in LOWERED else label
+                positions[(dimension, key)].append(pk)
+                self.labels[dimension].setdefault(key, label)
+
+        for pk, cuisine, difficulty, calories in recipes.values_list(
+            "pk", "cuisine", "difficulty", "calories_per_serving"
+        ).iterator(chunk_size=10_000):
+            loaded.append(pk)
+            add("cuisine", cuisine, pk)
+            add("difficulty", difficulty, pk)
+            add("calories", calorie_band(calories), pk)
+        for pk, name in Recipe.tags.through.objects.filter(recipe__in=recipes).values_list(
+            "recipe_id", "tag__name"
+        ).iterator(chunk_size=10_000):
+            add("tag", name, pk)
+        for pk, name in Recipe.meal_types.through.objects.filter(recipe__in=recipes).values_list(
+            "recipe_id", "mealtype__name"
+        ).iterator(chunk_size=10_000):
+            add("meal_type", name, pk)
+
+        if bitmaps is None:
+            bitmaps = {dimension: dict(values) for dimension, values in self.bitmaps.items()}
+        for (dimension, key), pks in positions.items():
+            values = bitmaps[dimension]
+            values[key] = values.get(key, Bitmap()) | Bitmap.of(pks)
+        self.published = (self.published if published is None else published) | Bitmap.of(loaded)
+        self.bitmaps = bitmaps
+
+    def refresh(self, recipe_ids) -> None:
+        """Re-read ``recipe_ids``: clear their bits everywhere, then set them anew."""
+        if not recipe_ids:
+            return
+        changed = Bitmap.of(recipe_ids)
+        self._load(
+            Recipe.objects.filter(pk__in=recipe_ids),
+            self.published - changed,
+            {
+                dimension: {key: rest for key, bitmap in values.items() if (rest := bitmap - changed)}
+                for dimension, values in self.bitmaps.items()
+            },
+        )
+
+    def sync(self) -> bool:
+        """Replay the change log since ``version``; ``False`` if only a rebuild will do."""
+        config = _config()
+        now = timezone.now()
+        if now - self.synced_at > timedelta(seconds=config["CHANGE_TTL"]):
+            # Changes logged since may already be pruned.
+            return False
+        rows = list(
+            FacetChange.objects.filter(Q(pk__gt=self.version) | Q(pk__in=self.gaps))
+            .order_by("pk")
+            .values_list("pk", "recipe_ids")[:config["MAX_LAG"] + 1]
+        )
+        if len(rows) > config["MAX_LAG"]:
+            return False
+
+        clock = time.monotonic()
+        changed = set()
+        for pk, recipe_ids in rows:
+            changed.update(recipe_ids)
+            if self.gaps.pop(pk, None) is None:
+                # Ids skipped over belong to transactions still open (or rolled back).
+                self.gaps.update(dict.fromkeys(range(self.version + 1, pk), clock))
+                self.version = pk
+        self.gaps = {pk: missed for pk, missed in self.gaps.items() if clock - missed < config["GAP_TIMEOUT"]}
+        self.refresh(changed)
+        self.synced_at = now
+        return True
+
+    def counts(self, selected: dict[str, Bitmap], restrict: Bitmap | None = None) -> dict:
+        """
+        ``{"count": matches, "facets": {dimension: [(label, key, count), …]}}``
+        for the ``selected`` bitmap of each filtered dimension, within
+        ``restrict`` (recipes matching the filters that are not facets).
+        """
+        universe = self.published if restrict is None else self.published & restrict
+        matches = universe
+        for chosen in selected.values():
+            matches &= chosen
+        facets = {}
+        for dimension in DIMENSIONS:
+            base = universe
+            for other, chosen in selected.items():
+                if other != dimension:
+                    base &= chosen
+            facets[dimension] = [
+                (self.labels[dimension][key], key, count)
+                for key, values in self.bitmaps[dimension].items()
+                if (count := base.intersection_count(values))
+            ]
+        return {"count": matches.bit_count(), "facets": facets}
+
+
+# ─── Database counts ───────────────────────────────────────────────────────────
+
+def matching(queryset) -> Bitmap | None:
+    """A bitmap of the recipe ids in ``queryset``; ``None`` if there are more than ``MAX_MATCHES``."""
+    limit = _config()["MAX_MATCHES"]
+    ids = list(queryset.values_list("pk", flat=True)[:limit + 1])
+    return None if len(ids) > limit else Bitmap.of(ids)
+
+
+def _calorie_band_expression() -> Case:
+    return Case(
+        *[
+            When(
+                Q(calories_per_serving__gte=lowest)
+                & (Q() if highest is None else Q(calories_per_serving__lte=highest)),
+                then=Value(value),
+            )
+            for value, lowest, highest in CALORIE_BANDS
+        ],
+        output_field=CharField(),
+    )
+
+
+def query_counts(matches, querysets) -> dict:
+    """
+    ``FacetIndex.counts`` computed by the database: ``matches`` is the
+    queryset under every filter, ``querysets[dimension]`` the one under every
+    filter but the dimension's own.
+    """
+    facets = {}
+    for dimension in DIMENSIONS:
+        if dimension == "calories":
+            key, label = _calorie_band_expression(), Min(_calorie_band_expression())
+        else:
+            field = FIELDS[dimension]
+            key, label = (Lower(field) if dimension in LOWERED else F(field)), Min(field)
+        rows = (
+            querysets[dimension].annotate(facet=key).filter(facet__isnull=False).exclude(facet="")
+            .order_by().values("facet")
+            .annotate(label=label, count=Count("pk", distinct=dimension in ("meal_type", "tag")))
+        )
+        facets[dimension] = [(row["label"], row["facet"], row["count"]) for row in rows]
+    return {"count": matches.count(), "facets": facets}
+
+
+# ─── Change tracking ───────────────────────────────────────────────────────────
+
+def mark_changed(*recipe_ids) -> None:
+    """Have every process's index re-read ``recipe_ids``, once the current transaction commits."""
+    if recipe_ids:
+        FacetChange.objects.create(recipe_ids=list(recipe_ids))
+
+
+def prune_changes() -> int:
+    """Delete changes older than ``CHANGE_TTL``; returns how many."""
+    horizon = timezone.now() - timedelta(seconds=_config()["CHANGE_TTL"])
+    deleted, _ = FacetChange.objects.filter(created_at__lt=horizon).delete()
+    return deleted
+
+
+def get_index() -> FacetIndex:
+    """This process's index, brought up to date with the change log."""
+    global _index
+    with _index_lock:
+        if _index is None or not _index.sync():
+            # Built after reading the log: changes racing the build are replayed next time.
+            _index = FacetIndex.build()
+        return _index
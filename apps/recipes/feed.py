@@ -0,0 +1,211 @@
+"""
+Home feed: recipes from the people a user follows, newest first.
+
+Fan-out on write: when a recipe is published, a ``FeedEntry`` is written into
+the timeline of every follower of its author, in chunks, after the creating
+transaction commits.  Reading a page is then one index range on
+``(owner, created_at)``, whatever the number of people followed.
+
+Authors with more than ``FANOUT_LIMIT`` followers are not fanned out (one
+recipe would mean millions of rows).  Their recipes are *pulled* at read time
+instead — one ``(author, created_at)`` index range for the few such authors a
+user follows — and merged with the timeline page.  Pulling reads the author's
+whole history, so nothing is lost when an author crosses the limit upwards;
+when they drop back below it, ``followers_changed`` back-fills their latest
+``BACKFILL`` recipes into every follower's timeline, since recipes published
+(and follows made) in pull mode were never pushed.
+
+Following someone copies their latest ``BACKFILL`` recipes into the
+follower's timeline; unfollowing removes that author's entries.
+"""
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from apps.users.models import Follow
+
+from .models import FeedEntry, Recipe
+
+DEFAULTS = {
+    "FANOUT_LIMIT": 10_000,
+    "FANOUT_CHUNK_SIZE": 1000,
+    "BACKFILL": 50,
+}
+
+
+def _config() -> dict:
+    return {**DEFAULTS, **getattr(settings, "FEED", {})}
+
+
+def is_pull_author(author) -> bool:
+    return author.followers_count > _config()["FANOUT_LIMIT"]
+
+
+def _write(entries) -> int:
+    batch_size = _config()["FANOUT_CHUNK_SIZE"]
+    return len(FeedEntry.objects.bulk_create(entries, batch_size=batch_size, ignore_conflicts=True))
+
+
+def _recent(author_id) -> list:
+    """``(pk, created_at)`` of the author's latest ``BACKFILL`` published recipes."""
+    return list(
+        Recipe.objects.filter(author_id=author_id, is_published=True)
+        .order_by("-created_at", "-pk")
+        .values_list("pk", "created_at")[: _config()["BACKFILL"]]
+    )
+
+
+# ─── Writes ────────────────────────────────────────────────────────────────────
+
+def fan_out(recipe) -> int:
+    """Push ``recipe`` into its author's followers' timelines; returns entries written."""
+    if not recipe.is_published:
+        return 0
+    # Runs after commit: judge the author by their current follower count.
+    author = type(recipe.author).objects.only("followers_count").get(pk=recipe.author_id)
+    if is_pull_author(author):
+        return 0
+    chunk_size = _config()["FANOUT_CHUNK_SIZE"]
+    follower_ids = (
+        Follow.objects.filter(following_id=recipe.author_id)
+        .values_list("follower_id", flat=True)
+        .order_by("follower_id")
+    )
+    written = 0
+    batch = []
+    for follower_id in follower_ids.iterator(chunk_size=chunk_size):
+        batch.append(FeedEntry(
+            owner_id=follower_id,
+            recipe_id=recipe.pk,
+            author_id=recipe.author_id,
+            created_at=recipe.created_at,
+        ))
+        if len(batch) >= chunk_size:
+            written += _write(batch)
+            batch = []
+    if batch:
+        written += _write(batch)
+    return written
+
+
+def fan_out_on_commit(recipe) -> None:
+    transaction.on_commit(lambda: fan_out(recipe))
+
+
+def publish(recipe) -> None:
+    """Fan a newly published recipe out to its author's followers' timelines."""
+    fan_out_on_commit(recipe)
+
+
+def backfill(owner, author) -> None:
+    """Copy ``author``'s latest recipes into ``owner``'s timeline (after a follow)."""
+    if is_pull_author(author):
+        return
+    _write([
+        FeedEntry(owner=owner, recipe_id=pk, author=author, created_at=created_at)
+        for pk, created_at in _recent(author.pk)
+    ])
+
+
+def backfill_followers(author_id) -> int:
+    """Copy the author's latest recipes into every follower's timeline; returns entries written."""
+    recent = _recent(author_id)
+    if not recent:
+        return 0
+    chunk_size = _config()["FANOUT_CHUNK_SIZE"]
+    follower_ids = (
+        Follow.objects.filter(following_id=author_id)
+        .values_list("follower_id", flat=True)
+        .order_by("follower_id")
+    )
+    written = 0
+    batch = []
+    for follower_id in follower_ids.iterator(chunk_size=chunk_size):
+        batch.extend(
+            FeedEntry(owner_id=follower_id, recipe_id=pk, author_id=author_id, created_at=created_at)
+            for pk, created_at in recent
+        )
+        if len(batch) >= chunk_size:
+            written += _write(batch)
+            batch = []
+    if batch:
+        written += _write(batch)
+    return written
+
+
+def followers_changed(author_id, before: int, after: int) -> None:
+    """
+    React to ``author_id``'s follower count moving from ``before`` to
+    ``after``: an author falling back to fan-out gets their timelines
+    back-filled once the transaction commits.
+    """
+    limit = _config()["FANOUT_LIMIT"]
+    if before > limit >= after:
+        transaction.on_commit(lambda: backfill_followers(author_id))
+
+
+def forget_author(owner, author) -> None:
+    """Remove ``author``'s recipes from ``owner``'s timeline (after an unfollow)."""
+    FeedEntry.objects.filter(owner=owner, author=author).delete()
+
+
+# ─── Reads ─────────────────────────────────────────────────────────────────────
+
+def _before(position, time_field, id_field) -> Q:
+    created_at, recipe_id = position
+    return Q(**{f"{time_field}__lt": created_at}) | Q(**{time_field: created_at, f"{id_field}__lt": recipe_id})
+
+
+def encode_position(recipe) -> dict:
+    return {"v": [recipe.created_at.isoformat(), recipe.pk]}
+
+
+def decode_position(data):
+    """``(created_at, recipe_id)`` from a decoded cursor, or ``None`` if malformed."""
+    try:
+        created_at, recipe_id = data["v"]
+        created_at = parse_datetime(created_at)
+        recipe_id = int(recipe_id)
+    except (KeyError, TypeError, ValueError):
+        return None
+    if created_at is None:
+        return None
+    return created_at, recipe_id
+
+
+def read_feed(user, limit, position=None) -> tuple[list, bool]:
+    """
+    Up to ``limit`` published recipes for ``user``'s home feed, strictly
+    older than ``position`` (``(created_at, recipe_id)`` of the last item
+    seen).  Returns ``(recipes, has_more)``.
+    """
+    entries = FeedEntry.objects.filter(owner=user, recipe__is_published=True)
+    if position is not None:
+        entries = entries.filter(_before(position, "created_at", "recipe_id"))
+    pushed_ids = list(
+        entries.order_by("-created_at", "-recipe_id").values_list("recipe_id", flat=True)[: limit + 1]
+    )
+
+    pulled_ids = []
+    pull_authors = list(
+        Follow.objects.filter(
+            follower=user,
+            following__followers_count__gt=_config()["FANOUT_LIMIT"],
+        ).values_list("following_id", flat=True)
+    )
+    if pull_authors:
+        pulled = Recipe.objects.filter(author_id__in=pull_authors, is_published=True)
+        if position is not None:
+            pulled = pulled.filter(_before(position, "created_at", "pk"))
+        pulled_ids = list(pulled.order_by("-created_at", "-pk").values_list("pk", flat=True)[: limit + 1])
+
+    recipes = (
+        Recipe.objects.filter(pk__in=set(pushed_ids) | set(pulled_ids))
+        .select_related("author")
+        .prefetch_related("tags", "meal_types")
+        .order_by("-created_at", "-pk")
+    )
+    recipes = list(recipes[: limit + 1])
+    return recipes[:limit], len(recipes) > limit
@@ -1,7 +1,9 @@
 import django_filters
-from django.db.models import F
+from django.db.models import Exists, F, OuterRef
+from rest_framework import filters
 
 from .models import Recipe
+from .search import search_queryset
 
 
 class RecipeFilter(django_filters.FilterSet):
@@ -20,8 +22,8 @@ class RecipeFilter(django_filters.FilterSet):
     min_calories = django_filters.NumberFilter(field_name="calories_per_serving", lookup_expr="gte")
     max_calories = django_filters.NumberFilter(field_name="calories_per_serving", lookup_expr="lte")
     max_time = django_filters.NumberFilter(method="filter_max_total_time")
-    meal_type = django_filters.CharFilter(field_name="meal_types__name", lookup_expr="iexact")
-    tag = django_filters.CharFilter(field_name="tags__name", lookup_expr="iexact")
+    meal_type = django_filters.CharFilter(method="filter_meal_type")
+    tag = django_filters.CharFilter(method="filter_tag")
     min_rating = django_filters.NumberFilter(field_name="rating", lookup_expr="gte")
     author = django_filters.CharFilter(field_name="author__username", lookup_expr="iexact")
 
@@ -43,4 +45,44 @@ class RecipeFilter(django_filters.FilterSet):
         """Filter where prep + cook <= max_time."""
         return queryset.annotate(
             total_time=F("prep_time_minutes") + F("cook_time_minutes")
-        ).filter(total_time__lte=value)
\ No newline at end of file
+        ).filter(total_time__lte=value)
+
+    # Tags and meal types are matched with EXISTS semi-joins rather than
+    # joins, so a recipe can never appear twice and no DISTINCT is needed.
+
+    def filter_tag(self, queryset, name, value):
+        return queryset.filter(
+            Exists(
+                Recipe.tags.through.objects.filter(
+                    recipe_id=OuterRef("pk"),
+                    tag__name__iexact=value,
+                )
+            )
+        )
+
+    def filter_meal_type(self, queryset, name, value):
+        return queryset.filter(
+            Exists(
+                Recipe.meal_types.through.objects.filter(
+                    recipe_id=OuterRef("pk"),
+                    mealtype__name__iexact=value,
+                )
+            )
+        )
+
+
+class RecipeSearchFilter(filters.SearchFilter):
+    """
+    ``?search=<term>`` answered by the full-text index (see ``search.py``)
+    instead of ``icontains`` lookups across joined tables.  Every word must
+    match, as a prefix, somewhere in the name, description, cuisine, tags,
+    meal types or ingredients.
+    """
+
+    search_description = "Full-text search across name, description, cuisine, tags, meal types and ingredients."
+
+    def filter_queryset(self, request, queryset, view):
+        terms = self.get_search_terms(request)
+        if not terms:
+            return queryset
+        return search_queryset(queryset, " ".join(terms))
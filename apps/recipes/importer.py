@@ -0,0 +1,558 @@
+"""
+Bulk recipe import.
+
+``read_records`` streams the items of a JSON array, of the ``"recipes"`` array
+of a JSON object, or of a JSON Lines file, a buffer at a time, so the input is
+never loaded whole.  ``normalize_record`` maps one item in the dummyjson
+schema of ``scripts/recipes.json`` to model field values, keeping its ``id``
+(and ``source``, which ``export_recipes`` adds) as the external id and a
+``content_hash`` of what the import owns.
+
+``RecipeImporter`` writes normalized records ``chunk_size`` at a time, each
+chunk in its own transaction with a fixed number of queries: one lookup of
+the external ids (or names) already imported, so only new records are
+inserted and only changed ones (``content_hash`` differs) updated, then
+``bulk_create`` of the new tags, meal types and ingredients, the recipes,
+the search documents (built from the records, where ``post_save`` would
+index one recipe at a time), and ``executemany`` of the plain id pairs of
+both through tables and the ingredient postings, which skips building a
+model instance per link row.  Tags and meal types are loaded once up front
+and cached for the whole run.
+
+JSON Lines input can also be parsed in parallel: ``split_ranges`` cuts the
+file into byte ranges ending on line breaks, worker processes turn each range
+into normalized records (``parse_range``), and ``parse_ranges`` hands them
+back in file order to the single writer.  A ``Checkpoint`` file records the
+byte offset up to which every record is committed, so an interrupted import
+resumes there; re-importing a range is harmless since names already present
+are skipped.
+"""
+
+import hashlib
+import json
+import operator
+import os
+import time
+from collections import defaultdict, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import reduce
+from itertools import islice
+from pathlib import Path
+
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.text import slugify
+
+from apps.users.services import adjust_user_counters
+
+from .cache import RECIPES, TAXONOMY, invalidate, invalidate_recipes
+from .facets import mark_changed
+from .ingredients import normalize_ingredients, resolve_ingredient_ids
+from .models import MealType, Recipe, RecipeIngredient, RecipeSearchDocument, Tag
+from .search import document_fields
+
+JSON_LINES_SUFFIXES = {".jsonl", ".ndjson"}
+READ_SIZE = 1 << 20
+BLOCK_SIZE = 8 << 20
+
+# What an import owns: hashed to detect changes, and rewritten when they
+# change.  Rating and engagement counters belong to the site once imported.
+CONTENT_FIELDS = (
+    "name", "image", "ingredients", "instructions", "prep_time_minutes", "cook_time_minutes",
+    "servings", "difficulty", "cuisine", "calories_per_serving",
+)
+UPDATED_FIELDS = (*CONTENT_FIELDS, "ingredient_count", "external_source", "external_id", "content_hash")
+
+
+# ─── Reading ───────────────────────────────────────────────────────────────────
+
+class _JsonStream:
+    """Decodes consecutive JSON values from a text file, refilling a buffer."""
+
+    def __init__(self, fh):
+        self.fh = fh
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+        self.decoder = json.JSONDecoder()
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        chunk = self.fh.read(READ_SIZE)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """The next non-whitespace character ("" at end of input)."""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in " \t\r\n":
+                self.pos += 1
+            if self.pos < len(self.buffer) or not self._fill():
+                return self.buffer[self.pos:self.pos + 1]
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise ValueError(f"Expected {char!r} in JSON input, found {self.peek()!r}")
+        self.pos += 1
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if not self._fill():
+                    raise
+                continue
+            # A number may continue in the next read.
+            if end == len(self.buffer) and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def array(self):
+        self.expect("[")
+        if self.peek() == "]":
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == "]":
+                self.pos += 1
+                return
+            self.expect(",")
+
+
+def _read_json(fh):
+    stream = _JsonStream(fh)
+    if stream.peek() == "[":
+        yield from stream.array()
+        return
+    stream.expect("{")
+    while stream.peek() != "}":
+        key = stream.value()
+        stream.expect(":")
+        if key == "recipes" and stream.peek() == "[":
+            yield from stream.array()
+        else:
+            stream.value()
+        if stream.peek() == ",":
+            stream.pos += 1
+
+
+def is_json_lines(path) -> bool:
+    return Path(path).suffix.lower() in JSON_LINES_SUFFIXES
+
+
+def read_records(path):
+    """Yield the recipe dicts in ``path`` (JSON array/object, or JSON Lines by suffix)."""
+    with open(path, "r", encoding="utf-8") as fh:
+        if is_json_lines(path):
+            for line in fh:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            yield from _read_json(fh)
+
+
+def normalize_record(item) -> dict | None:
+    """Model field values, names, external id and hash of one item; ``None`` to skip it."""
+    if not isinstance(item, dict):
+        return None
+    name = str(item.get("name") or "").strip()
+    if not name:
+        return None
+    rating = item.get("rating", 0)
+    review_count = item.get("reviewCount", 0)
+    ingredient_names = normalize_ingredients(item.get("ingredients", []))
+    external_id = item.get("id")
+    record = {
+        "external_source": str(item.get("source") or ""),
+        "external_id": None if external_id in (None, "") else str(external_id),
+        "fields": {
+            "name": name,
+            "image": item.get("image", ""),
+            "ingredients": item.get("ingredients", []),
+            "instructions": item.get("instructions", []),
+            "prep_time_minutes": item.get("prepTimeMinutes", 0),
+            "cook_time_minutes": item.get("cookTimeMinutes", 0),
+            "servings": item.get("servings", 1),
+            "difficulty": item.get("difficulty", "Easy"),
+            "cuisine": item.get("cuisine", ""),
+            "calories_per_serving": item.get("caloriesPerServing"),
+            "rating": rating,
+            "review_count": review_count,
+            "rating_sum": round(rating * review_count),
+            "imported_rating_sum": round(rating * review_count),
+            "imported_review_count": review_count,
+            "ingredient_count": len(ingredient_names),
+        },
+        "ingredient_names": ingredient_names,
+        "tags": [tag.strip() for tag in item.get("tags", []) if tag.strip()],
+        "meal_types": [meal_type.strip() for meal_type in item.get("mealType", []) if meal_type.strip()],
+    }
+    record["content_hash"] = content_hash(record)
+    return record
+
+
+def content_hash(record) -> str:
+    """Digest of the ``CONTENT_FIELDS``, tags and meal types of a normalized record."""
+    content = {
+        "fields": {name: record["fields"][name] for name in CONTENT_FIELDS},
+        "tags": record["tags"],
+        "meal_types": record["meal_types"],
+    }
+    return hashlib.sha1(json.dumps(content, sort_keys=True, separators=(",", ":"), default=str).encode()).hexdigest()
+
+
+# ─── Parallel parsing ──────────────────────────────────────────────────────────
+
+def split_ranges(path, start=0, block_size=BLOCK_SIZE):
+    """Yield ``(start, end)`` byte ranges of about ``block_size`` covering whole lines."""
+    size = os.path.getsize(path)
+    with open(path, "rb") as fh:
+        while start < size:
+            fh.seek(min(start + block_size, size))
+            fh.readline()
+            end = min(fh.tell(), size)
+            yield start, end
+            start = end
+
+
+def parse_range(path, start, end) -> tuple[int, list[dict], int]:
+    """Normalize the JSON Lines in ``[start, end)``: ``(end, records, unusable)``."""
+    records, unusable = [], 0
+    with open(path, "rb") as fh:
+        fh.seek(start)
+        while fh.tell() < end:
+            offset = fh.tell()
+            line = fh.readline()
+            if not line.strip():
+                continue
+            try:
+                record = normalize_record(json.loads(line))
+            except ValueError as exc:
+                raise ValueError(f"byte {offset}: {exc}") from exc
+            if record is None:
+                unusable += 1
+            else:
+                records.append(record)
+    return end, records, unusable
+
+
+def parse_ranges(path, workers=1, start=0, block_size=BLOCK_SIZE):
+    """
+    Yield ``parse_range`` results from ``start`` to the end of the file, in
+    file order.  With ``workers`` > 1 ranges are parsed by a process pool, at
+    most two per worker ahead of the consumer.
+    """
+    ranges = split_ranges(path, start, block_size)
+    if workers <= 1:
+        for range_start, range_end in ranges:
+            yield parse_range(path, range_start, range_end)
+        return
+
+    import django
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+        pending = deque()
+        for range_start, range_end in ranges:
+            pending.append(pool.submit(parse_range, path, range_start, range_end))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class Checkpoint:
+    """
+    Progress of one import in a small JSON file: the input's size and mtime
+    (a changed input starts over) and the committed byte offset and totals.
+    """
+
+    def __init__(self, path, source):
+        self.path = path
+        stat = os.stat(source)
+        self.source = {"file": os.path.abspath(source), "size": stat.st_size, "mtime": stat.st_mtime}
+
+    def load(self) -> tuple[int, dict]:
+        """The saved byte offset and ``RecipeImporter.totals``, or ``(0, {})``."""
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                saved = json.load(fh)
+        except (OSError, ValueError):
+            saved = {}
+        if saved.get("source") != self.source:
+            return 0, {}
+        return saved["position"], saved["totals"]
+
+    def save(self, position, totals) -> None:
+        temporary = f"{self.path}.tmp"
+        with open(temporary, "w", encoding="utf-8") as fh:
+            json.dump({"source": self.source, "position": position, "totals": totals}, fh)
+        os.replace(temporary, self.path)
+
+    def clear(self) -> None:
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
+
+# ─── Writing ───────────────────────────────────────────────────────────────────
+
+def _insert_pairs(model, columns, rows) -> None:
+    """INSERT ``rows`` of ids into ``model``'s table with one ``executemany``."""
+    if not rows:
+        return
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.executemany(
+            f"INSERT INTO {quote(model._meta.db_table)} ({', '.join(map(quote, columns))}) "
+            f"VALUES ({', '.join(['%s'] * len(columns))})",
+            rows,
+        )
+
+
+class RecipeImporter:
+    """
+    Writes normalized records.  Records carrying an ``external_id`` are
+    matched on it within their own source, or ``source`` when they name none:
+    new ones are inserted, ones whose ``content_hash`` differs are updated in place, the
+    rest skipped.  Recipes of ``author`` imported before external ids were
+    kept are adopted by name.  When an id repeats within a chunk its last
+    copy is written and the others count as skipped.  Records without an id,
+    or without any source, are skipped when their name exists.
+    """
+
+    def __init__(self, author, *, source="", chunk_size=1000):
+        self.author = author
+        self.source = source
+        self.chunk_size = chunk_size
+        self.tags = {slug: (pk, name) for pk, slug, name in Tag.objects.values_list("pk", "slug", "name")}
+        self.meal_type_ids = dict(MealType.objects.values_list("name", "pk"))
+        self.created = 0
+        self.updated = 0
+        self.skipped = 0
+        self.resumed = 0
+        self.started = time.perf_counter()
+
+    @property
+    def totals(self) -> dict:
+        return {"created": self.created, "updated": self.updated, "skipped": self.skipped}
+
+    def resume(self, totals) -> None:
+        """Carry over the totals of an earlier, interrupted run."""
+        for name, value in totals.items():
+            setattr(self, name, value)
+        self.resumed = self.processed
+
+    @property
+    def processed(self) -> int:
+        return self.created + self.updated + self.skipped
+
+    @property
+    def rate(self) -> float:
+        """Records processed per second by this run."""
+        return (self.processed - self.resumed) / max(time.perf_counter() - self.started, 1e-9)
+
+    def run(self, records, progress=None) -> "RecipeImporter":
+        """
+        Import ``records`` (raw items; unusable ones count as skipped),
+        calling ``progress(self)`` after every chunk.
+        """
+        records = iter(records)
+        while chunk := list(islice(records, self.chunk_size)):
+            normalized = [normalize_record(item) for item in chunk]
+            self.skipped += normalized.count(None)
+            self.write([record for record in normalized if record is not None])
+            if progress:
+                progress(self)
+        return self
+
+    def run_parsed(self, batches, progress=None, checkpoint=None) -> "RecipeImporter":
+        """
+        Import ``parse_range`` results, saving ``checkpoint`` after each one
+        commits and calling ``progress(self)``.
+        """
+        for position, records, unusable in batches:
+            self.skipped += unusable
+            for start in range(0, len(records), self.chunk_size):
+                self.write(records[start:start + self.chunk_size])
+            if checkpoint:
+                checkpoint.save(position, self.totals)
+            if progress:
+                progress(self)
+        return self
+
+    def _resolve_tags(self, names) -> None:
+        missing = {}
+        for name in names:
+            slug = slugify(name)
+            if slug not in self.tags:
+                missing.setdefault(slug, name)
+        if missing:
+            Tag.objects.bulk_create(
+                [Tag(name=name, slug=slug) for slug, name in missing.items()],
+                ignore_conflicts=True,
+            )
+            for pk, slug, name in Tag.objects.filter(slug__in=missing).values_list("pk", "slug", "name"):
+                self.tags[slug] = (pk, name)
+
+    def _resolve_meal_types(self, names) -> None:
+        missing = set(names) - self.meal_type_ids.keys()
+        if missing:
+            MealType.objects.bulk_create([MealType(name=name) for name in missing], ignore_conflicts=True)
+            self.meal_type_ids.update(MealType.objects.filter(name__in=missing).values_list("name", "pk"))
+
+    def _key(self, record) -> tuple[str, str] | None:
+        """The ``(external_source, external_id)`` a record is matched on, if any."""
+        source = record["external_source"] or self.source
+        return (source, record["external_id"]) if source and record["external_id"] else None
+
+    def _match(self, records) -> tuple[list, list]:
+        """Split ``records`` into new ones and ``(pk, record)`` pairs to update."""
+        keyed, named = [], []
+        for record in records:
+            if key := self._key(record):
+                keyed.append((key, record))
+            else:
+                named.append(record)
+
+        matches = {}
+        if keyed:
+            external_ids = defaultdict(set)
+            for (source, external_id), _ in keyed:
+                external_ids[source].add(external_id)
+            condition = reduce(operator.or_, (
+                Q(external_source=source, external_id__in=ids) for source, ids in external_ids.items()
+            ))
+            for source, external_id, pk, content_hash in Recipe.objects.filter(condition).values_list(
+                "external_source", "external_id", "pk", "content_hash",
+            ):
+                matches[source, external_id] = (pk, content_hash)
+            unmatched = {record["fields"]["name"] for key, record in keyed if key not in matches}
+            adopted = {}
+            if unmatched:
+                for name, pk in Recipe.objects.filter(
+                    author=self.author, external_id__isnull=True, name__in=unmatched,
+                ).order_by("pk").values_list("name", "pk"):
+                    adopted.setdefault(name, (pk, ""))
+        existing_names = set(
+            Recipe.objects.filter(name__in={record["fields"]["name"] for record in named})
+            .values_list("name", flat=True)
+        ) if named else set()
+
+        new, changed = [], []
+        # Key -> the pending write of that key in ``new`` or ``changed``.
+        pending = {}
+        for key, record in keyed:
+            if key in pending:
+                # The same id again in this chunk: the last copy wins.
+                self.skipped += 1
+                writes, index = pending[key]
+                writes[index] = record if writes is new else (writes[index][0], record)
+                continue
+            match = matches.get(key) or adopted.pop(record["fields"]["name"], None)
+            if match is None:
+                pending[key] = (new, len(new))
+                new.append(record)
+            elif match[1] == record["content_hash"]:
+                self.skipped += 1
+            else:
+                pending[key] = (changed, len(changed))
+                changed.append((match[0], record))
+        for record in named:
+            name = record["fields"]["name"]
+            if name in existing_names:
+                self.skipped += 1
+            else:
+                existing_names.add(name)
+                new.append(record)
+        return new, changed
+
+    def _recipe(self, record, **extra) -> Recipe:
+        external_source, external_id = self._key(record) or ("", None)
+        return Recipe(
+            external_source=external_source,
+            external_id=external_id,
+            content_hash=record["content_hash"],
+            **record["fields"],
+            **extra,
+        )
+
+    def _index(self, pairs, descriptions=None) -> None:
+        """Link and index ``(recipe, record)`` pairs whose links are already cleared."""
+        descriptions = descriptions or {}
+        ingredient_ids = resolve_ingredient_ids(name for _, record in pairs for name in record["ingredient_names"])
+        tag_rows, meal_type_rows, posting_rows, documents = [], [], [], []
+        for recipe, record in pairs:
+            tags = dict(self.tags[slugify(name)] for name in record["tags"])
+            meal_types = {name: self.meal_type_ids[name] for name in record["meal_types"]}
+            tag_rows += [(recipe.pk, tag_id) for tag_id in tags]
+            meal_type_rows += [(recipe.pk, meal_type_id) for meal_type_id in meal_types.values()]
+            posting_rows += [(recipe.pk, ingredient_ids[name]) for name in record["ingredient_names"]]
+            # bulk writes skip the post_save / m2m_changed signals that index recipes.
+            documents.append(RecipeSearchDocument(recipe_id=recipe.pk, **document_fields(
+                name=recipe.name,
+                cuisine=recipe.cuisine,
+                tags=tags.values(),
+                meal_types=meal_types,
+                description=descriptions.get(recipe.pk, ""),
+                ingredients=recipe.ingredients,
+            )))
+        RecipeSearchDocument.objects.bulk_create(
+            documents,
+            update_conflicts=True,
+            unique_fields=["recipe"],
+            update_fields=["title", "keywords", "body"],
+        )
+        _insert_pairs(Recipe.tags.through, ("recipe_id", "tag_id"), tag_rows)
+        _insert_pairs(Recipe.meal_types.through, ("recipe_id", "mealtype_id"), meal_type_rows)
+        _insert_pairs(RecipeIngredient, ("recipe_id", "ingredient_id"), posting_rows)
+
+    def _insert(self, records) -> None:
+        recipes = Recipe.objects.bulk_create(
+            [self._recipe(record, author=self.author, is_published=True) for record in records]
+        )
+        self._index(list(zip(recipes, records)))
+        adjust_user_counters(self.author.pk, recipes_count=len(recipes))
+        invalidate(RECIPES)
+        mark_changed(*(recipe.pk for recipe in recipes))
+        self.created += len(recipes)
+
+    def _update(self, changed) -> None:
+        ids = [pk for pk, _ in changed]
+        now = timezone.now()
+        recipes = [self._recipe(record, pk=pk, updated_at=now) for pk, record in changed]
+        Recipe.objects.bulk_update(recipes, [*UPDATED_FIELDS, "updated_at"])
+        Recipe.tags.through.objects.filter(recipe_id__in=ids).delete()
+        Recipe.meal_types.through.objects.filter(recipe_id__in=ids).delete()
+        RecipeIngredient.objects.filter(recipe_id__in=ids).delete()
+        descriptions = dict(Recipe.objects.filter(pk__in=ids).values_list("pk", "description"))
+        self._index([(recipe, record) for recipe, (_, record) in zip(recipes, changed)], descriptions)
+        invalidate_recipes(*ids)
+        mark_changed(*ids)
+        self.updated += len(recipes)
+
+    @transaction.atomic
+    def write(self, records) -> int:
+        """Insert new and update changed ``records``; returns the number written."""
+        new, changed = self._match(records)
+        if not new and not changed:
+            return 0
+        incoming = new + [record for _, record in changed]
+        self._resolve_tags(name for record in incoming for name in record["tags"])
+        self._resolve_meal_types(name for record in incoming for name in record["meal_types"])
+        if new:
+            self._insert(new)
+        if changed:
+            self._update(changed)
+        invalidate(TAXONOMY)
+        return len(new) + len(changed)
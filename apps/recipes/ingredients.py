@@ -0,0 +1,222 @@
+"""
+Inverted ingredient index for "what can I cook with …" search.
+
+``Recipe.ingredients`` is free text ("Garlic cloves, minced").  Each line is
+normalised to a short ingredient name ("garlic clove") stored once in
+``Ingredient``; ``RecipeIngredient`` rows form the posting list of every
+ingredient.  Ranking a pantry is then a single indexed GROUP BY over the
+postings of the requested ingredients — recipe JSON is never scanned — cut
+to the best ``PANTRY_SEARCH["MAX_RESULTS"]`` recipes by the database.
+"""
+
+import re
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, ExpressionWrapper, F, FloatField, Q
+
+from .models import Ingredient, Recipe, RecipeIngredient
+
+# Always assumed to be in the pantry; they don't count towards coverage.
+PANTRY_STAPLES = frozenset({
+    "salt",
+    "pepper",
+    "black pepper",
+    "salt and pepper",
+    "water",
+    "ice cube",
+})
+
+UNITS = frozenset({
+    "cup", "cups", "tbsp", "tablespoon", "tablespoons", "tsp", "teaspoon",
+    "teaspoons", "g", "kg", "gram", "grams", "ml", "l", "litre", "liter", "oz",
+    "ounce", "ounces", "lb", "lbs", "pound", "pounds", "pinch", "dash",
+    "handful", "bunch", "can", "cans", "slice", "slices", "piece", "pieces",
+})
+
+DESCRIPTORS = frozenset({
+    "fresh", "freshly", "chopped", "minced", "sliced", "diced", "cubed",
+    "grated", "shredded", "crushed", "crumbled", "cooked", "boiled", "dried",
+    "frozen", "finely", "roughly", "thinly", "peeled", "softened", "melted",
+    "large", "small", "medium", "ripe", "boneless", "skinless", "toasted",
+    "of",
+})
+
+_PARENS_RE = re.compile(r"\([^)]*\)")
+_TRAILING_RE = re.compile(r"\b(to taste|for (serving|garnish|topping)|optional)\b.*$")
+_QUANTITY_RE = re.compile(r"^[\d\s/.,\-½¼¾⅓⅔]+")
+_WORD_RE = re.compile(r"[^\W\d_]+(?:-[^\W\d_]+)*", re.UNICODE)
+
+MAX_NAME_LENGTH = 128
+
+DEFAULTS = {
+    # Recipes ranked per pantry; weaker matches are never listed.
+    "MAX_RESULTS": 500,
+}
+
+
+def _config() -> dict:
+    return {**DEFAULTS, **getattr(settings, "PANTRY_SEARCH", {})}
+
+
+def _singular(word: str) -> str:
+    if word.endswith("leaves"):
+        return word[:-6] + "leaf"
+    if word.endswith("ies") and len(word) > 4:
+        return word[:-3] + "y"
+    if word.endswith("oes") and len(word) > 4:
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")) and len(word) > 3:
+        return word[:-1]
+    return word
+
+
+def normalize_ingredient(text) -> str:
+    """
+    Reduce a free-text ingredient line to its core name, e.g.
+    ``"2 Garlic cloves, minced"`` → ``"garlic clove"``.  Returns ``""`` if
+    nothing usable is left.
+    """
+    text = str(text).lower()
+    text = _PARENS_RE.sub(" ", text)
+    text = text.split(",", 1)[0]
+    text = _TRAILING_RE.sub("", text)
+    text = _QUANTITY_RE.sub("", text)
+
+    words = _WORD_RE.findall(text)
+    while words and words[0] in UNITS:
+        words.pop(0)
+    words = [word for word in words if word not in DESCRIPTORS]
+    if not words:
+        return ""
+    words[-1] = _singular(words[-1])
+    return " ".join(words)[:MAX_NAME_LENGTH]
+
+
+def normalize_ingredients(lines) -> list[str]:
+    """Distinct, non-staple ingredient names for a recipe, in input order."""
+    names = []
+    for line in lines or []:
+        name = normalize_ingredient(line)
+        if name and name not in PANTRY_STAPLES and name not in names:
+            names.append(name)
+    return names
+
+
+def resolve_ingredient_ids(names) -> dict[str, int]:
+    """Map ingredient names to ids, creating the missing ones in one batch."""
+    names = set(names)
+    if not names:
+        return {}
+    ids = dict(Ingredient.objects.filter(name__in=names).values_list("name", "pk"))
+    missing = names - ids.keys()
+    if missing:
+        Ingredient.objects.bulk_create(
+            [Ingredient(name=name) for name in missing],
+            ignore_conflicts=True,
+        )
+        ids.update(Ingredient.objects.filter(name__in=missing).values_list("name", "pk"))
+    return ids
+
+
+@transaction.atomic
+def index_recipe_ingredients(recipes) -> int:
+    """Rebuild the ingredient postings and ``ingredient_count`` of ``recipes``."""
+    recipes = list(recipes)
+    if not recipes:
+        return 0
+
+    names_by_recipe = {recipe.pk: normalize_ingredients(recipe.ingredients) for recipe in recipes}
+    ids = resolve_ingredient_ids(name for names in names_by_recipe.values() for name in names)
+
+    RecipeIngredient.objects.filter(recipe_id__in=names_by_recipe.keys()).delete()
+    RecipeIngredient.objects.bulk_create(
+        [
+            RecipeIngredient(recipe_id=recipe_id, ingredient_id=ids[name])
+            for recipe_id, names in names_by_recipe.items()
+            for name in names
+        ],
+        ignore_conflicts=True,
+    )
+
+    for recipe in recipes:
+        recipe.ingredient_count = len(names_by_recipe[recipe.pk])
+    Recipe.objects.bulk_update(recipes, ["ingredient_count"])
+    return len(recipes)
+
+
+def index_all_ingredients(queryset=None, chunk_size: int = 1000) -> int:
+    """Rebuild postings for ``queryset`` (default: every recipe) in chunks."""
+    if queryset is None:
+        queryset = Recipe.objects.all()
+    queryset = queryset.only("pk", "ingredients", "ingredient_count").order_by("pk")
+
+    indexed = 0
+    batch = []
+    for recipe in queryset.iterator(chunk_size=chunk_size):
+        batch.append(recipe)
+        if len(batch) >= chunk_size:
+            indexed += index_recipe_ingredients(batch)
+            batch = []
+    if batch:
+        indexed += index_recipe_ingredients(batch)
+    return indexed
+
+
+def matching_ingredient_ids(terms) -> list[int]:
+    """
+    Ingredient ids covered by the user's pantry ``terms``.  A term covers an
+    ingredient when it equals it or appears in it as a whole word
+    ("rice" covers "basmati rice").
+    """
+    condition = Q()
+    for term in terms:
+        name = normalize_ingredient(term)
+        if not name:
+            continue
+        condition |= (
+            Q(name=name)
+            | Q(name__startswith=f"{name} ")
+            | Q(name__endswith=f" {name}")
+            | Q(name__contains=f" {name} ")
+        )
+    if not condition:
+        return []
+    return list(Ingredient.objects.filter(condition).values_list("pk", flat=True))
+
+
+def rank_by_pantry(queryset, terms, limit=None):
+    """
+    Annotate and order ``queryset`` by how much of each recipe's ingredient
+    list the pantry ``terms`` cover, keeping the best ``limit`` recipes
+    (default ``MAX_RESULTS``).  Only recipes sharing at least one ingredient
+    with the pantry are returned.
+
+    The ranking query ends in ``LIMIT``, so the database keeps a top-``limit``
+    sort instead of ordering every match; the returned queryset reads only
+    those recipes, and counting or paging it never touches the rest.
+
+    Adds ``matched_count`` and ``coverage`` (0–1) annotations.
+    """
+    ingredient_ids = matching_ingredient_ids(terms)
+    if not ingredient_ids:
+        return queryset.none()
+    if limit is None:
+        limit = _config()["MAX_RESULTS"]
+
+    best = list(_ranked(queryset, ingredient_ids).values_list("pk", flat=True)[:limit])
+    return _ranked(queryset.filter(pk__in=best), ingredient_ids)
+
+
+def _ranked(queryset, ingredient_ids):
+    return (
+        queryset.filter(ingredient_postings__ingredient_id__in=ingredient_ids)
+        .annotate(matched_count=Count("ingredient_postings"))
+        .annotate(
+            coverage=ExpressionWrapper(
+                F("matched_count") * 1.0 / F("ingredient_count"),
+                output_field=FloatField(),
+            )
+        )
+        .order_by("-coverage", "-matched_count", "-rating", "-pk")
+    )
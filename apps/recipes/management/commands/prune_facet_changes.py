@@ -0,0 +1,19 @@
+"""
+Usage:
+    python manage.py prune_facet_changes
+
+Deletes facet index changes older than RECIPE_FACETS_CHANGE_TTL (see
+apps/recipes/facets.py); an index that far behind rebuilds anyway (run daily
+from cron).
+"""
+
+from django.core.management.base import BaseCommand
+
+from apps.recipes.facets import prune_changes
+
+
+class Command(BaseCommand):
+    help = "Delete expired facet index changes"
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(f"Deleted {prune_changes()} facet change(s)."))
@@ -0,0 +1,36 @@
+"""
+Usage:
+    python manage.py rebuild_search_index
+    python manage.py rebuild_search_index --chunk-size 5000
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from apps.recipes.ingredients import index_all_ingredients
+from apps.recipes.models import RecipeSearchDocument
+from apps.recipes.search import index_recipes, rebuild_backend_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the recipe full-text search and ingredient indexes"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of recipes indexed per batch",
+        )
+
+    @transaction.atomic
+    def handle(self, *args, **options):
+        self.stdout.write("Rebuilding search documents…")
+        RecipeSearchDocument.objects.all().delete()
+        indexed = index_recipes(chunk_size=options["chunk_size"])
+        rebuild_backend_index()
+
+        self.stdout.write("Rebuilding ingredient postings…")
+        index_all_ingredients(chunk_size=options["chunk_size"])
+
+        self.stdout.write(self.style.SUCCESS(f"Done — {indexed} recipe(s) indexed."))
@@ -2,18 +2,35 @@
 Usage:
     python manage.py seed_recipes
     python manage.py seed_recipes --file 
+    python manage.py seed_recipes --file dump.jsonl --chunk-size 5000
+    python manage.py seed_recipes --file dump.jsonl --workers 8 --checkpoint dump.checkpoint
     python manage.py seed_recipes --clear   
+
+Reads a JSON array, a {"recipes": [...]} object or JSON Lines (.jsonl /
+.ndjson) as a stream and bulk-inserts it in chunks (see apps/recipes/importer.py);
+records are matched to earlier imports by their "id" within their "source"
+(--source for records naming none, so an export_recipes file round-trips), and
+only new or changed ones are written (records without an id are skipped when
+their name exists).  JSON Lines can be parsed by
+--workers processes, and with --checkpoint an interrupted import resumes
+where it stopped when run again with the same arguments.
 """
 
-import json
 import os
 from pathlib import Path
 
 from django.contrib.auth import get_user_model
-from django.core.management.base import BaseCommand
+from django.core.management.base import BaseCommand, CommandError
 from django.db import transaction
-from django.utils.text import slugify
 
+from apps.recipes.importer import (
+    BLOCK_SIZE,
+    Checkpoint,
+    RecipeImporter,
+    is_json_lines,
+    parse_ranges,
+    read_records,
+)
 from apps.recipes.models import MealType, Recipe, Tag
 
 User = get_user_model()
@@ -29,31 +46,65 @@ class Command(BaseCommand):
             "--file",
             type=str,
             default=str(DEFAULT_JSON),
-            help="Path to the recipes JSON file",
+            help="Path to the recipes JSON or JSON Lines file",
         )
         parser.add_argument(
             "--clear",
             action="store_true",
             help="Clear existing recipes before seeding",
         )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Recipes inserted per transaction",
+        )
+        parser.add_argument(
+            "--source",
+            type=str,
+            default="seed",
+            help="Feed of records that name no source; record ids are unique within a feed",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Processes parsing JSON Lines input in parallel",
+        )
+        parser.add_argument(
+            "--block-size",
+            type=int,
+            default=BLOCK_SIZE >> 20,
+            help="MB of JSON Lines handed to a worker at a time",
+        )
+        parser.add_argument(
+            "--checkpoint",
+            type=str,
+            help="Progress file for resuming an interrupted JSON Lines import",
+        )
 
-    @transaction.atomic
     def handle(self, *args, **options):
+        self.verbosity = options["verbosity"]
         filepath = options["file"]
         if not os.path.exists(filepath):
             self.stderr.write(self.style.ERROR(f"File not found: {filepath}"))
             return
 
-        with open(filepath, "r", encoding="utf-8") as fh:
-            data = json.load(fh)
-
-        recipes_data = data.get("recipes", data) if isinstance(data, dict) else data
+        json_lines = is_json_lines(filepath)
+        if not json_lines and (options["workers"] > 1 or options["checkpoint"]):
+            raise CommandError("--workers and --checkpoint need JSON Lines input (.jsonl / .ndjson).")
+        checkpoint = Checkpoint(options["checkpoint"], filepath) if options["checkpoint"] else None
 
         if options["clear"]:
             self.stdout.write("Clearing existing recipes…")
-            Recipe.objects.all().delete()
-            Tag.objects.all().delete()
-            MealType.objects.all().delete()
+            if checkpoint:
+                checkpoint.clear()
+            with transaction.atomic():
+                Recipe.objects.all().delete()
+                Tag.objects.all().delete()
+                MealType.objects.all().delete()
+                # A bulk delete skips the per-recipe counter updates.
+                User.objects.filter(recipes_count__gt=0).update(recipes_count=0)
 
         # Ensure a seed superuser exists
         seed_user, created = User.objects.get_or_create(
@@ -68,64 +119,42 @@ class Command(BaseCommand):
             seed_user.save()
             self.stdout.write(self.style.SUCCESS("Created seed_admin user"))
 
-        created_count = 0
-        skipped_count = 0
-
-        for item in recipes_data:
-            name = item.get("name", "").strip()
-            if not name:
-                continue
-
-            if Recipe.objects.filter(name=name).exists():
-                skipped_count += 1
-                continue
-
-            # Resolve tags
-            tag_objs = []
-            for tag_name in item.get("tags", []):
-                tag_name = tag_name.strip()
-                if not tag_name:
-                    continue
-                tag, _ = Tag.objects.get_or_create(
-                    slug=slugify(tag_name),
-                    defaults={"name": tag_name},
+        importer = RecipeImporter(seed_user, source=options["source"], chunk_size=options["chunk_size"])
+        try:
+            if json_lines:
+                start = 0
+                if checkpoint:
+                    start, totals = checkpoint.load()
+                    if start:
+                        importer.resume(totals)
+                        self.stdout.write(f"Resuming at byte {start} ({importer.processed} record(s) done)…")
+                batches = parse_ranges(
+                    filepath,
+                    workers=options["workers"],
+                    start=start,
+                    block_size=options["block_size"] << 20,
                 )
-                tag_objs.append(tag)
-
-            # Resolve meal types
-            meal_type_objs = []
-            for mt_name in item.get("mealType", []):
-                mt_name = mt_name.strip()
-                if not mt_name:
-                    continue
-                mt, _ = MealType.objects.get_or_create(name=mt_name)
-                meal_type_objs.append(mt)
-
-            recipe = Recipe.objects.create(
-                author=seed_user,
-                name=name,
-                image=item.get("image", ""),
-                ingredients=item.get("ingredients", []),
-                instructions=item.get("instructions", []),
-                prep_time_minutes=item.get("prepTimeMinutes", 0),
-                cook_time_minutes=item.get("cookTimeMinutes", 0),
-                servings=item.get("servings", 1),
-                difficulty=item.get("difficulty", "Easy"),
-                cuisine=item.get("cuisine", ""),
-                calories_per_serving=item.get("caloriesPerServing"),
-                rating=item.get("rating", 0),
-                review_count=item.get("reviewCount", 0),
-                is_published=True,
-            )
-            recipe.tags.set(tag_objs)
-            recipe.meal_types.set(meal_type_objs)
-            created_count += 1
+                importer.run_parsed(batches, progress=self._progress, checkpoint=checkpoint)
+            else:
+                importer.run(read_records(filepath), progress=self._progress)
+        except ValueError as exc:
+            # json.JSONDecodeError included; earlier chunks stay committed.
+            raise CommandError(f"Invalid input after {importer.processed} record(s): {exc}") from exc
 
-        # Refresh author recipe count
-        User.objects.filter(pk=seed_user.pk).update(recipes_count=created_count)
+        if checkpoint:
+            checkpoint.clear()
 
         self.stdout.write(
             self.style.SUCCESS(
-                f"Done — {created_count} recipe(s) created, {skipped_count} skipped."
+                f"Done — {importer.created} recipe(s) created, {importer.updated} updated, "
+                f"{importer.skipped} skipped "
+                f"({importer.rate:.0f} rows/s)."
+            )
+        )
+
+    def _progress(self, importer):
+        if self.verbosity >= 2:
+            self.stdout.write(
+                f"  {importer.processed} processed, {importer.created} created, "
+                f"{importer.updated} updated — {importer.rate:.0f} rows/s"
             )
-        )
\ No newline at end of file
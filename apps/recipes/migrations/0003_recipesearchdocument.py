@@ -0,0 +1,126 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE recipes_recipesearch_fts USING fts5(
+        title, keywords, body,
+        content='recipes_recipesearchdocument',
+        content_rowid='recipe_id',
+        tokenize='porter unicode61 remove_diacritics 2'
+    )
+    """,
+    """
+    CREATE TRIGGER recipes_recipesearch_ai AFTER INSERT ON recipes_recipesearchdocument BEGIN
+        INSERT INTO recipes_recipesearch_fts(rowid, title, keywords, body)
+        VALUES (new.recipe_id, new.title, new.keywords, new.body);
+    END
+    """,
+    """
+    CREATE TRIGGER recipes_recipesearch_ad AFTER DELETE ON recipes_recipesearchdocument BEGIN
+        INSERT INTO recipes_recipesearch_fts(recipes_recipesearch_fts, rowid, title, keywords, body)
+        VALUES ('delete', old.recipe_id, old.title, old.keywords, old.body);
+    END
+    """,
+    """
+    CREATE TRIGGER recipes_recipesearch_au AFTER UPDATE ON recipes_recipesearchdocument BEGIN
+        INSERT INTO recipes_recipesearch_fts(recipes_recipesearch_fts, rowid, title, keywords, body)
+        VALUES ('delete', old.recipe_id, old.title, old.keywords, old.body);
+        INSERT INTO recipes_recipesearch_fts(rowid, title, keywords, body)
+        VALUES (new.recipe_id, new.title, new.keywords, new.body);
+    END
+    """,
+]
+
+SQLITE_BACKWARD = [
+    "DROP TRIGGER IF EXISTS recipes_recipesearch_au",
+    "DROP TRIGGER IF EXISTS recipes_recipesearch_ad",
+    "DROP TRIGGER IF EXISTS recipes_recipesearch_ai",
+    "DROP TABLE IF EXISTS recipes_recipesearch_fts",
+]
+
+POSTGRES_FORWARD = [
+    """
+    ALTER TABLE recipes_recipesearchdocument ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('english', coalesce(title, '')), 'A') ||
+        setweight(to_tsvector('english', coalesce(keywords, '')), 'B') ||
+        setweight(to_tsvector('english', coalesce(body, '')), 'C')
+    ) STORED
+    """,
+    "CREATE INDEX recipes_recipesearch_vector_gin ON recipes_recipesearchdocument USING GIN (search_vector)",
+]
+
+POSTGRES_BACKWARD = [
+    "DROP INDEX IF EXISTS recipes_recipesearch_vector_gin",
+    "ALTER TABLE recipes_recipesearchdocument DROP COLUMN IF EXISTS search_vector",
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        _run(schema_editor, SQLITE_FORWARD)
+    elif vendor == "postgresql":
+        _run(schema_editor, POSTGRES_FORWARD)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == "sqlite":
+        _run(schema_editor, SQLITE_BACKWARD)
+    elif vendor == "postgresql":
+        _run(schema_editor, POSTGRES_BACKWARD)
+
+
+def populate_documents(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    RecipeSearchDocument = apps.get_model("recipes", "RecipeSearchDocument")
+
+    documents = []
+    for recipe in Recipe.objects.prefetch_related("tags", "meal_types").iterator(chunk_size=1000):
+        keywords = [recipe.cuisine]
+        keywords += [tag.name for tag in recipe.tags.all()]
+        keywords += [meal_type.name for meal_type in recipe.meal_types.all()]
+        body = [recipe.description] + [str(item) for item in recipe.ingredients or []]
+        documents.append(
+            RecipeSearchDocument(
+                recipe_id=recipe.pk,
+                title=recipe.name,
+                keywords=" ".join(k for k in keywords if k),
+                body="\n".join(b for b in body if b),
+            )
+        )
+        if len(documents) >= 1000:
+            RecipeSearchDocument.objects.bulk_create(documents)
+            documents = []
+    if documents:
+        RecipeSearchDocument.objects.bulk_create(documents)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecipeSearchDocument',
+            fields=[
+                ('recipe', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='search_document', serialize=False, to='recipes.recipe')),
+                ('title', models.TextField(blank=True, default='')),
+                ('keywords', models.TextField(blank=True, default='')),
+                ('body', models.TextField(blank=True, default='')),
+            ],
+        ),
+        migrations.RunPython(create_search_index, drop_search_index),
+        migrations.RunPython(populate_documents, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def populate_ingredient_index(apps, schema_editor):
+    from apps.recipes.ingredients import normalize_ingredients
+
+    Recipe = apps.get_model("recipes", "Recipe")
+    Ingredient = apps.get_model("recipes", "Ingredient")
+    RecipeIngredient = apps.get_model("recipes", "RecipeIngredient")
+
+    ingredient_ids = {}
+    for recipe in Recipe.objects.only("pk", "ingredients").iterator(chunk_size=1000):
+        names = normalize_ingredients(recipe.ingredients)
+        for name in names:
+            if name not in ingredient_ids:
+                ingredient_ids[name] = Ingredient.objects.get_or_create(name=name)[0].pk
+        RecipeIngredient.objects.bulk_create(
+            [RecipeIngredient(recipe_id=recipe.pk, ingredient_id=ingredient_ids[name]) for name in names]
+        )
+        Recipe.objects.filter(pk=recipe.pk).update(ingredient_count=len(names))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0003_recipesearchdocument'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Ingredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=128, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='ingredient_count',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.CreateModel(
+            name='RecipeIngredient',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('ingredient', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='postings', to='recipes.ingredient')),
+                ('recipe', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ingredient_postings', to='recipes.recipe')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['recipe'], name='recipes_rec_recipe__6c6558_idx')],
+                'unique_together': {('ingredient', 'recipe')},
+            },
+        ),
+        migrations.RunPython(populate_ingredient_index, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 5.2.18 on 2026-10-18 16:49
+
+from django.db import migrations, models
+from django.db.models import F, OuterRef, Subquery, Sum
+from django.db.models.functions import Coalesce, Round
+
+
+def populate_rating_sum(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    Rating = apps.get_model("interactions", "Rating")
+
+    # Exact sum where individual ratings exist; otherwise derive it from the
+    # imported average so rating == rating_sum / review_count keeps holding.
+    rating_total = (
+        Rating.objects.filter(recipe=OuterRef("pk"))
+        .values("recipe")
+        .annotate(total=Sum("score"))
+        .values("total")
+    )
+    Recipe.objects.update(
+        rating_sum=Coalesce(
+            Subquery(rating_total),
+            Round(F("rating") * F("review_count")),
+            output_field=models.PositiveIntegerField(),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0004_ingredient_index'),
+        ('interactions', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_rating_sum, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,52 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:47
+
+from django.db import migrations, models
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery, Sum, Value
+from django.db.models.functions import Coalesce, Greatest
+
+
+def split_imported_rating(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    Rating = apps.get_model("interactions", "Rating")
+
+    # Whatever the aggregate holds beyond the individual ratings came from
+    # the import.
+    def votes(aggregate):
+        return Coalesce(
+            Subquery(
+                Rating.objects.filter(recipe=OuterRef("pk"))
+                .order_by()
+                .values("recipe")
+                .annotate(value=aggregate)
+                .values("value"),
+                output_field=IntegerField(),
+            ),
+            Value(0),
+        )
+
+    Recipe.objects.update(
+        imported_rating_sum=Greatest(F("rating_sum") - votes(Sum("score")), Value(0)),
+        imported_review_count=Greatest(F("review_count") - votes(Count("pk")), Value(0)),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0010_response_cache_version'),
+        ('interactions', '0002_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='recipe',
+            name='imported_rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='recipe',
+            name='imported_review_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(split_imported_rating, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.18 on 2026-10-18 17:55
+
+from django.db import migrations, models
+
+
+def zero_to_null(apps, schema_editor):
+    # 0.0 used to mean "no activity"; a real score is never exactly 0.
+    Recipe = apps.get_model("recipes", "Recipe")
+    Recipe.objects.filter(trending_score=0).update(trending_score=None)
+
+
+def null_to_zero(apps, schema_editor):
+    Recipe = apps.get_model("recipes", "Recipe")
+    Recipe.objects.filter(trending_score__isnull=True).update(trending_score=0)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0011_recipe_imported_rating'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='recipe',
+            name='trending_score',
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.RunPython(zero_to_null, null_to_zero),
+    ]
@@ -2,6 +2,8 @@ from django.db import models
 from django.contrib.auth import get_user_model
 from django.core.validators import MaxValueValidator, MinValueValidator
 from django.utils.text import slugify
+
+from apps.core.models import ProtectedFieldsMixin
 # Create your models here.
 
 User = get_user_model()
@@ -33,7 +35,19 @@ class MealType(models.Model):
         return self.name
 
 
-class Recipe(models.Model):
+class Ingredient(models.Model):
+    """A normalised ingredient name shared across recipes."""
+
+    name = models.CharField(max_length=128, unique=True)
+
+    class Meta:
+        ordering = ["name"]
+
+    def __str__(self) -> str:
+        return self.name
+
+
+class Recipe(ProtectedFieldsMixin, models.Model):
     DIFFICULTY_CHOICES = [
         ("Easy", "Easy"),
         ("Medium", "Medium"),
@@ -52,6 +66,8 @@ class Recipe(models.Model):
 
     ingredients = models.JSONField(default=list)
     instructions = models.JSONField(default=list)
+    # Number of distinct non-staple ingredients (maintained with the ingredient index)
+    ingredient_count = models.PositiveSmallIntegerField(default=0)
 
     prep_time_minutes = models.PositiveSmallIntegerField(default=0)
     cook_time_minutes = models.PositiveSmallIntegerField(default=0)
@@ -72,8 +88,28 @@ class Recipe(models.Model):
         validators=[MinValueValidator(0), MaxValueValidator(5)],
     )
     review_count = models.PositiveIntegerField(default=0)
+    rating_sum = models.PositiveIntegerField(default=0)
+    # Aggregate brought in by an import (seed_recipes); votes on the site are
+    # added on top, so review_count = imported_review_count + ratings.
+    imported_rating_sum = models.PositiveIntegerField(default=0)
+    imported_review_count = models.PositiveIntegerField(default=0)
+
+    # Engagement counters (updated atomically by the interaction endpoints)
+    comment_count = models.PositiveIntegerField(default=0)
+    save_count = models.PositiveIntegerField(default=0)
+    share_count = models.PositiveIntegerField(default=0)
+    # Log of exponentially decayed activity (see apps/recipes/trending.py);
+    # NULL until the recipe's first interaction.
+    trending_score = models.FloatField(null=True, blank=True)
 
     is_published = models.BooleanField(default=True, db_index=True)
+
+    # Set by seed_recipes: the feed a recipe came from, its id there, and a
+    # digest of the imported content, so a re-import rewrites only the
+    # recipes that changed (see apps.recipes.importer).
+    external_source = models.CharField(max_length=64, blank=True, default="")
+    external_id = models.CharField(max_length=64, null=True, blank=True)
+    content_hash = models.CharField(max_length=40, blank=True, default="")
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -83,12 +119,117 @@ class Recipe(models.Model):
             models.Index(fields=["cuisine"]),
             models.Index(fields=["difficulty"]),
             models.Index(fields=["is_published", "-created_at"]),
+            models.Index(fields=["is_published", "-trending_score"], name="recipe_trending_idx"),
             models.Index(fields=["author"]),
+            models.Index(fields=["author", "-created_at"], name="recipe_author_recent_idx"),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["external_source", "external_id"],
+                condition=models.Q(external_id__isnull=False),
+                name="unique_recipe_external_id",
+            ),
         ]
 
     def __str__(self) -> str:
         return self.name
 
+    # Only ever changed with F() expressions.
+    PROTECTED_FIELDS = frozenset({
+        "rating", "review_count", "rating_sum", "comment_count", "save_count", "share_count",
+        "trending_score",
+    })
+
     @property
     def total_time_minutes(self) -> int:
-        return self.prep_time_minutes + self.cook_time_minutes
\ No newline at end of file
+        return self.prep_time_minutes + self.cook_time_minutes
+
+
+class RecipeIngredient(models.Model):
+    """
+    Posting-list entry: ``ingredient`` is used by ``recipe``.  Built from
+    ``Recipe.ingredients`` by ``apps.recipes.ingredients``.
+    """
+
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name="ingredient_postings")
+    ingredient = models.ForeignKey(Ingredient, on_delete=models.CASCADE, related_name="postings")
+
+    class Meta:
+        unique_together = ("ingredient", "recipe")
+        indexes = [models.Index(fields=["recipe"])]
+
+    def __str__(self) -> str:
+        return f"{self.ingredient} in recipe {self.recipe_id}"
+
+
+class RecipeSearchDocument(models.Model):
+    """
+    Flattened searchable text for a recipe.  The database builds its
+    full-text index on top of this table (see ``apps.recipes.search``).
+    """
+
+    recipe = models.OneToOneField(
+        Recipe,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="search_document",
+    )
+    title = models.TextField(blank=True, default="")
+    keywords = models.TextField(blank=True, default="")
+    body = models.TextField(blank=True, default="")
+
+    def __str__(self) -> str:
+        return f"Search document for recipe {self.recipe_id}"
+
+
+class FeedEntry(models.Model):
+    """
+    One recipe in a user's home timeline, pushed when a followed author
+    publishes (see ``apps.recipes.feed``).  ``created_at`` copies the recipe's
+    so the timeline is one ``(owner, created_at)`` index range.
+    """
+
+    owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name="feed_entries")
+    recipe = models.ForeignKey(Recipe, on_delete=models.CASCADE, related_name="feed_entries")
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField()
+
+    class Meta:
+        ordering = ["-created_at", "-recipe_id"]
+        constraints = [
+            models.UniqueConstraint(fields=["owner", "recipe"], name="unique_feed_entry"),
+        ]
+        indexes = [
+            models.Index(fields=["owner", "-created_at", "-recipe"], name="feed_timeline_idx"),
+            models.Index(fields=["owner", "author"], name="feed_owner_author_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"{self.recipe_id} in {self.owner_id}'s feed"
+
+
+class ResponseCacheVersion(models.Model):
+    """
+    Version of a response-cache namespace, kept in the database when the
+    cache itself is local to each process (see ``apps.recipes.cache``).
+    """
+
+    namespace = models.CharField(max_length=100, primary_key=True)
+    version = models.BigIntegerField()
+
+    def __str__(self) -> str:
+        return f"{self.namespace} v{self.version}"
+
+
+class FacetChange(models.Model):
+    """
+    Recipes whose facet values changed, logged in the transaction that
+    changed them.  The id orders the log every process's facet index replays
+    (see ``apps.recipes.facets``).
+    """
+
+    recipe_ids = models.JSONField()
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    def __str__(self) -> str:
+        return f"Facet change {self.pk} ({len(self.recipe_ids)} recipe(s))"
@@ -0,0 +1,131 @@
+"""
+Full-text search over recipes.
+
+Every recipe owns one ``RecipeSearchDocument`` row holding its flattened
+text (name / cuisine, tags & meal types / description & ingredients).  The
+database indexes that table:
+
+* PostgreSQL — a stored, weighted ``tsvector`` column with a GIN index.
+* SQLite     — an FTS5 external-content table kept in sync by triggers.
+
+Both structures are created by migration ``recipes.0003``.  Documents are kept
+current by the signals in ``apps.recipes.signals`` and can be rebuilt with
+``python manage.py rebuild_search_index``.
+"""
+
+import re
+
+from django.db import connection
+from django.db.models.expressions import RawSQL
+
+from .models import Recipe, RecipeSearchDocument
+
+FTS_TABLE = "recipes_recipesearch_fts"
+MAX_SEARCH_TERMS = 10
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def build_document(recipe) -> dict:
+    """Return the searchable text fields for a recipe (uses prefetched m2m if present)."""
+    return document_fields(
+        name=recipe.name,
+        cuisine=recipe.cuisine,
+        tags=[tag.name for tag in recipe.tags.all()],
+        meal_types=[meal_type.name for meal_type in recipe.meal_types.all()],
+        description=recipe.description,
+        ingredients=recipe.ingredients,
+    )
+
+
+def document_fields(*, name, cuisine, tags, meal_types, description, ingredients) -> dict:
+    """The search document of a recipe given as plain values (e.g. by the importer)."""
+    keywords = [cuisine, *tags, *meal_types]
+    body = [description]
+    body += [str(item) for item in ingredients or []]
+    return {
+        "title": name,
+        "keywords": " ".join(k for k in keywords if k),
+        "body": "\n".join(b for b in body if b),
+    }
+
+
+def index_recipe(recipe) -> None:
+    """Create or refresh the search document of a single recipe."""
+    RecipeSearchDocument.objects.update_or_create(
+        recipe_id=recipe.pk,
+        defaults=build_document(recipe),
+    )
+
+
+def index_recipes(queryset=None, chunk_size: int = 1000) -> int:
+    """Upsert search documents for ``queryset`` (default: every recipe) in chunks."""
+    if queryset is None:
+        queryset = Recipe.objects.all()
+    queryset = queryset.prefetch_related("tags", "meal_types").order_by("pk")
+
+    indexed = 0
+    batch = []
+    for recipe in queryset.iterator(chunk_size=chunk_size):
+        batch.append(RecipeSearchDocument(recipe_id=recipe.pk, **build_document(recipe)))
+        if len(batch) >= chunk_size:
+            indexed += _upsert_documents(batch)
+            batch = []
+    if batch:
+        indexed += _upsert_documents(batch)
+    return indexed
+
+
+def _upsert_documents(documents) -> int:
+    RecipeSearchDocument.objects.bulk_create(
+        documents,
+        update_conflicts=True,
+        unique_fields=["recipe"],
+        update_fields=["title", "keywords", "body"],
+    )
+    return len(documents)
+
+
+def rebuild_backend_index() -> None:
+    """Rebuild the database-side index structure from the document table."""
+    if connection.vendor == "sqlite":
+        with connection.cursor() as cursor:
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+            cursor.execute(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('optimize')")
+    elif connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute("REINDEX INDEX recipes_recipesearch_vector_gin")
+
+
+def tokenize(term: str) -> list[str]:
+    """Split raw user input into safe, lower-cased search tokens."""
+    return _TOKEN_RE.findall(term.lower())[:MAX_SEARCH_TERMS]
+
+
+def matching_ids(term: str):
+    """
+    Return a ``RawSQL`` subquery of recipe ids whose document matches every
+    token of ``term`` (prefix match), or ``None`` if nothing is searchable.
+    """
+    tokens = tokenize(term)
+    if not tokens:
+        return None
+
+    if connection.vendor == "postgresql":
+        query = " & ".join(f"{token}:*" for token in tokens)
+        return RawSQL(
+            "SELECT recipe_id FROM recipes_recipesearchdocument "
+            "WHERE search_vector @@ to_tsquery('english', %s)",
+            [query],
+        )
+
+    query = " ".join(f'"{token}"*' for token in tokens)
+    return RawSQL(f"SELECT rowid FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH %s", [query])
+
+
+def search_queryset(queryset, term: str):
+    """Restrict a ``Recipe`` queryset to full-text matches for ``term``."""
+    ids = matching_ids(term)
+    if ids is None:
+        return queryset
+    return queryset.filter(pk__in=ids)
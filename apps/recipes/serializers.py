@@ -2,6 +2,7 @@ from rest_framework import serializers
 
 from apps.users.serializers import UserPublicSerializer
 from .models import MealType, Recipe, Tag
+from .trending import heat
 
 
 class TagSerializer(serializers.ModelSerializer):
@@ -42,12 +43,40 @@ class RecipeListSerializer(serializers.ModelSerializer):
             "calories_per_serving",
             "rating",
             "review_count",
+            "comment_count",
+            "save_count",
+            "share_count",
             "tags",
             "meal_types",
             "is_published",
             "created_at",
         )
-        read_only_fields = ("id", "rating", "review_count", "author", "created_at")
+        read_only_fields = (
+            "id", "rating", "review_count", "comment_count", "save_count", "share_count",
+            "author", "created_at",
+        )
+
+
+class RecipePantryMatchSerializer(RecipeListSerializer):
+    """List item for ingredient search, with how much of the recipe is covered."""
+
+    matched_count = serializers.IntegerField(read_only=True)
+    coverage = serializers.FloatField(read_only=True)
+
+    class Meta(RecipeListSerializer.Meta):
+        fields = RecipeListSerializer.Meta.fields + ("ingredient_count", "matched_count", "coverage")
+
+
+class RecipeTrendingSerializer(RecipeListSerializer):
+    """List item for the trending feed, with the recipe's current decayed activity."""
+
+    heat = serializers.SerializerMethodField()
+
+    class Meta(RecipeListSerializer.Meta):
+        fields = RecipeListSerializer.Meta.fields + ("heat",)
+
+    def get_heat(self, obj) -> float:
+        return round(heat(obj.trending_score), 3)
 
 
 class RecipeDetailSerializer(serializers.ModelSerializer):
@@ -96,11 +125,17 @@ class RecipeDetailSerializer(serializers.ModelSerializer):
             "meal_type_ids",
             "rating",
             "review_count",
+            "comment_count",
+            "save_count",
+            "share_count",
             "is_published",
             "created_at",
             "updated_at",
         )
-        read_only_fields = ("id", "author", "rating", "review_count", "created_at", "updated_at")
+        read_only_fields = (
+            "id", "author", "rating", "review_count", "comment_count", "save_count", "share_count",
+            "created_at", "updated_at",
+        )
 
     def create(self, validated_data):
         tags = validated_data.pop("tags", [])
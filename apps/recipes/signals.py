@@ -0,0 +1,82 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from .cache import TAXONOMY, invalidate, invalidate_recipes
+from .facets import mark_changed
+from .ingredients import index_recipe_ingredients
+from .models import MealType, Recipe, Tag
+from .search import index_recipe, index_recipes
+
+
+@receiver(post_save, sender=Recipe)
+def on_recipe_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    invalidate_recipes(instance.pk)
+    mark_changed(instance.pk)
+    index_recipe(instance)
+    if update_fields is None or "ingredients" in update_fields:
+        index_recipe_ingredients([instance])
+
+
+@receiver(post_delete, sender=Recipe)
+def on_recipe_delete(sender, instance, **kwargs):
+    invalidate_recipes(instance.pk)
+    mark_changed(instance.pk)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+@receiver(m2m_changed, sender=Recipe.meal_types.through)
+def on_recipe_taxonomy_change(sender, instance, action, reverse, pk_set, **kwargs):
+    """Re-index recipes whose tags or meal types changed (from either side)."""
+    if action == "pre_clear" and reverse:
+        # Remember which recipes lose the tag before the rows disappear.
+        instance._cleared_recipe_ids = list(instance.recipes.values_list("pk", flat=True))
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if not reverse:
+        invalidate_recipes(instance.pk)
+        mark_changed(instance.pk)
+        index_recipe(instance)
+        return
+
+    if action == "post_clear":
+        recipe_ids = getattr(instance, "_cleared_recipe_ids", [])
+    else:
+        recipe_ids = pk_set or []
+    if recipe_ids:
+        invalidate_recipes(*recipe_ids)
+        mark_changed(*recipe_ids)
+        index_recipes(Recipe.objects.filter(pk__in=recipe_ids))
+
+
+@receiver(post_save, sender=Tag)
+@receiver(post_save, sender=MealType)
+def on_taxonomy_save(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    invalidate(TAXONOMY)
+    if not created:
+        index_recipes(instance.recipes.all())
+        mark_changed(*instance.recipes.values_list("pk", flat=True))
+
+
+@receiver(pre_delete, sender=Tag)
+@receiver(pre_delete, sender=MealType)
+def on_taxonomy_pre_delete(sender, instance, **kwargs):
+    # The delete cascades the through rows without m2m_changed, and they are
+    # gone by post_delete: remember which recipes carried the term.
+    instance._deleted_recipe_ids = list(instance.recipes.values_list("pk", flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+@receiver(post_delete, sender=MealType)
+def on_taxonomy_delete(sender, instance, **kwargs):
+    invalidate(TAXONOMY)
+    recipe_ids = getattr(instance, "_deleted_recipe_ids", [])
+    if recipe_ids:
+        invalidate_recipes(*recipe_ids)
+        mark_changed(*recipe_ids)
+        index_recipes(Recipe.objects.filter(pk__in=recipe_ids))
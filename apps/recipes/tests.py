@@ -1,3 +1,936 @@
-from django.test import TestCase
+import json
+import tempfile
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase
+from rest_framework.views import APIView
+
+from apps.interactions.models import Rating
+from apps.interactions.services import adjust_recipe_counters
+from apps.notifications.models import Notification
+
+from . import facets, feed
+from .cache import _cache
+from .exporter import SITE_SOURCE
+from .filters import RecipeFilter
+from .ingredients import normalize_ingredient, rank_by_pantry
+from .importer import Checkpoint, RecipeImporter, parse_ranges, read_records, split_ranges
+from .models import FacetChange, FeedEntry, MealType, Recipe, RecipeIngredient, RecipeSearchDocument, Tag
+from .search import search_queryset
+from .trending import combine, event_exponent, heat
+
+User = get_user_model()
+
+
+def make_recipe(author, name, **fields):
+    fields.setdefault("ingredients", ["Salt"])
+    return Recipe.objects.create(author=author, name=name, **fields)
+
+
+class RecipeTestCase(APITestCase):
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username="cook", email="cook@example.com")
+
+    def search(self, term):
+        return set(search_queryset(Recipe.objects.all(), term).values_list("name", flat=True))
+
+
+# ─── Search ────────────────────────────────────────────────────────────────────
+
+class RecipeSearchTests(RecipeTestCase):
+    def setUp(self):
+        super().setUp()
+        self.pizza = make_recipe(
+            self.user, "Margherita Pizza", cuisine="Italian", ingredients=["Mozzarella", "Basil"],
+        )
+        self.curry = make_recipe(self.user, "Chickpea Curry", cuisine="Indian", description="Weeknight dinner")
+
+    def test_matches_every_indexed_field_by_prefix(self):
+        self.assertEqual(self.search("margh"), {"Margherita Pizza"})
+        self.assertEqual(self.search("italian"), {"Margherita Pizza"})
+        self.assertEqual(self.search("mozz"), {"Margherita Pizza"})
+        self.assertEqual(self.search("weeknight"), {"Chickpea Curry"})
+        self.assertEqual(self.search("pizza basil"), {"Margherita Pizza"})
+        self.assertEqual(self.search("pizza curry"), set())
+
+    def test_edits_are_reindexed(self):
+        self.curry.name = "Lentil Dal"
+        self.curry.save()
+        self.assertEqual(self.search("chickpea"), set())
+        self.assertEqual(self.search("lentil"), {"Lentil Dal"})
+
+    def test_tags_and_meal_types_are_reindexed_from_either_side(self):
+        tag = Tag.objects.create(name="Vegetarian")
+        dinner = MealType.objects.create(name="Dinner")
+        self.pizza.tags.add(tag)
+        dinner.recipes.add(self.curry)
+        self.assertEqual(self.search("vegetarian"), {"Margherita Pizza"})
+        self.assertEqual(self.search("dinner"), {"Chickpea Curry"})
+
+        tag.name = "Veggie"
+        tag.save()
+        self.assertEqual(self.search("vegetarian"), set())
+        self.assertEqual(self.search("veggie"), {"Margherita Pizza"})
+
+        tag.recipes.clear()
+        self.assertEqual(self.search("veggie"), set())
+
+    def test_deleted_tag_and_meal_type_drop_out_of_search(self):
+        tag = Tag.objects.create(name="Vegetarian")
+        brunch = MealType.objects.create(name="Brunch")
+        self.pizza.tags.add(tag)
+        self.curry.meal_types.add(brunch)
+        self.assertEqual(self.search("brunch"), {"Chickpea Curry"})
+
+        tag.delete()
+        brunch.delete()
+        self.assertEqual(self.search("vegetarian"), set())
+        self.assertEqual(self.search("brunch"), set())
+        self.assertEqual(RecipeSearchDocument.objects.get(recipe=self.pizza).keywords, "Italian")
+
+    def test_deleted_recipe_drops_out_of_search(self):
+        self.pizza.delete()
+        self.assertFalse(RecipeSearchDocument.objects.filter(recipe_id=self.pizza.pk).exists())
+        self.assertEqual(self.search("pizza"), set())
+
+    def test_list_endpoint_searches_and_ignores_punctuation(self):
+        response = self.client.get("/api/v1/recipes/", {"search": "pizza!"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([item["name"] for item in response.data["results"]], ["Margherita Pizza"])
+
+        response = self.client.get("/api/v1/recipes/", {"search": "!!!"})
+        self.assertEqual(response.data["count"], 2)
+
+
+# ─── Filters ───────────────────────────────────────────────────────────────────
+
+class RecipeFilterTests(RecipeTestCase):
+    def setUp(self):
+        super().setUp()
+        self.carbonara = make_recipe(self.user, "Carbonara")
+        self.pesto = make_recipe(self.user, "Pesto")
+        make_recipe(self.user, "Curry")
+        # Tag names are unique but matched case-insensitively, so both match ?tag=pasta.
+        self.carbonara.tags.add(
+            Tag.objects.create(name="Pasta", slug="pasta"), Tag.objects.create(name="PASTA", slug="pasta-2"),
+        )
+        self.pesto.tags.add(Tag.objects.get(name="Pasta"))
+        dinner = MealType.objects.create(name="Dinner")
+        self.carbonara.meal_types.add(dinner, MealType.objects.create(name="DINNER"))
+
+    def filtered(self, **params):
+        return RecipeFilter(params, queryset=Recipe.objects.all()).qs
+
+    def list_names(self, **params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get("/api/v1/recipes/", params)
+        self.assertFalse(any("DISTINCT" in query["sql"].upper() for query in queries.captured_queries))
+        names = [item["name"] for item in response.data["results"]]
+        self.assertEqual(response.data["count"], len(names))
+        return sorted(names)
+
+    def test_recipe_with_two_matching_tags_is_returned_once(self):
+        queryset = self.filtered(tag="pasta")
+        self.assertFalse(queryset.query.distinct)
+        self.assertEqual(queryset.count(), len(queryset))
+        self.assertEqual(sorted(queryset.values_list("name", flat=True)), ["Carbonara", "Pesto"])
+        self.assertEqual(self.list_names(tag="pasta"), ["Carbonara", "Pesto"])
+
+    def test_recipe_matching_tag_and_meal_type_is_returned_once(self):
+        queryset = self.filtered(tag="pasta", meal_type="dinner")
+        self.assertFalse(queryset.query.distinct)
+        self.assertEqual(queryset.count(), len(queryset))
+        self.assertEqual(list(queryset.values_list("name", flat=True)), ["Carbonara"])
+        self.assertEqual(self.list_names(tag="pasta", meal_type="dinner"), ["Carbonara"])
+        self.assertEqual(self.list_names(meal_type="dinner"), ["Carbonara"])
+
+
+# ─── Ingredient search ─────────────────────────────────────────────────────────
+
+class RecipeByIngredientsTests(RecipeTestCase):
+    def setUp(self):
+        super().setUp()
+        self.fried_rice = make_recipe(
+            self.user, "Fried rice", cuisine="Chinese",
+            ingredients=["2 cups cooked rice", "Garlic", "2 Eggs", "Salt"],
+        )
+        self.chicken = make_recipe(
+            self.user, "Chicken", cuisine="Indian",
+            ingredients=["Chicken thighs", "Garlic cloves, minced", "Pepper"],
+        )
+        make_recipe(self.user, "Pancakes", ingredients=["Flour", "Milk", "Egg"])
+
+    def postings(self, recipe):
+        return set(RecipeIngredient.objects.filter(recipe_id=recipe.pk).values_list("ingredient__name", flat=True))
+
+    def cook_with(self, ingredients, **params):
+        response = self.client.get("/api/v1/recipes/cook-with/", {"ingredients": ingredients, **params})
+        self.assertEqual(response.status_code, 200)
+        return [(item["name"], round(item["coverage"], 2)) for item in response.data["results"]]
+
+    def test_ingredient_lines_are_normalised(self):
+        self.assertEqual(normalize_ingredient("2 Garlic cloves, minced"), "garlic clove")
+        self.assertEqual(normalize_ingredient("1 cup (200 g) basmati rice"), "basmati rice")
+        self.assertEqual(normalize_ingredient("Fresh basil leaves"), "basil leaf")
+        self.assertEqual(normalize_ingredient("3 ripe tomatoes"), "tomato")
+        self.assertEqual(normalize_ingredient("Salt to taste"), "salt")
+        self.assertEqual(normalize_ingredient("2 cups"), "")
+
+    def test_postings_follow_create_edit_and_delete(self):
+        self.assertEqual(self.postings(self.fried_rice), {"rice", "garlic", "egg"})
+        self.assertEqual(self.fried_rice.ingredient_count, 3)
+
+        self.fried_rice.ingredients = ["Rice", "Eggs", "Spring onions"]
+        self.fried_rice.save()
+        self.assertEqual(self.postings(self.fried_rice), {"rice", "egg", "spring onion"})
+        self.assertEqual(Recipe.objects.get(pk=self.fried_rice.pk).ingredient_count, 3)
+        self.assertEqual(self.cook_with("garlic"), [("Chicken", 0.5)])
+
+        pk = self.fried_rice.pk
+        self.fried_rice.delete()
+        self.assertFalse(RecipeIngredient.objects.filter(recipe_id=pk).exists())
+        self.assertEqual(self.cook_with("rice"), [])
+
+    def test_recipes_are_ranked_by_coverage(self):
+        self.assertEqual(
+            self.cook_with("rice,garlic,egg"), [("Fried rice", 1.0), ("Chicken", 0.5), ("Pancakes", 0.33)],
+        )
+        self.assertEqual(self.cook_with("rice"), [("Fried rice", 0.33)])
+
+    def test_filters_apply_before_the_best_matches_are_picked(self):
+        self.assertEqual(self.cook_with("rice,garlic,egg", cuisine="indian"), [("Chicken", 0.5)])
+        with self.settings(PANTRY_SEARCH={"MAX_RESULTS": 1}):
+            self.assertEqual(self.cook_with("rice,garlic,egg"), [("Fried rice", 1.0)])
+            self.assertEqual(self.cook_with("rice,garlic,egg", cuisine="indian"), [("Chicken", 0.5)])
+
+        Recipe.objects.filter(pk=self.fried_rice.pk).update(is_published=False)
+        self.assertEqual(self.cook_with("rice"), [])
+        response = self.client.get("/api/v1/recipes/cook-with/", {"ingredients": " , "})
+        self.assertEqual(response.status_code, 400)
+
+    def test_the_best_matches_are_cut_in_the_database(self):
+        ranked = rank_by_pantry(Recipe.objects.all(), ["rice", "garlic", "egg"], limit=2)
+        self.assertEqual(ranked.count(), 2)
+        self.assertEqual([recipe.name for recipe in ranked], ["Fried rice", "Chicken"])
+
+    def test_staples_are_ignored(self):
+        self.assertEqual(self.postings(self.chicken), {"chicken thigh", "garlic clove"})
+        self.assertEqual(self.cook_with("salt,pepper,water"), [])
+        self.assertEqual(self.cook_with("chicken thighs,salt"), [("Chicken", 0.5)])
+
+
+# ─── Keyset pagination ─────────────────────────────────────────────────────────
+
+class KeysetPaginationTests(RecipeTestCase):
+    def setUp(self):
+        super().setUp()
+        self.client.force_authenticate(self.user)
+        for number in range(30):
+            calories = None if number % 3 == 0 else number % 5 * 100
+            make_recipe(self.user, f"Recipe {number:02}", calories_per_serving=calories)
+        # Ties on the sort key must be broken by the id.
+        Recipe.objects.update(created_at=Recipe.objects.earliest("pk").created_at)
+
+    def walk(self, params, url="/api/v1/recipes/"):
+        """Follow ``next`` links from the first page; returns the pages' ids."""
+        pages = []
+        response = self.client.get(url, {**params, "cursor": ""})
+        while True:
+            self.assertEqual(response.status_code, 200)
+            self.assertNotIn("count", response.data)
+            pages.append([item["id"] for item in response.data["results"]])
+            if not response.data["next"]:
+                return pages, response
+            response = self.client.get(response.data["next"])
+
+    def test_walks_every_row_once_in_order(self):
+        pages, _ = self.walk({})
+        self.assertEqual([len(page) for page in pages], [12, 12, 6])
+        ids = [pk for page in pages for pk in page]
+        self.assertEqual(ids, sorted(Recipe.objects.values_list("pk", flat=True), reverse=True))
+
+    def test_nullable_sort_field_puts_nulls_last_in_both_directions(self):
+        for ordering in ("calories_per_serving", "-calories_per_serving"):
+            pages, _ = self.walk({"ordering": ordering})
+            ids = [pk for page in pages for pk in page]
+            self.assertEqual(len(ids), 30)
+            calories = dict(Recipe.objects.values_list("pk", "calories_per_serving"))
+            values = [calories[pk] for pk in ids]
+            present = [value for value in values if value is not None]
+            self.assertEqual(values[len(present):], [None] * 10)
+            self.assertEqual(present, sorted(present, reverse=ordering.startswith("-")))
+
+    def test_previous_links_walk_back_to_the_first_page(self):
+        pages, response = self.walk({"ordering": "calories_per_serving"})
+        self.assertIsNone(self.client.get("/api/v1/recipes/", {"cursor": ""}).data["previous"])
+        back = []
+        while response.data["previous"]:
+            response = self.client.get(response.data["previous"])
+            back.append([item["id"] for item in response.data["results"]])
+        self.assertEqual(back, pages[-2::-1])
+
+    def test_filters_apply_and_empty_results_have_no_links(self):
+        pages, _ = self.walk({"search": "nothing-matches"})
+        self.assertEqual(pages, [[]])
+        response = self.client.get("/api/v1/recipes/", {"cursor": "", "cuisine": "Nope"})
+        self.assertIsNone(response.data["next"])
+        self.assertIsNone(response.data["previous"])
+
+    def test_invalid_cursors_are_not_found(self):
+        for cursor in ("garbage!", "W10", "eyJ2IjpbMV19", "eyJ2IjpbIngiLCJ5Il19"):
+            response = self.client.get("/api/v1/recipes/", {"cursor": cursor})
+            self.assertEqual(response.status_code, 404, cursor)
+
+    def test_page_numbers_still_work_without_cursor(self):
+        response = self.client.get("/api/v1/recipes/", {"page": 3})
+        self.assertEqual(response.data["count"], 30)
+        self.assertEqual(len(response.data["results"]), 6)
+
+
+# ─── Response cache ────────────────────────────────────────────────────────────
+
+class ResponseCacheTests(RecipeTestCase):
+    def setUp(self):
+        super().setUp()
+        self.voter = User.objects.create_user(username="voter", email="voter@example.com")
+        self.pizza = make_recipe(self.user, "Pizza", cuisine="Italian")
+        self.curry = make_recipe(self.user, "Curry", cuisine="Indian")
+
+    def get(self, url="/api/v1/recipes/", params=None, **extra):
+        return self.client.get(url, params or {}, **extra)
+
+    def assertCache(self, label, url="/api/v1/recipes/", params=None):
+        response = self.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["X-Cache"], label, (url, params))
+        return response
+
+    def test_second_anonymous_read_is_a_hit_and_matches(self):
+        miss = self.assertCache("MISS")
+        hit = self.assertCache("HIT")
+        self.assertEqual(hit.content, miss.content)
+        self.assertEqual(hit["ETag"], miss["ETag"])
+        self.assertEqual(hit["Content-Type"], miss["Content-Type"])
+
+    def test_query_string_is_normalised(self):
+        self.assertCache("MISS", params={"cuisine": "Italian", "ordering": "name"})
+        response = self.client.get("/api/v1/recipes/?ordering=name&cuisine=Italian")
+        self.assertEqual(response["X-Cache"], "HIT")
+
+    def test_if_none_match_returns_304(self):
+        etag = self.assertCache("MISS")["ETag"]
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH=etag).status_code, 304)
+        self.assertEqual(self.get(HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+
+    def test_authenticated_reads_are_not_cached(self):
+        self.client.force_authenticate(self.user)
+        self.assertNotIn("X-Cache", self.get())
+        self.assertNotIn("X-Cache", self.get())
+
+    def test_responses_are_finalized_once(self):
+        finalize = APIView.finalize_response
+        with mock.patch.object(APIView, "finalize_response", autospec=True, side_effect=finalize) as patched:
+            self.assertCache("MISS")
+            self.assertEqual(patched.call_count, 1)
+            self.assertCache("HIT")
+            self.assertEqual(patched.call_count, 2)
+
+    def test_recipe_changes_invalidate_lists_and_their_detail(self):
+        detail = f"/api/v1/recipes/{self.curry.pk}/"
+        self.assertCache("MISS")
+        self.assertCache("MISS", detail)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.pizza.name = "Calzone"
+            self.pizza.save()
+        self.assertIn(b"Calzone", self.assertCache("MISS").content)
+        self.assertCache("HIT", detail)
+
+    def test_a_vote_only_invalidates_pages_showing_the_recipe(self):
+        italian = {"cuisine": "Italian"}
+        indian = {"cuisine": "Indian"}
+        for params in (italian, indian, {"ordering": "-rating"}):
+            self.assertCache("MISS", params=params)
+        with self.captureOnCommitCallbacks(execute=True):
+            Rating.objects.create(recipe=self.pizza, user=self.voter, score=4)
+        self.assertEqual(self.assertCache("MISS", params=italian).data["results"][0]["review_count"], 1)
+        self.assertCache("HIT", params=indian)
+        # Ordered by a counter: any vote may reorder it.
+        self.assertCache("MISS", params={"ordering": "-rating"})
+
+    def test_taxonomy_changes_invalidate_tag_lists(self):
+        tag = Tag.objects.create(name="Spicy")
+        self.assertCache("MISS", "/api/v1/recipes/tags/")
+        self.assertCache("HIT", "/api/v1/recipes/tags/")
+        with self.captureOnCommitCallbacks(execute=True):
+            tag.name = "Hot"
+            tag.save()
+        tags = self.assertCache("MISS", "/api/v1/recipes/tags/").data["results"]
+        self.assertEqual([item["name"] for item in tags], ["Hot"])
+
+    def test_stale_entry_is_served_while_another_request_rebuilds(self):
+        self.assertCache("MISS")
+        with self.captureOnCommitCallbacks(execute=True):
+            make_recipe(self.user, "Tacos")
+        # Another request holds the rebuild lock.
+        with mock.patch.object(_cache(), "add", return_value=False):
+            stale = self.assertCache("STALE")
+        self.assertNotIn(b"Tacos", stale.content)
+        self.assertIn(b"Tacos", self.assertCache("MISS").content)
+
+
+# ─── Trending ──────────────────────────────────────────────────────────────────
+
+class TrendingTests(RecipeTestCase):
+    url = "/api/v1/recipes/trending/"
+
+    def engage(self, recipe, at=None, **activity):
+        adjust_recipe_counters(recipe.pk, activity=activity, at=at)
+
+    def names(self, response):
+        return [item["name"] for item in response.data["results"]]
+
+    def test_recipes_without_activity_have_no_score_and_are_not_listed(self):
+        quiet = make_recipe(self.user, "Quiet")
+        busy = make_recipe(self.user, "Busy")
+        self.assertIsNone(Recipe.objects.get(pk=quiet.pk).trending_score)
+        self.engage(busy, save=1)
+        self.assertEqual(self.names(self.client.get(self.url)), ["Busy"])
+
+    def test_first_event_starts_the_score_and_later_ones_add_up(self):
+        recipe = make_recipe(self.user, "Busy")
+        at = timezone.now()
+        self.engage(recipe, at=at, share=1)
+        score = Recipe.objects.get(pk=recipe.pk).trending_score
+        self.assertAlmostEqual(score, event_exponent(4.0, at))
+        self.assertAlmostEqual(score, combine(None, 4.0, at))
+        self.assertAlmostEqual(heat(score, at), 4.0)
+
+        self.engage(recipe, at=at, save=1)
+        self.assertAlmostEqual(heat(Recipe.objects.get(pk=recipe.pk).trending_score, at), 7.0)
+        self.assertEqual(heat(None), 0.0)
+
+    def test_newer_activity_outranks_older_activity(self):
+        now = timezone.now()
+        old = make_recipe(self.user, "Old favourite")
+        new = make_recipe(self.user, "New hit")
+        self.engage(old, at=now - timedelta(days=3), share=3)
+        self.engage(new, at=now, save=1)
+        self.assertEqual(self.names(self.client.get(self.url)), ["New hit", "Old favourite"])
+
+    def test_list_is_paged_by_cursor_without_a_count(self):
+        for number in range(15):
+            self.engage(make_recipe(self.user, f"Recipe {number:02}"), save=number + 1)
+        make_recipe(self.user, "Quiet")
+        first = self.client.get(self.url)
+        self.assertNotIn("count", first.data)
+        self.assertIsNone(first.data["previous"])
+        second = self.client.get(first.data["next"])
+        self.assertIsNone(second.data["next"])
+        names = self.names(first) + self.names(second)
+        self.assertEqual(names, [f"Recipe {number:02}" for number in range(14, -1, -1)])
+        self.assertEqual(self.names(self.client.get(second.data["previous"])), self.names(first))
+
+    def test_rebuild_leaves_recipes_without_activity_unscored(self):
+        quiet = make_recipe(self.user, "Quiet")
+        busy = make_recipe(self.user, "Busy")
+        Rating.objects.create(recipe=busy, user=self.user, score=5)
+        Recipe.objects.update(trending_score=-1.0)
+        call_command("rebuild_trending_scores", stdout=StringIO())
+        self.assertIsNone(Recipe.objects.get(pk=quiet.pk).trending_score)
+        # Events are bucketed per hour, so up to an hour of decay is lost.
+        self.assertAlmostEqual(heat(Recipe.objects.get(pk=busy.pk).trending_score), 1.0, delta=0.03)
+
+
+# ─── Home feed ─────────────────────────────────────────────────────────────────
+
+@override_settings(FEED={"FANOUT_LIMIT": 2, "FANOUT_CHUNK_SIZE": 2, "BACKFILL": 2})
+class HomeFeedTests(RecipeTestCase):
+    def setUp(self):
+        super().setUp()
+        self.readers = [
+            User.objects.create_user(username=f"reader{number}", email=f"reader{number}@example.com")
+            for number in range(3)
+        ]
+
+    def publish(self, name):
+        with self.captureOnCommitCallbacks(execute=True):
+            recipe = make_recipe(self.user, name)
+            feed.publish(recipe)
+        return recipe
+
+    def toggle_follow(self, reader):
+        self.client.force_authenticate(reader)
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post(f"/api/v1/users/{self.user.username}/follow/")
+
+    def timeline(self, reader):
+        return set(FeedEntry.objects.filter(owner=reader).values_list("recipe__name", flat=True))
+
+    def read(self, reader):
+        self.client.force_authenticate(reader)
+        return [item["name"] for item in self.client.get("/api/v1/recipes/feed/").data["results"]]
+
+    def test_publishing_fans_out_to_followers_only(self):
+        for reader in self.readers[:2]:
+            self.toggle_follow(reader)
+        self.publish("Pizza")
+        self.assertEqual(self.timeline(self.readers[0]), {"Pizza"})
+        self.assertEqual(self.timeline(self.readers[2]), set())
+
+    def test_publishing_through_the_api_notifies_followers(self):
+        self.toggle_follow(self.readers[0])
+        recipe = make_recipe(self.user, "Pizza", is_published=False)
+        self.client.force_authenticate(self.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(f"/api/v1/recipes/{recipe.pk}/", {"is_published": True})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.timeline(self.readers[0]), {"Pizza"})
+        notification = Notification.objects.get(notification_type="recipe")
+        self.assertEqual((notification.recipient, notification.target_id), (self.readers[0], recipe.pk))
+        self.assertEqual(notification.verb, "published a new recipe 'Pizza'")
+
+    def test_follow_backfills_the_latest_recipes_and_unfollow_removes_them(self):
+        for name in ("Old", "Newer", "Newest"):
+            self.publish(name)
+        self.toggle_follow(self.readers[0])
+        self.assertEqual(self.timeline(self.readers[0]), {"Newer", "Newest"})
+        self.toggle_follow(self.readers[0])
+        self.assertEqual(self.timeline(self.readers[0]), set())
+
+    def test_authors_over_the_limit_are_pulled_with_their_whole_history(self):
+        self.toggle_follow(self.readers[0])
+        self.publish("Pushed")
+        for reader in self.readers[1:]:
+            self.toggle_follow(reader)
+        self.publish("Pulled")
+        # Pull mode: nothing new is pushed, the feed still has everything.
+        for reader in self.readers:
+            self.assertEqual(self.timeline(reader), {"Pushed"})
+        self.assertEqual(self.read(self.readers[0]), ["Pulled", "Pushed"])
+        self.assertEqual(self.read(self.readers[2]), ["Pulled", "Pushed"])
+
+    def test_dropping_back_under_the_limit_backfills_every_follower(self):
+        for reader in self.readers:
+            self.toggle_follow(reader)
+        self.publish("Pulled")
+        self.toggle_follow(self.readers[2])
+        for reader in self.readers[:2]:
+            self.assertEqual(self.timeline(reader), {"Pulled"})
+            self.assertEqual(self.read(reader), ["Pulled"])
+        self.assertEqual(self.timeline(self.readers[2]), set())
+
+    def test_reconciled_follower_count_crossing_the_limit_backfills(self):
+        self.toggle_follow(self.readers[0])
+        type(self.user).objects.filter(pk=self.user.pk).update(followers_count=10)
+        self.publish("Pulled")
+        self.assertEqual(self.timeline(self.readers[0]), set())
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command("reconcile_counters", stdout=StringIO())
+        self.assertEqual(self.timeline(self.readers[0]), {"Pulled"})
+
+
+# ─── Import ────────────────────────────────────────────────────────────────────
+
+def import_item(number, name, **fields):
+    return {
+        "id": number,
+        "name": name,
+        "ingredients": ["Flour", "Yeast"],
+        "instructions": ["Mix.", "Bake."],
+        "cuisine": "Italian",
+        "tags": ["Baking"],
+        "mealType": ["Dinner"],
+        "rating": 4.5,
+        "reviewCount": 2,
+        **fields,
+    }
+
+
+class ImportTestCase(RecipeTestCase):
+    def setUp(self):
+        super().setUp()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = Path(directory.name)
+
+    def write_file(self, name, items, json_lines=None):
+        path = self.directory / name
+        json_lines = name.endswith(".jsonl") if json_lines is None else json_lines
+        with open(path, "w", encoding="utf-8") as fh:
+            if json_lines:
+                fh.writelines(json.dumps(item) + "\n" for item in items)
+            else:
+                json.dump(items, fh)
+        return path
+
+    def seed(self, path, *args):
+        out = StringIO()
+        call_command("seed_recipes", "--file", str(path), *args, stdout=out)
+        return out.getvalue()
+
+    def imported(self):
+        return dict(Recipe.objects.values_list("name", "cuisine"))
+
+
+class RecipeImportTests(ImportTestCase):
+    def test_streams_arrays_objects_and_json_lines_alike(self):
+        items = [import_item(number, f"Bread {number}") for number in range(5)]
+        sources = [
+            self.write_file("array.json", items),
+            self.write_file("object.json", {"total": 5, "recipes": items, "limit": 5}),
+            self.write_file("lines.jsonl", items),
+        ]
+        for path in sources:
+            with self.subTest(path=path.name), mock.patch("apps.recipes.importer.READ_SIZE", 16):
+                self.assertEqual([item["name"] for item in read_records(path)], [item["name"] for item in items])
+
+    def test_links_tags_meal_types_and_search_in_chunks(self):
+        items = [import_item(number, f"Bread {number}", tags=["Baking", f"Tag {number % 2}"]) for number in range(5)]
+        output = self.seed(self.write_file("recipes.json", items), "--chunk-size", "2")
+        self.assertIn("5 recipe(s) created, 0 updated, 0 skipped", output)
+        self.assertIn("rows/s", output)
+
+        recipe = Recipe.objects.get(name="Bread 3")
+        self.assertEqual(set(recipe.tags.values_list("name", flat=True)), {"Baking", "Tag 1"})
+        self.assertEqual(list(recipe.meal_types.values_list("name", flat=True)), ["Dinner"])
+        self.assertEqual((recipe.ingredient_count, recipe.rating_sum, recipe.review_count), (2, 9, 2))
+        self.assertEqual(Tag.objects.count(), 3)
+        self.assertEqual(MealType.objects.count(), 1)
+        self.assertEqual(self.search("tag 1"), {"Bread 1", "Bread 3"})
+        self.assertEqual(RecipeSearchDocument.objects.count(), 5)
+        self.assertEqual(User.objects.get(username="seed_admin").recipes_count, 5)
+
+    def test_records_without_an_id_are_skipped_when_their_name_exists(self):
+        make_recipe(self.user, "Bread 0", cuisine="French")
+        items = [import_item(None, name) for name in ("Bread 0", "Bread 1", "Bread 1", "")]
+        output = self.seed(self.write_file("recipes.json", items))
+        self.assertIn("1 recipe(s) created, 0 updated, 3 skipped", output)
+        self.assertEqual(self.imported(), {"Bread 0": "French", "Bread 1": "Italian"})
+
+    def test_invalid_input_keeps_the_chunks_committed_before_it(self):
+        path = self.directory / "broken.jsonl"
+        lines = [json.dumps(import_item(number, f"Bread {number}")) for number in range(3)]
+        path.write_text("\n".join([*lines, "{not json"]) + "\n", encoding="utf-8")
+        with self.assertRaisesMessage(CommandError, "Invalid input after 0 record(s)"):
+            self.seed(path)
+        self.assertEqual(Recipe.objects.count(), 0)
+
+        path.write_text("[" + ",".join(lines) + ", {not json]", encoding="utf-8")
+        path = path.rename(self.directory / "broken.json")
+        with self.assertRaisesMessage(CommandError, "Invalid input after 2 record(s)"):
+            self.seed(path, "--chunk-size", "2")
+        self.assertEqual(set(self.imported()), {"Bread 0", "Bread 1"})
+
+
+class ParallelImportTests(ImportTestCase):
+    def setUp(self):
+        super().setUp()
+        self.items = [import_item(number, f"Bread {number}") for number in range(6)]
+        self.path = self.write_file("recipes.jsonl", self.items)
+        self.checkpoint = self.directory / "recipes.checkpoint"
+        # The byte offset just past the third line.
+        self.middle = sum(len(json.dumps(item)) + 1 for item in self.items[:3])
+
+    def test_ranges_end_on_line_breaks_and_come_back_in_file_order(self):
+        ranges = list(split_ranges(self.path, block_size=50))
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], self.path.stat().st_size)
+        self.assertTrue(all(end == start for (_, end), (start, _) in zip(ranges, ranges[1:])))
+
+        serial = list(parse_ranges(self.path, block_size=50))
+        parallel = list(parse_ranges(self.path, workers=2, block_size=50))
+        self.assertEqual(parallel, serial)
+        names = [record["fields"]["name"] for _, records, _ in parallel for record in records]
+        self.assertEqual(names, [item["name"] for item in self.items])
+
+    def test_resumes_from_the_checkpoint_with_its_totals(self):
+        Checkpoint(self.checkpoint, self.path).save(self.middle, {"created": 3, "updated": 0, "skipped": 0})
+        output = self.seed(self.path, "--checkpoint", str(self.checkpoint))
+        self.assertIn(f"Resuming at byte {self.middle} (3 record(s) done)", output)
+        self.assertIn("6 recipe(s) created", output)
+        self.assertEqual(set(self.imported()), {"Bread 3", "Bread 4", "Bread 5"})
+        self.assertFalse(self.checkpoint.exists())
+
+    def test_a_changed_input_starts_over(self):
+        Checkpoint(self.checkpoint, self.path).save(self.middle, {"created": 3, "updated": 0, "skipped": 0})
+        self.write_file("recipes.jsonl", [*self.items, import_item(6, "Bread 6")])
+        output = self.seed(self.path, "--checkpoint", str(self.checkpoint))
+        self.assertNotIn("Resuming", output)
+        self.assertEqual(len(self.imported()), 7)
+
+    def test_interrupted_import_saves_progress_after_each_committed_range(self):
+        importer = RecipeImporter(self.user, source="seed")
+        batches = parse_ranges(self.path, block_size=self.middle - 1)
+        checkpoint = Checkpoint(self.checkpoint, self.path)
+        write = RecipeImporter.write
+
+        def write_once(importer, records):
+            if importer.created:
+                raise RuntimeError("disk full")
+            return write(importer, records)
+
+        with mock.patch.object(RecipeImporter, "write", autospec=True, side_effect=write_once):
+            with self.assertRaises(RuntimeError):
+                importer.run_parsed(batches, checkpoint=checkpoint)
+        self.assertEqual(checkpoint.load(), (self.middle, {"created": 3, "updated": 0, "skipped": 0}))
+        self.assertEqual(set(self.imported()), {"Bread 0", "Bread 1", "Bread 2"})
+
+    def test_checkpoint_and_workers_need_json_lines(self):
+        path = self.write_file("recipes.json", self.items)
+        with self.assertRaisesMessage(CommandError, "need JSON Lines input"):
+            self.seed(path, "--workers", "2")
+
+
+class UpsertImportTests(ImportTestCase):
+    def setUp(self):
+        super().setUp()
+        self.items = [import_item(number, f"Bread {number}") for number in range(3)]
+        self.seed(self.write_file("recipes.json", self.items))
+        self.ids = dict(Recipe.objects.values_list("external_id", "pk"))
+
+    def test_only_changed_records_are_rewritten_in_place(self):
+        Recipe.objects.filter(name="Bread 1").update(description="Kept by the site")
+        adjust_recipe_counters(self.ids["1"], save_count=5)
+        untouched = dict(Recipe.objects.values_list("name", "updated_at"))
+        self.items[1].update(cuisine="French", tags=["Sourdough"])
+        output = self.seed(self.write_file("recipes.json", self.items))
+        self.assertIn("0 recipe(s) created, 1 updated, 2 skipped", output)
+        for name in ("Bread 0", "Bread 2"):
+            self.assertEqual(Recipe.objects.get(name=name).updated_at, untouched[name])
+
+        recipe = Recipe.objects.get(external_id="1")
+        self.assertEqual(recipe.pk, self.ids["1"])
+        self.assertEqual((recipe.cuisine, recipe.description, recipe.save_count), ("French", "Kept by the site", 5))
+        self.assertEqual(list(recipe.tags.values_list("name", flat=True)), ["Sourdough"])
+        self.assertEqual(self.search("sourdough"), {"Bread 1"})
+        self.assertEqual(self.search("kept"), {"Bread 1"})
+
+    def test_ids_are_matched_within_their_source(self):
+        output = self.seed(self.write_file("recipes.json", self.items[:1]), "--source", "partner")
+        self.assertIn("1 recipe(s) created", output)
+        self.assertEqual(Recipe.objects.filter(external_id="0").count(), 2)
+
+    def test_recipes_imported_before_external_ids_are_adopted_by_name(self):
+        Recipe.objects.update(external_source="", external_id=None, content_hash="")
+        output = self.seed(self.write_file("recipes.json", self.items))
+        self.assertIn("0 recipe(s) created, 3 updated", output)
+        self.assertEqual(dict(Recipe.objects.values_list("external_id", "pk")), self.ids)
+
+    def test_repeated_ids_in_a_chunk_write_their_last_copy(self):
+        items = [
+            import_item(1, "Bread 1", cuisine="French"),
+            import_item(1, "Bread 1", cuisine="Greek"),
+            import_item(7, "Bread 7", cuisine="French"),
+            import_item(7, "Bread 7", cuisine="Greek"),
+        ]
+        output = self.seed(self.write_file("recipes.json", items))
+        self.assertIn("1 recipe(s) created, 1 updated, 2 skipped", output)
+        self.assertEqual(self.imported()["Bread 1"], "Greek")
+        self.assertEqual(self.imported()["Bread 7"], "Greek")
+        self.assertEqual(Recipe.objects.get(external_id="1").pk, self.ids["1"])
+        self.assertEqual(Recipe.objects.filter(external_id="7").count(), 1)
+
+
+# ─── Export ────────────────────────────────────────────────────────────────────
+
+class RecipeExportTests(ImportTestCase):
+    def setUp(self):
+        super().setUp()
+        self.site = make_recipe(self.user, "Site bread", cuisine="French", is_published=True)
+        # An imported id equal to the site recipe's primary key.
+        self.seed(self.write_file("recipes.json", [import_item(self.site.pk, "Seed bread")]))
+        partner = self.write_file("partner.json", [import_item(self.site.pk, "Partner bread")])
+        self.seed(partner, "--source", "partner")
+
+    def export(self, *args):
+        path = self.directory / "export.jsonl"
+        call_command("export_recipes", "--output", str(path), *args, stdout=StringIO(), stderr=StringIO())
+        return path
+
+    def test_ids_are_qualified_by_their_source(self):
+        records = list(read_records(self.export()))
+        keys = {record["name"]: (record["source"], str(record["id"])) for record in records}
+        self.assertEqual(keys, {
+            "Site bread": (SITE_SOURCE, str(self.site.pk)),
+            "Seed bread": ("seed", str(self.site.pk)),
+            "Partner bread": ("partner", str(self.site.pk)),
+        })
+
+    def test_an_export_round_trips_through_seed_recipes(self):
+        path = self.export()
+        before = {recipe.name: (recipe.cuisine, sorted(recipe.tags.values_list("name", flat=True)))
+                  for recipe in Recipe.objects.all()}
+        Recipe.objects.all().delete()
+
+        self.assertIn("3 recipe(s) created, 0 updated, 0 skipped", self.seed(path))
+        after = {recipe.name: (recipe.cuisine, sorted(recipe.tags.values_list("name", flat=True)))
+                 for recipe in Recipe.objects.all()}
+        self.assertEqual(after, before)
+        self.assertEqual(Recipe.objects.get(name="Site bread").external_source, SITE_SOURCE)
+
+        self.assertIn("0 recipe(s) created, 0 updated, 3 skipped", self.seed(path))
+        lines = path.read_text(encoding="utf-8").splitlines()
+        record = json.loads(lines[0])
+        record["cuisine"] = "Greek"
+        path.write_text("\n".join([json.dumps(record), *lines[1:]]) + "\n", encoding="utf-8")
+        self.assertIn("0 recipe(s) created, 1 updated, 2 skipped", self.seed(path))
+        self.assertEqual(Recipe.objects.get(name=record["name"]).cuisine, "Greek")
+
+    def test_endpoint_streams_csv_to_admins_only(self):
+        self.client.force_authenticate(self.user)
+        self.assertEqual(self.client.get("/api/v1/recipes/export/").status_code, 403)
+
+        admin = User.objects.create_user(username="admin", email="admin@example.com", is_staff=True)
+        self.client.force_authenticate(admin)
+        response = self.client.get("/api/v1/recipes/export/", {"output": "csv"})
+        self.assertEqual(response.status_code, 200)
+        lines = b"".join(response.streaming_content).decode().splitlines()
+        self.assertTrue(lines[0].startswith("source,id,name,"))
+        self.assertEqual(len(lines), 4)
+
+
+# ─── Facets ────────────────────────────────────────────────────────────────────
+
+class RecipeFacetTests(RecipeTestCase):
+    def setUp(self):
+        super().setUp()
+        facets._index = None
+        self.addCleanup(setattr, facets, "_index", None)
+        self.pasta, self.soup = Tag.objects.create(name="Pasta"), Tag.objects.create(name="Soup")
+        dinner = MealType.objects.create(name="Dinner")
+        self.recipes = {
+            name: make_recipe(self.user, name, cuisine=cuisine, difficulty=difficulty,
+                              calories_per_serving=calories, is_published=True)
+            for name, cuisine, difficulty, calories in (
+                ("Carbonara", "Italian", "Medium", 650),
+                ("Minestrone", "Italian", "Easy", 250),
+                ("Pho", "Vietnamese", "Hard", 450),
+            )
+        }
+        self.recipes["Carbonara"].tags.add(self.pasta)
+        self.recipes["Minestrone"].tags.add(self.soup)
+        self.recipes["Pho"].tags.add(self.soup)
+        self.recipes["Carbonara"].meal_types.add(dinner)
+        # Authenticated reads skip the response cache.
+        self.client.force_authenticate(self.user)
+
+    def counts(self, **params):
+        response = self.client.get("/api/v1/recipes/facets/", params)
+        self.assertEqual(response.status_code, 200)
+        return response.data["count"], {
+            dimension: {item["value"]: item["count"] for item in values}
+            for dimension, values in response.data["facets"].items()
+        }
+
+    def test_each_dimension_is_counted_without_its_own_filter(self):
+        count, counts = self.counts(cuisine="italian", tag="Soup")
+        self.assertEqual(count, 1)
+        self.assertEqual(counts["cuisine"], {"Italian": 1, "Vietnamese": 1})
+        self.assertEqual(counts["tag"], {"Pasta": 1, "Soup": 1})
+        self.assertEqual(counts["difficulty"], {"Easy": 1})
+        self.assertEqual(counts["calories"], {"0-299": 1})
+        self.assertEqual(counts["meal_type"], {})
+
+        count, counts = self.counts(min_calories=300, max_calories=699, search="pho")
+        self.assertEqual((count, counts["cuisine"], counts["calories"]), (1, {"Vietnamese": 1}, {"300-499": 1}))
+
+    def test_changes_are_replayed_without_a_rebuild(self):
+        self.counts()
+        index = facets.get_index()
+        carbonara, pho = self.recipes["Carbonara"], self.recipes["Pho"]
+        carbonara.cuisine = "Roman"
+        carbonara.calories_per_serving = 800
+        carbonara.save()
+        carbonara.tags.add(self.soup)
+        pho.is_published = False
+        pho.save()
+        self.recipes["Minestrone"].delete()
+        self.soup.name = "Soups"
+        self.soup.save()
+
+        count, counts = self.counts()
+        self.assertIs(facets.get_index(), index)
+        self.assertEqual(count, 1)
+        self.assertEqual(counts["cuisine"], {"Roman": 1})
+        self.assertEqual(counts["tag"], {"Pasta": 1, "Soups": 1})
+        self.assertEqual(counts["calories"], {"700+": 1})
+
+    def test_changes_logged_by_another_process_are_read_from_the_database(self):
+        index = facets.get_index()
+        # An update without signals, logged the way another process would.
+        Recipe.objects.filter(pk=self.recipes["Pho"].pk).update(cuisine="Thai")
+        facets.mark_changed(self.recipes["Pho"].pk)
+        cache.clear()
+        self.assertEqual(self.counts()[1]["cuisine"], {"Italian": 2, "Thai": 1})
+        self.assertIs(facets.get_index(), index)
+
+    def test_a_change_committed_out_of_order_is_still_replayed(self):
+        index = facets.get_index()
+        first = FacetChange.objects.create(recipe_ids=[]).pk
+        facets.mark_changed(self.recipes["Minestrone"].pk)
+        # The first id is still in an open transaction while the second is read.
+        FacetChange.objects.filter(pk=first).delete()
+        index.sync()
+        self.assertIn(first, index.gaps)
+
+        Recipe.objects.filter(pk=self.recipes["Pho"].pk).update(cuisine="Thai")
+        FacetChange.objects.create(pk=first, recipe_ids=[self.recipes["Pho"].pk])
+        self.assertEqual(self.counts()[1]["cuisine"], {"Italian": 2, "Thai": 1})
+        self.assertEqual(index.gaps, {})
+
+    @override_settings(RECIPE_FACETS={"MAX_LAG": 2})
+    def test_lagging_or_stale_indexes_are_rebuilt(self):
+        index = facets.get_index()
+        facets.mark_changed(1)
+        self.assertIs(facets.get_index(), index)
+        for _ in range(3):
+            facets.mark_changed(1)
+        rebuilt = facets.get_index()
+        self.assertIsNot(rebuilt, index)
+
+        rebuilt.synced_at -= timedelta(days=2)
+        self.assertIsNot(facets.get_index(), rebuilt)
+
+    def test_filters_matching_many_recipes_are_counted_by_the_database(self):
+        for params in (
+            {"search": "i"},
+            {"author": "cook", "tag": "soup"},
+            {"min_calories": 100, "difficulty": "Easy"},
+        ):
+            with self.subTest(params=params):
+                expected = self.counts(**params)
+                with override_settings(RECIPE_FACETS={"MAX_MATCHES": 1}), \
+                        mock.patch.object(facets.FacetIndex, "counts") as index_counts:
+                    self.assertEqual(self.counts(**params), expected)
+                index_counts.assert_not_called()
+
+    def test_bitmaps_only_store_the_blocks_they_use(self):
+        bitmap = facets.Bitmap.of([3, 5, 200_000])
+        self.assertEqual(sorted(bitmap.blocks), [0, 3])
+        self.assertEqual(bitmap.bit_count(), 3)
+        self.assertIn(200_000, bitmap)
+        rest = bitmap - facets.Bitmap.of([200_000])
+        self.assertEqual((sorted(rest.blocks), bitmap.bit_count()), ([0], 3))
+        self.assertEqual((bitmap & facets.Bitmap.of([5, 70_000])).blocks, {0: 1 << 5})
+        self.assertEqual(bitmap.intersection_count(facets.Bitmap.of([3, 200_000, 200_001])), 2)
+
+    def test_prune_deletes_expired_changes(self):
+        FacetChange.objects.all().delete()
+        facets.mark_changed(1)
+        FacetChange.objects.update(created_at=timezone.now() - timedelta(days=2))
+        facets.mark_changed(2)
+        out = StringIO()
+        call_command("prune_facet_changes", stdout=out)
+        self.assertIn("Deleted 1 facet change(s).", out.getvalue())
+        self.assertEqual(list(FacetChange.objects.values_list("recipe_ids", flat=True)), [[2]])
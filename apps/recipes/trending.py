@@ -0,0 +1,81 @@
+"""
+Exponentially decaying "trending" score.
+
+Every interaction adds a weight ``w`` that halves every ``HALF_LIFE_HOURS``.
+Rather than decaying every recipe over time, each event is scaled *up* to a
+fixed epoch: an event at time ``t`` contributes ``w · 2^((t − EPOCH) / h)``.
+Newer events are worth exponentially more, which orders recipes exactly as
+decaying all scores to "now" would, and old scores never need touching.
+
+To keep the numbers finite forever, ``Recipe.trending_score`` stores the
+natural log of that sum and each event is folded in with a single
+``log-add-exp`` UPDATE:
+
+    score ← max(score, e) + ln(1 + exp(−|score − e|)),  e = ln w + (t − EPOCH)·ln 2 / h
+
+so the trending list is a plain index read on ``(is_published, -trending_score)``.
+The score is NULL (not 0, which is a legitimate log) until the first event;
+such recipes are left out of the trending list.
+"""
+
+import math
+from datetime import datetime, timezone as dt_timezone
+
+from django.conf import settings
+from django.db.models import F, FloatField, Value
+from django.db.models.functions import Abs, Coalesce, Exp, Greatest, Ln
+from django.utils import timezone
+
+EPOCH = datetime(2026, 1, 1, tzinfo=dt_timezone.utc)
+
+DEFAULTS = {
+    "HALF_LIFE_HOURS": 24.0,
+    "WEIGHTS": {
+        "rating": 1.0,
+        "comment": 2.0,
+        "save": 3.0,
+        "share": 4.0,
+    },
+}
+
+
+def _config() -> dict:
+    return {**DEFAULTS, **getattr(settings, "TRENDING", {})}
+
+
+def event_exponent(weight: float, at=None) -> float:
+    """``ln(weight)`` plus the growth of an event at ``at`` relative to the epoch."""
+    at = at or timezone.now()
+    hours = (at - EPOCH).total_seconds() / 3600
+    return math.log(weight) + hours * math.log(2) / _config()["HALF_LIFE_HOURS"]
+
+
+def weight_of(events: dict) -> float:
+    """Total weight of ``{"save": 2, "share": 1, …}``."""
+    weights = _config()["WEIGHTS"]
+    return sum(weights[kind] * count for kind, count in events.items())
+
+
+def trending_update(weight: float, at=None):
+    """Expression adding ``weight`` (at time ``at``) to ``trending_score``."""
+    current = F("trending_score")
+    event = Value(event_exponent(weight, at), output_field=FloatField())
+    # The log-add-exp is NULL while the score is (no events yet): start from the event.
+    return Coalesce(Greatest(current, event) + Ln(Value(1.0) + Exp(-Abs(current - event))), event)
+
+
+def combine(score: float | None, weight: float, at=None) -> float:
+    """Python equivalent of ``trending_update`` (for rebuilds)."""
+    event = event_exponent(weight, at)
+    if score is None:
+        return event
+    return max(score, event) + math.log1p(math.exp(-abs(score - event)))
+
+
+def heat(score: float | None, now=None) -> float:
+    """Current decayed activity (weighted events, halved per half-life) from a stored score."""
+    if score is None:
+        return 0.0
+    now = now or timezone.now()
+    hours = (now - EPOCH).total_seconds() / 3600
+    return math.exp(score - hours * math.log(2) / _config()["HALF_LIFE_HOURS"])
@@ -2,9 +2,14 @@ from django.urls import path
 
 from .views import (
     CuisineListView,
+    HomeFeedView,
     MealTypeListView,
+    RecipeExportView,
+    RecipeFacetView,
+    RecipeByIngredientsView,
     RecipeDetailView,
     RecipeListCreateView,
+    TrendingRecipeListView,
     TagListView,
     UserRecipeListView,
 )
@@ -13,7 +18,12 @@ urlpatterns = [
     path("", RecipeListCreateView.as_view(), name="recipe-list"),
     path("tags/", TagListView.as_view(), name="tag-list"),
     path("meal-types/", MealTypeListView.as_view(), name="meal-type-list"),
+    path("facets/", RecipeFacetView.as_view(), name="recipe-facets"),
     path("cuisines/", CuisineListView.as_view(), name="cuisine-list"),
+    path("feed/", HomeFeedView.as_view(), name="recipe-feed"),
+    path("trending/", TrendingRecipeListView.as_view(), name="recipe-trending"),
+    path("cook-with/", RecipeByIngredientsView.as_view(), name="recipe-cook-with"),
+    path("export/", RecipeExportView.as_view(), name="recipe-export"),
     path("by/<str:username>/", UserRecipeListView.as_view(), name="user-recipe-list"),
     path("<int:pk>/", RecipeDetailView.as_view(), name="recipe-detail"),
 ]
\ No newline at end of file
@@ -1,18 +1,34 @@
+from collections import OrderedDict
+
 from django.db.models import Q
 from django.contrib.auth import get_user_model
+from django.http import StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from drf_spectacular.utils import extend_schema
-from rest_framework import generics, permissions, status
+from django_filters.rest_framework import DjangoFilterBackend
+from drf_spectacular.utils import OpenApiParameter, extend_schema, inline_serializer
+from rest_framework import filters, generics, permissions, serializers, status
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
 from rest_framework.views import APIView
 
-from .filters import RecipeFilter
+from apps.core.pagination import KeysetPagination, decode_cursor, encode_cursor
+from apps.notifications.services import notify_followers
+from apps.users.services import adjust_user_counters
+
+from . import exporter, facets, feed
+from .cache import COUNTERS, RECIPES, TAXONOMY, CachedResponseMixin, recipe_namespace
+from .filters import RecipeFilter, RecipeSearchFilter
+from .ingredients import rank_by_pantry
 from .models import MealType, Recipe, Tag
 from .permissions import IsAuthorOrReadOnly
 from .serializers import (
     MealTypeSerializer,
     RecipeDetailSerializer,
     RecipeListSerializer,
+    RecipePantryMatchSerializer,
+    RecipeTrendingSerializer,
     TagSerializer,
 )
 
@@ -21,17 +37,19 @@ User = get_user_model()
 
 # ─── Tag & MealType ────────────────────────────────────────────────────────────
 
-class TagListView(generics.ListCreateAPIView):
+class TagListView(CachedResponseMixin, generics.ListCreateAPIView):
     """GET /api/v1/recipes/tags/ — list all tags (authenticated to create)."""
 
+    cache_dependencies = [TAXONOMY]
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
 
 
-class MealTypeListView(generics.ListCreateAPIView):
+class MealTypeListView(CachedResponseMixin, generics.ListCreateAPIView):
     """GET /api/v1/recipes/meal-types/"""
 
+    cache_dependencies = [TAXONOMY]
     queryset = MealType.objects.all()
     serializer_class = MealTypeSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
@@ -39,13 +57,25 @@ class MealTypeListView(generics.ListCreateAPIView):
 
 # ─── Recipe CRUD ───────────────────────────────────────────────────────────────
 
-class RecipeListCreateView(generics.ListCreateAPIView):
+def publish(recipe) -> None:
+    """Push a newly published recipe to its author's followers: timelines and a notification."""
+    feed.publish(recipe)
+    notify_followers(
+        recipe.author,
+        verb=f"published a new recipe '{recipe.name}'",
+        notification_type="recipe",
+        target_id=recipe.pk,
+    )
+
+
+class RecipeListCreateView(CachedResponseMixin, generics.ListCreateAPIView):
     """
     GET  /api/v1/recipes/         — paginated, filterable recipe list.
     POST /api/v1/recipes/         — create a new recipe (auth required).
 
     Query params:
-        search=<term>             full-text across name, cuisine, ingredients
+        search=<term>             full-text across name, description, cuisine,
+                                  tags, meal types and ingredients
         cuisine=Italian
         difficulty=Easy|Medium|Hard
         min_calories / max_calories
@@ -58,17 +88,39 @@ class RecipeListCreateView(generics.ListCreateAPIView):
     """
 
     permission_classes = [permissions.IsAuthenticatedOrReadOnly]
+    filter_backends = [DjangoFilterBackend, RecipeSearchFilter, filters.OrderingFilter]
     filterset_class = RecipeFilter
-    search_fields = ["name", "description", "cuisine", "tags__name", "meal_types__name"]
-    ordering_fields = ["rating", "created_at", "prep_time_minutes", "cook_time_minutes", "calories_per_serving"]
+    ordering_fields = [
+        "rating",
+        "created_at",
+        "prep_time_minutes",
+        "cook_time_minutes",
+        "calories_per_serving",
+        "comment_count",
+        "save_count",
+        "share_count",
+    ]
     ordering = ["-created_at"]
+    cache_dependencies = [RECIPES, TAXONOMY]
+    cache_recipe_members = True
+    # Orderings that move whenever someone rates, comments, saves or shares.
+    COUNTER_ORDERINGS = {"rating", "comment_count", "save_count", "share_count"}
+
+    def get_cache_dependencies(self):
+        dependencies = super().get_cache_dependencies()
+        ordering = {
+            name.strip().lstrip("-")
+            for name in self.request.query_params.get(api_settings.ORDERING_PARAM, "").split(",")
+        }
+        if ordering & self.COUNTER_ORDERINGS or self.request.query_params.get("min_rating"):
+            dependencies.append(COUNTERS)
+        return dependencies
 
     def get_queryset(self):
         return (
             Recipe.objects.filter(is_published=True)
             .select_related("author")
             .prefetch_related("tags", "meal_types")
-            .distinct()
         )
 
     def get_serializer_class(self):
@@ -78,32 +130,177 @@ class RecipeListCreateView(generics.ListCreateAPIView):
 
     def perform_create(self, serializer):
         recipe = serializer.save(author=self.request.user)
-        # Update author's recipe counter
-        User.objects.filter(pk=self.request.user.pk).update(
-            recipes_count=self.request.user.recipes_count + 1
-        )
+        adjust_user_counters(self.request.user.pk, recipes_count=1)
+        if recipe.is_published:
+            publish(recipe)
         return recipe
 
 
-class RecipeDetailView(generics.RetrieveUpdateDestroyAPIView):
+class RecipeDetailView(CachedResponseMixin, generics.RetrieveUpdateDestroyAPIView):
     """GET / PUT / PATCH / DELETE /api/v1/recipes/<id>/"""
 
     serializer_class = RecipeDetailSerializer
     permission_classes = [permissions.IsAuthenticatedOrReadOnly, IsAuthorOrReadOnly]
 
+    def get_cache_dependencies(self):
+        return [recipe_namespace(self.kwargs["pk"]), TAXONOMY]
+
     def get_queryset(self):
         return (
             Recipe.objects.select_related("author")
             .prefetch_related("tags", "meal_types")
         )
 
+    def perform_update(self, serializer):
+        was_published = serializer.instance.is_published
+        recipe = serializer.save()
+        if recipe.is_published and not was_published:
+            publish(recipe)
+
     def perform_destroy(self, instance):
-        author = instance.author
+        author_id = instance.author_id
         instance.delete()
-        User.objects.filter(pk=author.pk).update(
-            recipes_count=max(0, author.recipes_count - 1)
+        adjust_user_counters(author_id, recipes_count=-1)
+
+
+# ─── Trending ──────────────────────────────────────────────────────────────────
+
+class TrendingPagination(KeysetPagination):
+    # Recipes without a score are filtered out, so the index order is used as is.
+    non_null_fields = ("trending_score",)
+
+
+class TrendingRecipeListView(CachedResponseMixin, generics.ListAPIView):
+    """
+    GET /api/v1/recipes/trending/ — published recipes with any activity, by
+    decayed recent activity (ratings, comments, saves, shares; see
+    ``apps.recipes.trending``).  Accepts the recipe list filters; the ranking
+    itself is an index read, paged by cursor (follow ``next``) without a COUNT.
+    """
+
+    serializer_class = RecipeTrendingSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = TrendingPagination
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = RecipeFilter
+    # Scores move with every interaction: a page is refreshed when one of its
+    # recipes changes, but the ranking may be up to TIMEOUT stale.
+    cache_dependencies = [TAXONOMY]
+    cache_recipe_members = True
+
+    def get_queryset(self):
+        return (
+            Recipe.objects.filter(is_published=True, trending_score__isnull=False)
+            .select_related("author")
+            .prefetch_related("tags", "meal_types")
+            .order_by("-trending_score", "-pk")
+        )
+
+
+# ─── Home feed ─────────────────────────────────────────────────────────────────
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter(
+            "cursor",
+            str,
+            required=False,
+            description="Opaque cursor from the previous page's `next` link.",
+        ),
+        OpenApiParameter("page_size", int, required=False, description="Recipes per page (max 100)."),
+    ],
+)
+class HomeFeedView(generics.ListAPIView):
+    """
+    GET /api/v1/recipes/feed/ — newest published recipes from the people the
+    current user follows, read from their precomputed timeline (see
+    ``apps.recipes.feed``).  Cursor-paginated; follow the ``next`` link.
+    """
+
+    serializer_class = RecipeListSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = None
+    max_page_size = 100
+
+    def get_queryset(self):
+        return Recipe.objects.none()
+
+    def list(self, request, *args, **kwargs):
+        page_size = api_settings.PAGE_SIZE
+        raw_size = request.query_params.get("page_size")
+        if raw_size:
+            try:
+                page_size = min(max(int(raw_size), 1), self.max_page_size)
+            except ValueError:
+                raise ValidationError({"page_size": "Must be an integer."})
+
+        position = None
+        raw_cursor = request.query_params.get("cursor")
+        if raw_cursor:
+            position = feed.decode_position(decode_cursor(raw_cursor))
+            if position is None:
+                raise NotFound("Invalid cursor.")
+
+        recipes, has_more = feed.read_feed(request.user, page_size, position)
+        next_link = None
+        if has_more:
+            next_link = replace_query_param(
+                request.build_absolute_uri(), "cursor", encode_cursor(feed.encode_position(recipes[-1]))
+            )
+        return Response(OrderedDict([
+            ("next", next_link),
+            ("results", self.get_serializer(recipes, many=True).data),
+        ]))
+
+
+# ─── Ingredient search ─────────────────────────────────────────────────────────
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter(
+            "ingredients",
+            str,
+            required=True,
+            description="Comma-separated ingredients you have, e.g. chicken,rice,garlic",
+        ),
+    ],
+)
+class RecipeByIngredientsView(generics.ListAPIView):
+    """
+    GET /api/v1/recipes/cook-with/?ingredients=chicken,rice,garlic
+
+    Recipes ranked by how much of their ingredient list you already have
+    (``coverage``), then by number of matched ingredients.  Salt, pepper and
+    water are assumed.  Accepts the same filters as the recipe list; only the
+    best ``PANTRY_SEARCH_MAX_RESULTS`` matches are listed.
+    """
+
+    serializer_class = RecipePantryMatchSerializer
+    permission_classes = [permissions.AllowAny]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = RecipeFilter
+
+    def get_queryset(self):
+        if getattr(self, "swagger_fake_view", False):
+            return Recipe.objects.none()
+        return (
+            Recipe.objects.filter(is_published=True)
+            .select_related("author")
+            .prefetch_related("tags", "meal_types")
         )
 
+    def filter_queryset(self, queryset):
+        terms = [
+            term.strip()
+            for value in self.request.query_params.getlist("ingredients")
+            for term in value.split(",")
+            if term.strip()
+        ]
+        if not terms:
+            raise ValidationError({"ingredients": "Provide at least one ingredient."})
+        # Rank after filtering, so the best matches are picked among the filtered recipes.
+        return rank_by_pantry(super().filter_queryset(queryset), terms)
+
 
 # ─── User recipe list ──────────────────────────────────────────────────────────
 
@@ -124,23 +321,185 @@ class UserRecipeListView(generics.ListAPIView):
         )
 
 
+# ─── Export ────────────────────────────────────────────────────────────────────
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter("output", str, enum=sorted(exporter.FORMATS), description="jsonl (default) or csv"),
+        OpenApiParameter("include_unpublished", bool),
+    ],
+    responses={(200, "application/x-ndjson"): {"type": "string"}, (200, "text/csv"): {"type": "string"}},
+    description="Stream the whole catalogue in the schema seed_recipes reads. Admin only.",
+)
+class RecipeExportView(APIView):
+    """
+    GET /api/v1/recipes/export/
+        ?output=jsonl|csv         — default jsonl
+        ?include_unpublished=true — export drafts too
+
+    Streamed row by row from a database iterator; admin only.
+    """
+
+    permission_classes = [permissions.IsAdminUser]
+
+    def get(self, request):
+        output_format = request.query_params.get("output", "jsonl")
+        if output_format not in exporter.FORMATS:
+            raise ValidationError({"output": f"Choose one of: {', '.join(sorted(exporter.FORMATS))}."})
+        queryset = exporter.export_queryset(
+            include_unpublished=request.query_params.get("include_unpublished") == "true"
+        )
+        response = StreamingHttpResponse(
+            exporter.render(exporter.export_records(queryset), output_format),
+            content_type=exporter.FORMATS[output_format],
+        )
+        response["Content-Disposition"] = f'attachment; filename="recipes.{output_format}"'
+        return response
+
+
+# ─── Facets ────────────────────────────────────────────────────────────────────
+
+@extend_schema(
+    parameters=[
+        OpenApiParameter("search", str),
+        OpenApiParameter("cuisine", str),
+        OpenApiParameter("difficulty", str, enum=[value for value, _ in Recipe.DIFFICULTY_CHOICES]),
+        OpenApiParameter("min_calories", int),
+        OpenApiParameter("max_calories", int),
+        OpenApiParameter("max_time", int),
+        OpenApiParameter("meal_type", str),
+        OpenApiParameter("tag", str),
+        OpenApiParameter("min_rating", float),
+        OpenApiParameter("author", str),
+    ],
+    responses={200: inline_serializer("RecipeFacets", fields={
+        "count": serializers.IntegerField(),
+        "facets": serializers.DictField(child=serializers.ListField(child=serializers.DictField())),
+    })},
+    description=(
+        "Counts of published recipes per cuisine, difficulty, meal type, tag and calorie band "
+        "under the given recipe-list filters. Each dimension ignores its own filter."
+    ),
+)
+class RecipeFacetView(CachedResponseMixin, generics.GenericAPIView):
+    """
+    GET /api/v1/recipes/facets/ — takes the recipe list's filters and search.
+
+    Cuisine, difficulty, meal type, tag and calorie bands (min/max_calories
+    on band edges) are answered from the in-memory facet index.  Any other
+    calorie range, search and the remaining filters cost one id query each,
+    unless one matches more than ``MAX_MATCHES`` recipes: then every count
+    is a ``GROUP BY`` query instead.
+    """
+
+    permission_classes = [permissions.AllowAny]
+    pagination_class = None
+    filter_backends = []
+    cache_dependencies = [RECIPES, TAXONOMY]
+    # Filters answered by the database rather than the facet index.
+    QUERY_PARAMS = ("max_time", "min_rating", "author")
+    # The query params of each dimension's own filter.
+    DIMENSION_PARAMS = {
+        "cuisine": ("cuisine",),
+        "difficulty": ("difficulty",),
+        "meal_type": ("meal_type",),
+        "tag": ("tag",),
+        "calories": ("min_calories", "max_calories"),
+    }
+
+    def get_cache_dependencies(self):
+        dependencies = super().get_cache_dependencies()
+        if self.request.query_params.get("min_rating"):
+            dependencies.append(COUNTERS)
+        return dependencies
+
+    def filtered(self, names=None, search=True):
+        """Published recipes under the query params in ``names`` (default all) and the search."""
+        params = self.request.query_params
+        names = [name for name in RecipeFilter.Meta.fields if name in params and (names is None or name in names)]
+        queryset = RecipeFilter({name: params[name] for name in names}, queryset=self.published).qs
+        return RecipeSearchFilter().filter_queryset(self.request, queryset, self) if search else queryset
+
+    def index_counts(self, cleaned):
+        """The counts from the facet index, or ``None`` if a filter matches too many recipes."""
+        index = facets.get_index()
+        selected = {}
+        for dimension in ("cuisine", "difficulty", "meal_type", "tag"):
+            if value := cleaned.get(dimension):
+                key = value if dimension == "difficulty" else value.lower()
+                selected[dimension] = index.bitmaps[dimension].get(key, facets.Bitmap())
+
+        minimum, maximum = cleaned.get("min_calories"), cleaned.get("max_calories")
+        if minimum is not None or maximum is not None:
+            bands = facets.calorie_bands(minimum, maximum)
+            if bands is None:
+                in_range = self.filtered(["min_calories", "max_calories"], search=False)
+                selected["calories"] = facets.matching(in_range)
+                if selected["calories"] is None:
+                    return None
+            else:
+                selected["calories"] = facets.Bitmap()
+                for band in bands:
+                    selected["calories"].update(index.bitmaps["calories"].get(band, facets.Bitmap()))
+
+        restrict = None
+        query_params = [name for name in self.QUERY_PARAMS if cleaned.get(name) not in (None, "")]
+        if query_params or self.request.query_params.get(api_settings.SEARCH_PARAM):
+            restrict = facets.matching(self.filtered(query_params))
+            if restrict is None:
+                return None
+        return index.counts(selected, restrict)
+
+    def get(self, request):
+        self.published = Recipe.objects.filter(is_published=True)
+        filterset = RecipeFilter(request.query_params, queryset=self.published)
+        if not filterset.is_valid():
+            raise ValidationError(filterset.errors)
+        result = self.index_counts(filterset.form.cleaned_data)
+        if result is None:
+            result = facets.query_counts(self.filtered(), {
+                dimension: self.filtered([name for name in RecipeFilter.Meta.fields if name not in own])
+                for dimension, own in self.DIMENSION_PARAMS.items()
+            })
+        order = {
+            "difficulty": [value for value, _ in Recipe.DIFFICULTY_CHOICES],
+            "calories": [value for value, _, _ in facets.CALORIE_BANDS],
+        }
+        body = {}
+        for dimension, values in result["facets"].items():
+            if dimension in order:
+                values.sort(key=lambda value: order[dimension].index(value[1]))
+            else:
+                values.sort(key=lambda value: (-value[2], value[0].lower()))
+            body[dimension] = [{"value": label, "count": count} for label, _, count in values]
+        bands = {value: (lowest, highest) for value, lowest, highest in facets.CALORIE_BANDS}
+        for item in body["calories"]:
+            item["min_calories"], item["max_calories"] = bands[item["value"]]
+        return Response({"count": result["count"], "facets": body})
+
+
 # ─── Cuisine & Tag exploration ─────────────────────────────────────────────────
 
 @extend_schema(
     responses={200: {"type": "array", "items": {"type": "string"}, "example": ["Italian", "Mexican", "Indian"]}},
     description="Return a sorted list of all distinct cuisine values from published recipes.",
 )
-class CuisineListView(APIView):
+class CuisineListView(CachedResponseMixin, generics.ListAPIView):
     """GET /api/v1/recipes/cuisines/ — distinct cuisine values."""
 
     permission_classes = [permissions.AllowAny]
+    pagination_class = None
+    filter_backends = []
+    cache_dependencies = [RECIPES]
 
-    def get(self, request):
-        cuisines = (
+    def get_queryset(self):
+        return (
             Recipe.objects.filter(is_published=True)
             .exclude(cuisine="")
             .values_list("cuisine", flat=True)
             .distinct()
             .order_by("cuisine")
         )
-        return Response(list(cuisines))
\ No newline at end of file
+
+    def list(self, request, *args, **kwargs):
+        return Response(list(self.get_queryset()))
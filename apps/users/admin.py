@@ -13,6 +13,8 @@ class UserAdmin(BaseUserAdmin):
         ("Profile", {"fields": ("bio", "avatar", "website", "dietary_preferences")}),
         ("Stats", {"fields": ("followers_count", "following_count", "recipes_count")}),
     )
+    # Saves never write the counters (see User.save); repair them with reconcile_counters.
+    readonly_fields = ("followers_count", "following_count", "recipes_count")
 
 @admin.register(Follow)
 class FollowAdmin(admin.ModelAdmin):
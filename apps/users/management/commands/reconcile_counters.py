@@ -0,0 +1,105 @@
+"""
+Usage:
+    python manage.py reconcile_counters
+    python manage.py reconcile_counters --user 12 --user 40
+
+Repairs the followers / following / recipes counters on User.  An author
+whose repaired follower count drops back under the feed's fan-out limit has
+their followers' timelines back-filled.
+"""
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from apps.recipes import feed
+from apps.recipes.models import Recipe
+from apps.users.models import Follow
+from apps.users.services import adjust_user_counters
+
+User = get_user_model()
+
+# Counter field → (model whose rows it counts, foreign key to the user).
+COUNTERS = {
+    "followers_count": (Follow, "following"),
+    "following_count": (Follow, "follower"),
+    "recipes_count": (Recipe, "author"),
+}
+
+
+def _count(model, field):
+    return Coalesce(
+        Subquery(
+            model.objects.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(value=Count("pk"))
+            .values("value"),
+            output_field=IntegerField(),
+        ),
+        Value(0),
+    )
+
+
+class Command(BaseCommand):
+    help = "Repair drift in the denormalised follower, following and recipe counters of users"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--user",
+            type=int,
+            action="append",
+            default=[],
+            help="Only reconcile this user id (repeatable)",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=1000,
+            help="Number of users repaired per transaction",
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.all()
+        if options["user"]:
+            users = users.filter(pk__in=options["user"])
+
+        annotations = {f"true_{field}": _count(model, fk) for field, (model, fk) in COUNTERS.items()}
+        drift = Q()
+        for field in COUNTERS:
+            drift |= ~Q(**{field: F(f"true_{field}")})
+        drifted = (
+            users.annotate(**annotations)
+            .filter(drift)
+            .order_by("pk")
+            .values_list("pk", *COUNTERS, *annotations)
+        )
+
+        repaired = 0
+        batch = []
+        for row in drifted.iterator(chunk_size=options["chunk_size"]):
+            batch.append(row)
+            if len(batch) >= options["chunk_size"]:
+                repaired += self._repair(batch)
+                batch = []
+        if batch:
+            repaired += self._repair(batch)
+
+        self.stdout.write(f"Counters: {repaired} user(s) repaired.")
+        self.stdout.write(self.style.SUCCESS("Done."))
+
+    @transaction.atomic
+    def _repair(self, rows):
+        size = len(COUNTERS)
+        for pk, *values in rows:
+            stored, actual = values[:size], values[size:]
+            # Apply the difference as a delta so concurrent follows aren't overwritten.
+            adjust_user_counters(
+                pk,
+                **{field: true - current for field, current, true in zip(COUNTERS, stored, actual)},
+            )
+            followers = dict(zip(COUNTERS, zip(stored, actual)))["followers_count"]
+            feed.followers_changed(pk, *followers)
+        return len(rows)
@@ -1,8 +1,10 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 
+from apps.core.models import ProtectedFieldsMixin
+
 # Create your models here.
-class User(AbstractUser):
+class User(ProtectedFieldsMixin, AbstractUser):
     email = models.EmailField(unique=True)
     bio = models.TextField(blank=True, default="")
     avatar = models.ImageField(upload_to='avatars/',  blank=True, null=True)
@@ -23,6 +25,9 @@ class User(AbstractUser):
         verbose_name = "User"
         verbose_name_plural = "Users"
         ordering = ["-date_joined"]
+
+    # Only ever changed with F() expressions (see apps.users.services).
+    PROTECTED_FIELDS = frozenset({"followers_count", "following_count", "recipes_count"})
     
     def __str__(self) -> str:
         return self.email
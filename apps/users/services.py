@@ -0,0 +1,21 @@
+from django.contrib.auth import get_user_model
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+User = get_user_model()
+
+
+def adjust_user_counters(user_id: int, **deltas: int) -> None:
+    """
+    Move the user's denormalised counters (``followers_count``,
+    ``following_count``, ``recipes_count``) by ``deltas`` in one atomic
+    UPDATE, never below zero.  Unlike writing back ``user.x + 1`` this can't
+    lose concurrent increments.
+    """
+    changes = {
+        field: Greatest(F(field) + delta, Value(0)) if delta < 0 else F(field) + delta
+        for field, delta in deltas.items()
+        if delta
+    }
+    if changes:
+        User.objects.filter(pk=user_id).update(**changes)
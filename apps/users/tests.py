@@ -1,3 +1,71 @@
-from django.test import TestCase
+from io import StringIO
 
-# Create your tests here.
+from django.core.management import call_command
+from rest_framework.test import APITestCase
+
+from .models import Follow, User
+from .services import adjust_user_counters
+
+
+class UserTestCase(APITestCase):
+    def setUp(self):
+        self.cook = User.objects.create_user(username="cook", email="cook@example.com")
+        self.fan = User.objects.create_user(username="fan", email="fan@example.com")
+
+    def counters(self, user):
+        user = User.objects.get(pk=user.pk)
+        return user.followers_count, user.following_count, user.recipes_count
+
+    def toggle_follow(self, follower, target):
+        self.client.force_authenticate(follower)
+        return self.client.post(f"/api/v1/users/{target.username}/follow/")
+
+
+# ─── Counters ──────────────────────────────────────────────────────────────────
+
+class UserCounterTests(UserTestCase):
+    def test_follow_and_unfollow_move_both_counters(self):
+        response = self.toggle_follow(self.fan, self.cook)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.counters(self.cook), (1, 0, 0))
+        self.assertEqual(self.counters(self.fan), (0, 1, 0))
+
+        self.assertFalse(self.toggle_follow(self.fan, self.cook).data["following"])
+        self.assertEqual(self.counters(self.cook), (0, 0, 0))
+        self.assertEqual(self.counters(self.fan), (0, 0, 0))
+
+    def test_following_yourself_is_rejected(self):
+        self.assertEqual(self.toggle_follow(self.cook, self.cook).status_code, 400)
+        self.assertEqual(self.counters(self.cook), (0, 0, 0))
+
+    def test_counters_never_drop_below_zero(self):
+        adjust_user_counters(self.cook.pk, followers_count=-3, recipes_count=2)
+        self.assertEqual(self.counters(self.cook), (0, 0, 2))
+
+    def test_profile_update_keeps_concurrent_counts(self):
+        # ``self.cook`` was loaded before these follows landed.
+        adjust_user_counters(self.cook.pk, followers_count=5, following_count=2, recipes_count=1)
+        self.client.force_authenticate(self.cook)
+        response = self.client.patch("/api/v1/users/me/", {"bio": "Home cook"})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(self.counters(self.cook), (5, 2, 1))
+        self.assertEqual(User.objects.get(pk=self.cook.pk).bio, "Home cook")
+
+    def test_full_save_skips_counters_but_creation_writes_them(self):
+        self.cook.followers_count = 99
+        self.cook.first_name = "Ada"
+        self.cook.save()
+        self.assertEqual(self.counters(self.cook), (0, 0, 0))
+        self.assertEqual(User.objects.get(pk=self.cook.pk).first_name, "Ada")
+
+        chef = User.objects.create_user(username="chef", email="chef@example.com", recipes_count=3)
+        self.assertEqual(self.counters(chef), (0, 0, 3))
+
+    def test_reconcile_counters_repairs_drift(self):
+        Follow.objects.create(follower=self.fan, following=self.cook)
+        adjust_user_counters(self.fan.pk, followers_count=4)
+        out = StringIO()
+        call_command("reconcile_counters", stdout=out)
+        self.assertIn("2 user(s) repaired", out.getvalue())
+        self.assertEqual(self.counters(self.cook), (1, 0, 0))
+        self.assertEqual(self.counters(self.fan), (0, 1, 0))
@@ -9,7 +9,9 @@ from rest_framework_simplejwt.views import TokenObtainPairView
 from rest_framework_simplejwt.tokens import RefreshToken
 
 from apps.notifications.services import create_notification
+from apps.recipes import feed
 from .models import Follow
+from .services import adjust_user_counters
 from .serializers import (
     ChangePasswordSerializer,
     CustomTokenObtainPairSerializer,
@@ -161,23 +163,21 @@ class FollowView(APIView):
         )
 
         if not created:
-            # Unfollow
-            follow.delete()
-            User.objects.filter(pk=request.user.pk).update(
-                following_count=max(0, request.user.following_count - 1)
-            )
-            User.objects.filter(pk=target.pk).update(
-                followers_count=max(0, target.followers_count - 1)
-            )
+            # Unfollow — only the request that actually removed the row
+            # moves the counters, so concurrent unfollows count once.
+            deleted, _ = Follow.objects.filter(pk=follow.pk).delete()
+            if deleted:
+                feed.forget_author(request.user, target)
+                adjust_user_counters(request.user.pk, following_count=-1)
+                adjust_user_counters(target.pk, followers_count=-1)
+                followers = User.objects.values_list("followers_count", flat=True).get(pk=target.pk)
+                feed.followers_changed(target.pk, followers + 1, followers)
             return Response({"detail": "Unfollowed.", "following": False})
 
         # Follow
-        User.objects.filter(pk=request.user.pk).update(
-            following_count=request.user.following_count + 1
-        )
-        User.objects.filter(pk=target.pk).update(
-            followers_count=target.followers_count + 1
-        )
+        adjust_user_counters(request.user.pk, following_count=1)
+        adjust_user_counters(target.pk, followers_count=1)
+        feed.backfill(request.user, target)
         create_notification(
             recipient=target,
             actor=request.user,
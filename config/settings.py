@@ -70,6 +70,7 @@ MIDDLEWARE = [
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
     "django_browser_reload.middleware.BrowserReloadMiddleware",
+    "apps.notifications.middleware.NotificationBatchMiddleware",
 ]
 
 ROOT_URLCONF = "config.urls"
@@ -130,6 +131,108 @@ else:
         }
     }
 
+# Cache
+# Local memory by default; point REDIS_URL at any Redis-compatible server to share it.
+
+REDIS_URL = config("REDIS_URL", default="")
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "dishcovery",
+        }
+    }
+
+# Response cache for anonymous recipe reads (see apps/recipes/cache.py)
+RESPONSE_CACHE = {
+    "ALIAS": "default",
+    "TIMEOUT": config("RESPONSE_CACHE_TIMEOUT", default=60, cast=int),
+    "STALE_WHILE_REVALIDATE": config("RESPONSE_CACHE_STALE_WHILE_REVALIDATE", default=300, cast=int),
+}
+
+# Trending score decay (see apps/recipes/trending.py)
+TRENDING = {
+    "HALF_LIFE_HOURS": config("TRENDING_HALF_LIFE_HOURS", default=24.0, cast=float),
+}
+
+# Facet counts (see apps/recipes/facets.py).  Each process's index replays
+# the recipes changed since its version from the change log in the database,
+# or rebuilds when further behind than MAX_LAG changes or out of date for
+# CHANGE_TTL seconds.  GAP_TIMEOUT must outlast the longest transaction that
+# changes recipes.  Filters the index can't answer that match more than
+# MAX_MATCHES recipes are counted by the database instead.
+RECIPE_FACETS = {
+    "CHANGE_TTL": config("RECIPE_FACETS_CHANGE_TTL", default=86400, cast=int),
+    "MAX_LAG": config("RECIPE_FACETS_MAX_LAG", default=1000, cast=int),
+    "GAP_TIMEOUT": config("RECIPE_FACETS_GAP_TIMEOUT", default=300, cast=int),
+    "MAX_MATCHES": config("RECIPE_FACETS_MAX_MATCHES", default=10_000, cast=int),
+}
+
+# "Cook with" ingredient search (see apps/recipes/ingredients.py).  Only the
+# best PANTRY_SEARCH_MAX_RESULTS matches of a pantry are ranked and listed.
+PANTRY_SEARCH = {
+    "MAX_RESULTS": config("PANTRY_SEARCH_MAX_RESULTS", default=500, cast=int),
+}
+
+# Home feed (see apps/recipes/feed.py).  Authors with more followers than
+# FEED_FANOUT_LIMIT are merged in at read time instead of pushed on publish.
+FEED = {
+    "FANOUT_LIMIT": config("FEED_FANOUT_LIMIT", default=10000, cast=int),
+    "FANOUT_CHUNK_SIZE": config("FEED_FANOUT_CHUNK_SIZE", default=1000, cast=int),
+    "BACKFILL": config("FEED_BACKFILL", default=50, cast=int),
+}
+
+# Write-behind share events (see apps/interactions/shares.py).
+# Set SHARE_EVENTS_ASYNC=False to write every share inline.
+SHARE_EVENTS = {
+    "ASYNC": config("SHARE_EVENTS_ASYNC", default=True, cast=bool),
+    "BATCH_SIZE": config("SHARE_EVENTS_BATCH_SIZE", default=500, cast=int),
+    "FLUSH_INTERVAL": config("SHARE_EVENTS_FLUSH_INTERVAL", default=2.0, cast=float),
+    "MAX_PENDING": config("SHARE_EVENTS_MAX_PENDING", default=10000, cast=int),
+}
+
+# Notifications (see apps/notifications/services.py).  Identical notifications
+# within NOTIFICATIONS_DEDUPE_WINDOW seconds are dropped, and follows, comments
+# and ratings of one target are grouped for NOTIFICATIONS_GROUP_WINDOW seconds;
+# set NOTIFICATIONS_ASYNC=True to write them from a background thread.
+NOTIFICATIONS = {
+    "ASYNC": config("NOTIFICATIONS_ASYNC", default=False, cast=bool),
+    "BATCH_SIZE": config("NOTIFICATIONS_BATCH_SIZE", default=1000, cast=int),
+    "FLUSH_INTERVAL": config("NOTIFICATIONS_FLUSH_INTERVAL", default=1.0, cast=float),
+    "MAX_PENDING": config("NOTIFICATIONS_MAX_PENDING", default=10000, cast=int),
+    "DEDUPE_WINDOW": config("NOTIFICATIONS_DEDUPE_WINDOW", default=300, cast=int),
+    "GROUP_WINDOW": config("NOTIFICATIONS_GROUP_WINDOW", default=86400, cast=int),
+    "UNREAD_CACHE_TIMEOUT": config("NOTIFICATIONS_UNREAD_CACHE_TIMEOUT", default=300, cast=int),
+    # Real-time streams (/notifications/stream/ and /poll/); Redis pub/sub
+    # reaches every server process, the local broker only its own.
+    "BROKER": (
+        "apps.notifications.broker.RedisBroker" if REDIS_URL
+        else "apps.notifications.broker.LocalBroker"
+    ),
+    "STREAM_KEEPALIVE": config("NOTIFICATIONS_STREAM_KEEPALIVE", default=15, cast=int),
+    "STREAM_MAX_SECONDS": config("NOTIFICATIONS_STREAM_MAX_SECONDS", default=300, cast=int),
+    "STREAM_TICKET_TTL": config("NOTIFICATIONS_STREAM_TICKET_TTL", default=60, cast=int),
+    "POLL_TIMEOUT": config("NOTIFICATIONS_POLL_TIMEOUT", default=25, cast=int),
+    # Retention (manage.py prune_notifications): days each type is kept (None
+    # keeps it forever), when read ones move to the compressed archive, and
+    # how long archive months are kept.
+    "RETENTION": {
+        "DEFAULT": 365,
+        "recipe": 90,
+        "follow": 180,
+        "rating": 180,
+    },
+    "ARCHIVE_AFTER_DAYS": config("NOTIFICATIONS_ARCHIVE_AFTER_DAYS", default=30, cast=int),
+    "ARCHIVE_TTL_DAYS": config("NOTIFICATIONS_ARCHIVE_TTL_DAYS", default=730, cast=int),
+}
+
 # AUTHENTICATION_BACKENDS = (
 #     "social_core.backends.github.GithubOAuth2",
 #     "social_core.backends.google.GoogleOAuth2",
@@ -198,7 +301,7 @@ REST_FRAMEWORK = {
         "rest_framework.filters.SearchFilter",
         "rest_framework.filters.OrderingFilter",
     ],
-    "DEFAULT_PAGINATION_CLASS": "rest_framework.pagination.PageNumberPagination",
+    "DEFAULT_PAGINATION_CLASS": "apps.core.pagination.DefaultPagination",
     "PAGE_SIZE": 12,
     "DEFAULT_SCHEMA_CLASS": "drf_spectacular.openapi.AutoSchema",
 }
@@ -0,0 +1,126 @@
+"""
+Benchmark the "cook with" ingredient ranking: ordering every recipe that
+shares an ingredient with the pantry against the top-``MAX_RESULTS`` cut
+made by ``rank_by_pantry``.
+
+Builds a throwaway SQLite database (never touches db.sqlite3), fills it with
+synthetic recipes and their ingredient postings and prints the timings of a
+first page and of the count both variants paginate with.
+
+Usage:
+    python scripts/bench_pantry_search.py
+    python scripts/bench_pantry_search.py --recipes 200000 --pantry onion,garlic,egg --max-results 200
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+os.environ["DB_NAME"] = ""
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+COMMON = ["onion", "garlic", "egg", "butter", "olive oil", "rice", "flour", "milk", "tomato", "chicken"]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=100_000)
+    parser.add_argument("--ingredients", type=int, default=2000, help="Size of the ingredient vocabulary")
+    parser.add_argument("--per-recipe", type=int, default=10, help="Ingredients per recipe")
+    parser.add_argument("--pantry", default="onion,garlic,egg,rice")
+    parser.add_argument("--max-results", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    return parser.parse_args()
+
+
+def populate(args):
+    from django.contrib.auth import get_user_model
+
+    from apps.recipes.models import Ingredient, Recipe, RecipeIngredient
+
+    User = get_user_model()
+    author = User.objects.create(username="bench", email="bench@dishcovery.local")
+    names = COMMON + [f"ingredient {i}" for i in range(args.ingredients - len(COMMON))]
+    ingredients = Ingredient.objects.bulk_create([Ingredient(name=name) for name in names])
+    # A few staples of every kitchen sit in most recipes, as in real data.
+    common, rare = ingredients[:len(COMMON)], ingredients[len(COMMON):]
+
+    rng = random.Random(42)
+    done = 0
+    while done < args.recipes:
+        size = min(args.chunk_size, args.recipes - done)
+        # Rows are written straight to the tables, so the signals never index them.
+        recipes = Recipe.objects.bulk_create(
+            [
+                Recipe(
+                    author=author,
+                    name=f"Recipe {done + i}",
+                    ingredients=[],
+                    ingredient_count=args.per_recipe,
+                    rating=rng.uniform(1, 5),
+                )
+                for i in range(size)
+            ]
+        )
+        RecipeIngredient.objects.bulk_create(
+            [
+                RecipeIngredient(recipe_id=recipe.pk, ingredient_id=ingredient.pk)
+                for recipe in recipes
+                for ingredient in rng.sample(common, 3) + rng.sample(rare, args.per_recipe - 3)
+            ]
+        )
+        done += size
+        print(f"  … {done} recipes", file=sys.stderr)
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.DATABASES["default"]["NAME"] = os.path.join(tmp, "bench.sqlite3")
+        django.setup()
+
+        from django.core.management import call_command
+
+        from apps.recipes.ingredients import _ranked, matching_ingredient_ids, rank_by_pantry
+        from apps.recipes.models import Recipe
+
+        call_command("migrate", verbosity=0)
+        print(f"Populating {args.recipes} recipes × {args.per_recipe} ingredients…", file=sys.stderr)
+        populate(args)
+
+        terms = args.pantry.split(",")
+        base = Recipe.objects.filter(is_published=True).select_related("author")
+        ingredient_ids = matching_ingredient_ids(terms)
+        variants = {
+            "every match ordered": lambda: _ranked(base, ingredient_ids),
+            f"top {args.max_results}": lambda: rank_by_pantry(base, terms, limit=args.max_results),
+        }
+        for label, build in variants.items():
+            print(f"\n=== {label}")
+            page = timed(lambda: list(build()[:12]), args.repeat)
+            count = timed(lambda: build().count(), args.repeat)
+            print(f"matches: {build().count()}   page 1: {page:8.1f} ms   count: {count:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
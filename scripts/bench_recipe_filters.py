@@ -0,0 +1,140 @@
+"""
+Benchmark the recipe list tag / meal-type filters: the old JOIN + DISTINCT
+queryset against the EXISTS semi-join used by ``RecipeFilter``.
+
+Builds a throwaway SQLite database (never touches db.sqlite3), fills it with
+synthetic recipes and prints the query plan and timings of both variants.
+
+Usage:
+    python scripts/bench_recipe_filters.py
+    python scripts/bench_recipe_filters.py --recipes 100000 --tags-per-recipe 20
+"""
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+os.environ["DB_NAME"] = ""
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--recipes", type=int, default=100_000)
+    parser.add_argument("--tags", type=int, default=200, help="Size of the tag vocabulary")
+    parser.add_argument("--tags-per-recipe", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    return parser.parse_args()
+
+
+def populate(args):
+    from django.contrib.auth import get_user_model
+
+    from apps.recipes.models import MealType, Recipe, Tag
+
+    User = get_user_model()
+    author = User.objects.create(username="bench", email="bench@dishcovery.local")
+    tags = Tag.objects.bulk_create(
+        [Tag(name=f"Tag {i}", slug=f"tag-{i}") for i in range(args.tags)]
+    )
+    meal_types = MealType.objects.bulk_create(
+        [MealType(name=name) for name in ("Breakfast", "Lunch", "Dinner", "Snack", "Dessert")]
+    )
+    TagLink = Recipe.tags.through
+    MealTypeLink = Recipe.meal_types.through
+    description = "A long description of the dish. " * 40
+
+    rng = random.Random(42)
+    done = 0
+    while done < args.recipes:
+        size = min(args.chunk_size, args.recipes - done)
+        recipes = Recipe.objects.bulk_create(
+            [
+                Recipe(
+                    author=author,
+                    name=f"Recipe {done + i}",
+                    description=description,
+                    cuisine=rng.choice(["Italian", "Indian", "Mexican", "Thai", "French"]),
+                    ingredients=["Salt", "Olive oil"],
+                )
+                for i in range(size)
+            ]
+        )
+        TagLink.objects.bulk_create(
+            [
+                TagLink(recipe_id=recipe.pk, tag_id=tag.pk)
+                for recipe in recipes
+                for tag in rng.sample(tags, args.tags_per_recipe)
+            ]
+        )
+        MealTypeLink.objects.bulk_create(
+            [
+                MealTypeLink(recipe_id=recipe.pk, mealtype_id=meal_type.pk)
+                for recipe in recipes
+                for meal_type in rng.sample(meal_types, 2)
+            ]
+        )
+        done += size
+        print(f"  … {done} recipes", file=sys.stderr)
+
+
+def querysets():
+    from apps.recipes.filters import RecipeFilter
+    from apps.recipes.models import Recipe
+
+    base = (
+        Recipe.objects.filter(is_published=True)
+        .select_related("author")
+        .order_by("-created_at")
+    )
+    params = {"tag": "Tag 7", "meal_type": "Dinner"}
+    join_distinct = base.filter(tags__name__iexact=params["tag"]).filter(
+        meal_types__name__iexact=params["meal_type"]
+    ).distinct()
+    semi_join = RecipeFilter(params, queryset=base).qs
+    return {"JOIN + DISTINCT": join_distinct, "EXISTS semi-join": semi_join}
+
+
+def timed(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.DATABASES["default"]["NAME"] = os.path.join(tmp, "bench.sqlite3")
+        django.setup()
+
+        from django.core.management import call_command
+
+        call_command("migrate", verbosity=0)
+        print(f"Populating {args.recipes} recipes × {args.tags_per_recipe} tags…", file=sys.stderr)
+        populate(args)
+
+        for label, queryset in querysets().items():
+            print(f"\n=== {label}")
+            print(queryset[:12].explain())
+            page = timed(lambda: list(queryset[:12]), args.repeat)
+            deep = timed(lambda: list(queryset[12 * 100: 12 * 101]), args.repeat)
+            count = timed(queryset.count, args.repeat)
+            print(f"page 1: {page:8.1f} ms   page 101: {deep:8.1f} ms   count: {count:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
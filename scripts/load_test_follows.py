@@ -0,0 +1,121 @@
+"""
+Load-test the follower / following / recipe counters.
+
+Builds a throwaway SQLite database (never touches db.sqlite3), then fires
+``--users`` concurrent follow requests at one target through ``FollowView``,
+unfollows half of them concurrently, and creates ``--recipes`` recipes for the
+target from as many threads.  Exits non-zero if any counter disagrees with the
+rows it counts.
+
+Usage:
+    python scripts/load_test_follows.py
+    python scripts/load_test_follows.py --users 500 --recipes 100
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+BASE_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE_DIR))
+os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+os.environ["DB_NAME"] = ""
+
+import django  # noqa: E402
+from django.conf import settings  # noqa: E402
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=500, help="Concurrent followers")
+    parser.add_argument("--recipes", type=int, default=100, help="Concurrent recipe creations")
+    return parser.parse_args()
+
+
+def hammer(requests):
+    """Run every ``(user, method, path, data)`` request at once, one thread each."""
+    from django.db import connection
+    from rest_framework.test import APIClient
+
+    barrier = threading.Barrier(len(requests))
+
+    def send(request):
+        user, method, path, data = request
+        client = APIClient()
+        client.force_authenticate(user)
+        barrier.wait()
+        try:
+            return getattr(client, method)(path, data, format="json").status_code
+        finally:
+            connection.close()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=len(requests)) as pool:
+        statuses = list(pool.map(send, requests))
+    elapsed = (time.perf_counter() - started) * 1000
+    summary = {code: statuses.count(code) for code in sorted(set(statuses))}
+    print(f"  {len(requests)} request(s) in {elapsed:.0f} ms: {summary}")
+
+
+def check(target, followers):
+    from apps.recipes.models import Recipe
+    from apps.users.models import Follow
+
+    target.refresh_from_db()
+    errors = []
+    expected = Follow.objects.filter(following=target).count()
+    if target.followers_count != expected:
+        errors.append(f"followers_count={target.followers_count}, {expected} follow rows")
+    expected = Recipe.objects.filter(author=target).count()
+    if target.recipes_count != expected:
+        errors.append(f"recipes_count={target.recipes_count}, {expected} recipes")
+    following = set(Follow.objects.filter(following=target).values_list("follower_id", flat=True))
+    for user in followers:
+        user.refresh_from_db()
+        if user.following_count != (user.pk in following):
+            errors.append(f"{user.username}: following_count={user.following_count}")
+    return errors
+
+
+def main():
+    args = parse_args()
+    with tempfile.TemporaryDirectory() as tmp:
+        settings.DATABASES["default"]["NAME"] = os.path.join(tmp, "load.sqlite3")
+        # Writers queue on SQLite's lock instead of failing fast.
+        settings.DATABASES["default"]["OPTIONS"] = {"timeout": 60, "transaction_mode": "IMMEDIATE"}
+        settings.ALLOWED_HOSTS = ["testserver"]
+        django.setup()
+
+        from django.contrib.auth import get_user_model
+        from django.core.management import call_command
+
+        call_command("migrate", verbosity=0)
+        User = get_user_model()
+        target = User.objects.create(username="target", email="target@dishcovery.local")
+        followers = User.objects.bulk_create(
+            [User(username=f"user{i}", email=f"user{i}@dishcovery.local") for i in range(args.users)]
+        )
+        path = f"/api/v1/users/{target.username}/follow/"
+
+        print(f"Following {target.username} from {args.users} threads…")
+        hammer([(user, "post", path, None) for user in followers])
+        print(f"Unfollowing from {args.users // 2} threads…")
+        hammer([(user, "post", path, None) for user in followers[::2]])
+        print(f"Creating {args.recipes} recipes from as many threads…")
+        recipe = {"name": "Load test", "ingredients": ["Salt"], "instructions": ["Stir"]}
+        hammer([(target, "post", "/api/v1/recipes/", recipe) for _ in range(args.recipes)])
+
+        errors = check(target, followers)
+        for error in errors[:20]:
+            print(f"  MISMATCH {error}")
+        print("FAILED" if errors else "All counters match.")
+        sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    main()